@@ -0,0 +1,225 @@
+#----------------------------------------------------------------------------#
+# JSON API, version 1.
+#
+# Responses are serialized straight from column-projection rows by the
+# schemas below, without building a dict per row. Every response carries an
+# ETag (a hash of the body) and is stored in the response cache under the
+# same tags as the HTML pages, plus a venue:/artist: tag per listed row, so
+# a conditional request for unchanged data is answered with a 304 from the
+# cache. The detail endpoints take their validators from the data instead
+# (see freshness.py) and run their queries concurrently (see fanout.py).
+#----------------------------------------------------------------------------#
+
+import hashlib
+import json
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request
+
+from cache import response_cache
+import fanout
+import freshness
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres, show_now
+from pagination import keyset_paginate
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+def _default(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  raise TypeError('{!r} is not JSON serializable'.format(value))
+
+_encode = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':')).encode
+
+class Schema(object):
+  """An ordered list of (field name, column) pairs.
+
+  The columns are what a view selects; rows of that projection are written
+  out as JSON objects with the field names as keys.
+  """
+
+  def __init__(self, *fields):
+    self.names = [name for name, _ in fields]
+    self.columns = [column.label(name) for name, column in fields]
+    self._prefixes = [_encode(name) + ':' for name in self.names]
+
+  def fields(self, row):
+    # The members of one JSON object, without the braces
+    return ','.join(prefix + _encode(value) for prefix, value in zip(self._prefixes, row))
+
+  def dumps(self, row):
+    return '{' + self.fields(row) + '}'
+
+  def dumps_many(self, rows):
+    return '[' + ','.join(map(self.dumps, rows)) + ']'
+
+venue_schema = Schema(
+  ('id', Venue.id),
+  ('name', Venue.name),
+  ('address', Venue.address),
+  ('city', Venue.city),
+  ('state', Venue.state),
+  ('phone', Venue.phone),
+  ('website', Venue.website),
+  ('facebook_link', Venue.facebook_link),
+  ('seeking_talent', Venue.seeking_talent),
+  ('seeking_description', Venue.seeking_description),
+  ('image_link', Venue.image_link),
+  ('upcoming_shows_count', Venue.upcoming_shows_count),
+  ('past_shows_count', Venue.past_shows_count),
+)
+
+artist_schema = Schema(
+  ('id', Artist.id),
+  ('name', Artist.name),
+  ('city', Artist.city),
+  ('state', Artist.state),
+  ('phone', Artist.phone),
+  ('website', Artist.website),
+  ('facebook_link', Artist.facebook_link),
+  ('seeking_venue', Artist.seeking_venue),
+  ('seeking_description', Artist.seeking_description),
+  ('image_link', Artist.image_link),
+  ('upcoming_shows_count', Artist.upcoming_shows_count),
+  ('past_shows_count', Artist.past_shows_count),
+)
+
+show_schema = Schema(
+  ('id', Show.id),
+  ('start_time', Show.start_time),
+  ('end_time', Show.end_time),
+  ('venue_id', Venue.id),
+  ('venue_name', Venue.name),
+  ('venue_image_link', Venue.image_link),
+  ('artist_id', Artist.id),
+  ('artist_name', Artist.name),
+  ('artist_image_link', Artist.image_link),
+)
+
+venue_show_schema = Schema(
+  ('artist_id', Artist.id),
+  ('artist_name', Artist.name),
+  ('artist_image_link', Artist.image_link),
+  ('start_time', Show.start_time),
+  ('end_time', Show.end_time),
+)
+
+artist_show_schema = Schema(
+  ('venue_id', Venue.id),
+  ('venue_name', Venue.name),
+  ('venue_image_link', Venue.image_link),
+  ('start_time', Show.start_time),
+  ('end_time', Show.end_time),
+)
+
+def json_response(body):
+  # Validated by the ETag alone; the detail views add Last-Modified from
+  # their data (freshness.py)
+  response = current_app.response_class(body, mimetype='application/json')
+  response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+  return response
+
+def page_response(schema, page):
+  return json_response(
+    '{"data":' + schema.dumps_many(page.items) +
+    ',"next":' + _encode(page.next_cursor) +
+    ',"prev":' + _encode(page.prev_cursor) + '}')
+
+def split_shows(rows):
+  # rows are ordered by start_time, so past shows are a prefix
+  now = show_now()
+  split = next((i for i, row in enumerate(rows) if row.start_time >= now), len(rows))
+  return rows[:split], rows[split:]
+
+def detail_response(schema, row, genres, show_schema, shows):
+  past_shows, upcoming_shows = split_shows(shows)
+  return json_response(
+    '{' + schema.fields(row) +
+    ',"genres":' + _encode(genres) +
+    ',"past_shows":' + show_schema.dumps_many(past_shows) +
+    ',"upcoming_shows":' + show_schema.dumps_many(upcoming_shows) + '}')
+
+def paginate(query, columns, key):
+  return keyset_paginate(query, columns, key,
+                         per_page=current_app.config['PAGE_SIZE'],
+                         after=request.args.get('after'), before=request.args.get('before'))
+
+@api.after_request
+def conditional(response):
+  # Turns a 200 into a 304 when If-None-Match/If-Modified-Since still match
+  if request.method in ('GET', 'HEAD') and response.status_code == 200:
+    response.make_conditional(request)
+  return response
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+def error(error):
+  return jsonify({'error': error.code, 'message': error.description}), error.code
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@api.route('/venues')
+@response_cache.cached('venues')
+def venues():
+  page = paginate(db.session.query(*venue_schema.columns),
+                  [Venue.state, Venue.city, Venue.id],
+                  key=lambda row: (row.state, row.city, row.id))
+  response_cache.tag(*['venue:{}'.format(row.id) for row in page.items])
+  return page_response(venue_schema, page)
+
+@api.route('/venues/<int:venue_id>')
+@freshness.conditional(freshness.venue_freshness)
+@response_cache.cached('venue:{venue_id}')
+def venue(venue_id):
+  row, genres, shows = fanout.gather(
+    lambda: db.session.query(*venue_schema.columns).filter(Venue.id == venue_id).first_or_404(),
+    lambda: [name for (name,) in db.session.query(Genre.name)
+             .join(venue_genres).filter(venue_genres.c.venue_id == venue_id).order_by(Genre.name)],
+    lambda: db.session.query(*venue_show_schema.columns)
+             .join(Artist, Show.artist_id == Artist.id)
+             .filter(Show.venue_id == venue_id)
+             .order_by(Show.start_time).all())
+  response_cache.tag(*['artist:{}'.format(show.artist_id) for show in shows])
+  return detail_response(venue_schema, row, genres, venue_show_schema, shows)
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@api.route('/artists')
+@response_cache.cached('artists')
+def artists():
+  page = paginate(db.session.query(*artist_schema.columns),
+                  [Artist.name, Artist.id],
+                  key=lambda row: (row.name, row.id))
+  response_cache.tag(*['artist:{}'.format(row.id) for row in page.items])
+  return page_response(artist_schema, page)
+
+@api.route('/artists/<int:artist_id>')
+@freshness.conditional(freshness.artist_freshness)
+@response_cache.cached('artist:{artist_id}')
+def artist(artist_id):
+  row, genres, shows = fanout.gather(
+    lambda: db.session.query(*artist_schema.columns).filter(Artist.id == artist_id).first_or_404(),
+    lambda: [name for (name,) in db.session.query(Genre.name)
+             .join(artist_genres).filter(artist_genres.c.artist_id == artist_id).order_by(Genre.name)],
+    lambda: db.session.query(*artist_show_schema.columns)
+             .join(Venue, Show.venue_id == Venue.id)
+             .filter(Show.artist_id == artist_id)
+             .order_by(Show.start_time).all())
+  response_cache.tag(*['venue:{}'.format(show.venue_id) for show in shows])
+  return detail_response(artist_schema, row, genres, artist_show_schema, shows)
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@api.route('/shows')
+@response_cache.cached('shows')
+def shows():
+  query = db.session.query(*show_schema.columns) \
+    .join(Venue, Show.venue_id == Venue.id) \
+    .join(Artist, Show.artist_id == Artist.id)
+  page = paginate(query, [Show.start_time, Show.id], key=lambda row: (row.start_time, row.id))
+  for row in page.items:
+    response_cache.tag('venue:{}'.format(row.venue_id), 'artist:{}'.format(row.artist_id))
+  return page_response(show_schema, page)
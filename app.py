@@ -2,495 +2,163 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-import json
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, jsonify, abort
+import pytz
+from functools import lru_cache
+from flask import Flask, current_app
+from flask.cli import with_appcontext
 from flask_moment import Moment
 from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
 import collections
 import collections.abc
 collections.Callable = collections.abc.Callable
-import sys
-from operator import itemgetter # for sorting lists of tuples
+import click
+from datetime import timedelta
 
 # import database's models
-from models import db, Venue, Artist, Show
+from models import db, Show, refresh_show_counts, show_now
+from cache import response_cache
 
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
-migrate = Migrate(app, db)
+moment = Moment()
+migrate = Migrate()
+
+# Used when SECRET_KEY is not set and the app runs in debug mode only
+DEVELOPMENT_SECRET_KEY = 'fyyur-development-key'
+
+def create_app(config=None):
+  """Build the app: the 'config' module, then the config mapping given.
+
+  Importing this module builds nothing; each call returns a new app. Nothing
+  here connects to the database or starts a thread, so a pre-fork server can
+  call it before forking (gunicorn --preload 'app:create_app()').
+  """
+  import api
+  import autocomplete
+  import artists
+  import assets
+  import calendars
+  import export
+  import fanout
+  import feed
+  import importer
+  import instrumentation
+  import pages
+  import profiler
+  import replicas
+  import search
+  import shows
+  import templating
+  import venues
+
+  app = Flask(__name__)
+  app.config.from_object('config')
+  app.config.update(config or {})
+  if not app.config['SECRET_KEY']:
+    # Sessions and flashes are signed with it; every worker must share it
+    if not app.debug:
+      raise RuntimeError('Set SECRET_KEY in the environment.')
+    app.config['SECRET_KEY'] = DEVELOPMENT_SECRET_KEY
+
+  moment.init_app(app)
+  db.init_app(app)
+  replicas.init_app(app)
+  instrumentation.init_app(app)
+  migrate.init_app(app, db)
+  search.init_app(app)
+  autocomplete.init_app(app)
+  calendars.init_app(app)
+  importer.init_app(app)
+  export.init_app(app)
+  feed.init_app(app)
+  response_cache.init_app(app)
+  fanout.init_app(app)
+  assets.init_app(app)
+  templating.init_app(app)
+  profiler.init_app(app)
+
+  app.jinja_env.filters['datetime'] = format_datetime
+  app.register_blueprint(pages.bp)
+  app.register_blueprint(venues.bp)
+  app.register_blueprint(artists.bp)
+  app.register_blueprint(shows.bp)
+  app.register_blueprint(api.api)
+  app.cli.add_command(roll_forward_command)
+
+  if not app.debug and not app.testing and app.config['ERROR_LOG']:
+    file_handler = FileHandler(app.config['ERROR_LOG'])
+    file_handler.setFormatter(
+        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    )
+    app.logger.setLevel(logging.INFO)
+    file_handler.setLevel(logging.INFO)
+    app.logger.addHandler(file_handler)
+    app.logger.info('errors')
+  return app
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+@lru_cache(maxsize=64)
+def datetime_pattern(format, locale):
+  # babel.dates.format_datetime resolves the locale and looks the pattern up
+  # on every call; do both once per (format, locale)
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
 def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+  # Takes datetimes (naive ones are in SHOW_TIMEZONE) or, for older callers,
+  # strings, and shows them in DISPLAY_TIMEZONE
+  if isinstance(value, str):
+    value = dateutil.parser.parse(value)
+  if value.tzinfo is None:
+    value = pytz.timezone(current_app.config['SHOW_TIMEZONE']).localize(value)
+  display = pytz.timezone(current_app.config['DISPLAY_TIMEZONE'])
+  value = display.normalize(value.astimezone(display))
+  pattern, locale = datetime_pattern(format, current_app.config['DATETIME_LOCALE'])
+  return pattern.apply(value, locale)
 
-app.jinja_env.filters['datetime'] = format_datetime
-     
 #----------------------------------------------------------------------------#
-# Controllers.
+# Commands.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
-def index():
-  return render_template('pages/home.html')
-
-#  Venues
-#  ----------------------------------------------------------------
-
-@app.route('/venues')
-def venues():
-  # Data to save all venues
-  data = []
-  # Set of all the {cities, states) combinations uniquely
-  location_list = set()
-
-  venues = Venue.query.all()
-  for venue in venues:
-    # Add turple of (city, state) to the set
-    location_list.add((venue.city, venue.state))
-  
-  # Turn the set into an ordered list
-  location_list = list(location_list)
-  # Sorts on second column first (state), then by city.
-  location_list.sort(key=itemgetter(1,0))
-
-  for location in location_list:
-    venue_list = []
-    for venue in venues:
-        if (venue.city == location[0]) and (venue.state == location[1]):
-            venue_list.append({
-                "id": venue.id,
-                "name": venue.name,
-                "num_upcoming_shows": len(list(filter(lambda x: x.start_time > datetime.today(), venue.shows)))
-            })
-
-    # Append the data dictionary
-    data.append({
-        "city": location[0],
-        "state": location[1],
-        "venues": venue_list
-    })
-
-  print(data)
-  return render_template('pages/venues.html', areas=data)
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-  search_term = request.form.get('search_term', '').strip()
-  results = Venue.query.filter(Venue.name.ilike('%{}%'.format(search_term))).all()
-
-  venue_list = []
-  for venue in results:
-     venue_list.append({
-        "id": venue.id,
-        "name": venue.name,
-        "num_upcoming_shows": len(list(filter(lambda x: x.start_time > datetime.today(), venue.shows)))
-        })
-     
-  response = {
-    "count": len(results),
-    "data": venue_list
-  }
-  print(response)
-  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
-
-# shows the venue page with the given venue_id
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-  venue = Venue.query.get(venue_id)
-  data = venue.to_dict()
-
-  past_shows = []
-  upcoming_shows = []
-
-  past_shows = list(filter(lambda x: x.start_time < datetime.today(), venue.shows))
-  upcoming_shows = list(filter(lambda x: x.start_time >= datetime.today(), venue.shows))
-
-  tmp = []
-  for show in past_shows:
-    tmp.append({
-      'artist_id': show.artist.id,
-      'artist_name': show.artist.name,
-      'artist_image_link': show.artist.image_link,
-      'start_time': show.start_time.isoformat()
-    })
-  past_shows = tmp
-
-  tmp = []
-  for show in upcoming_shows:
-    tmp.append({
-      'artist_id': show.artist.id,
-      'artist_name': show.artist.name,
-      'artist_image_link': show.artist.image_link,
-      'start_time': show.start_time.isoformat()
-    })
-  upcoming_shows = tmp
-
-  past_shows_count = len(past_shows)
-  upcoming_shows_count = len(upcoming_shows)
-  data["past_shows"] = past_shows
-  data["upcoming_shows"] = upcoming_shows
-  data["past_shows_count"] = past_shows_count
-  data["upcoming_shows_count"] = upcoming_shows_count
-
-  # Get genres
-  if (venue.genres is not None):
-     data['genres'] = venue.genres.split(',')
-  else:
-     data['genres'] = ""
-  print(data)
-  return render_template('pages/show_venue.html', venue=data)
-
-#  Create Venue
-#  ----------------------------------------------------------------
-
-@app.route('/venues/create', methods=['GET'])
-def create_venue_form():
-  form = VenueForm()
-  return render_template('forms/new_venue.html', form=form)
-
-@app.route('/venues/create', methods=['POST'])
-def create_venue_submission():
-  form = VenueForm(request.form, meta={'csrf': False})
-  if not form.validate():
-    message = []
-    for field, err in form.errors.items():
-      message.append(field + ' - ' + '|'.join(err))
-    flash('Errors ' + str(message))
-    return redirect(url_for('create_venue_submission'))
-  else:
-    try:
-      venue = Venue()
-      venue.name = form.name.data
-      venue.city = form.city.data
-      venue.state = form.state.data
-      venue.address = form.address.data
-      venue.phone = form.phone.data
-      tmp_genres = request.form.getlist('genres')
-      venue.genres = ','.join(tmp_genres)
-      venue.facebook_link = form.facebook_link.data
-      venue.website = form.website_link.data
-      venue.image_link = form.image_link.data
-      venue.seeking_talent = form.seeking_talent.data
-      venue.seeking_description = form.seeking_description.data
-
-      db.session.add(venue)
-      db.session.commit()
-      flash('Venue: {0} created successfully!'.format(venue.name))
-    except Exception as err:
-      db.session.rollback()
-      flash('An error occurred creating the Venue: {0}. Error: {1}'.format(venue.name, err))
-      print(sys.exc_info())
-    finally:
-      db.session.close()
-    return render_template('pages/home.html')
-
-@app.route('/venues/<venue_id>', methods=['DELETE'])
-def delete_venue(venue_id):
-  try:
-    venue = Venue.query.get(venue_id)
-    venue_name = venue.name
-    db.session.delete(venue)
+@click.command('roll-forward')
+@click.option('--window', default=60, show_default=True,
+              help='Minutes back to look for shows that have started. Run at least this often.')
+@click.option('--all', 'full', is_flag=True, help='Recount every venue and artist.')
+@with_appcontext
+def roll_forward_command(window, full):
+  """Move started shows from upcoming to past in the stored show counts."""
+  now = show_now()
+  if full:
+    refresh_show_counts(now=now)
     db.session.commit()
-    flash('Successfully removed venue {0}.'.format(venue_name))
-  except Exception as err:
-    db.session.rollback()
-    flash('An error occurred removing the Venue: {0}. Error: {1}'.format(venue_name, err))
-  finally:
-    db.session.close()
-  return jsonify({'success': True})
-
-#  Artists
-#  ----------------------------------------------------------------
-@app.route('/artists')
-def artists():
-  data = Artist.query.all()
-  return render_template('pages/artists.html', artists=data)
-
-@app.route('/artists/search', methods=['POST'])
-def search_artists():
-  search_term = request.form.get('search_term', '').strip()
-  results = Artist.query.filter(Artist.name.ilike('%{}%'.format(search_term))).all()
-
-  artist_list = []
-  for artist in results:
-    artist_list.append({
-      "id": artist.id,
-      "name": artist.name,
-      "num_upcoming_shows": len(list(filter(lambda x: x.start_time > datetime.today(), artist.shows)))
-    })
-
-  response = {
-    "count": len(artist_list),
-    "data": artist_list
-  }
-  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
-
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-  artist = Artist.query.get(artist_id)
-  data = artist.to_dict()
-
-  past_shows = []
-  upcoming_shows = []
-  past_shows = db.session.query(Show).join(Venue).filter(Show.artist_id==artist_id).filter(Show.start_time < datetime.now()).all()
-  upcoming_shows = db.session.query(Show).join(Venue).filter(Show.artist_id==artist_id).filter(Show.start_time >= datetime.now()).all()
-
-  tmp = []
-  for show in past_shows:
-    tmp.append({
-      'venue_id': show.venue.id,
-      'venue_name': show.venue.name,
-      'venue_image_link': show.venue.image_link,
-      'start_time': show.start_time.isoformat()
-    })
-  past_shows = tmp
-
-  tmp = []
-  for show in upcoming_shows:
-    tmp.append({
-      'venue_id': show.venue.id,
-      'venue_name': show.venue.name,
-      'venue_image_link': show.venue.image_link,
-      'start_time': show.start_time.isoformat()
-    })
-  upcoming_shows = tmp
-
-  past_shows_count = len(past_shows)
-  upcoming_shows_count = len(upcoming_shows)
-  data["past_shows"] = past_shows
-  data["upcoming_shows"] = upcoming_shows
-  data["past_shows_count"] = past_shows_count
-  data["upcoming_shows_count"] = upcoming_shows_count
-
-  # Get genres
-  if (artist.genres is not None):
-     data['genres'] = artist.genres.split(',')
-  else:
-     data['genres'] = ""
-
-  return render_template('pages/show_artist.html', artist=data)
-
-#  Update
-#  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
-def edit_artist(artist_id):
-  form = ArtistForm(request.form)
-  artist = Artist.query.get(artist_id)
-  genres = artist.genres.split(',')
-  artist = artist.to_dict()
-  artist['website_link'] = artist['website']
-  artist['genres'] = genres
-  form = ArtistForm(formdata=None, data=artist)
-  return render_template('forms/edit_artist.html', form=form, artist=artist)
-
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
-def edit_artist_submission(artist_id):
-  artist = Artist.query.get(artist_id)
-  form = ArtistForm(request.form, meta={'csrf': False})
-  if not form.validate():
-    message = []
-    for field, err in form.errors.items():
-      message.append(field + ' - ' + '|'.join(err))
-    flash('Errors ' + str(message))
-    return redirect(url_for('edit_artist_submission', artist_id=artist_id))
-  else:
-    try:
-      artist.name = form.name.data
-      artist.city = form.city.data
-      artist.state = form.state.data
-      artist.phone = form.phone.data
-      artist.genres = ','.join(form.genres.data)
-      artist.facebook_link = form.facebook_link.data
-      artist.image_link = form.image_link.data
-      artist.website = form.website_link.data
-      artist.seeking_venue = form.seeking_venue.data
-      artist.seeking_description = form.seeking_description.data
-      db.session.commit()
-      flash('Artist: {0} updated successfully'.format(artist.name))
-    except Exception as err:
-      db.session.rollback()
-      print(sys.exc_info())
-      flash('An error occurred updating the Artist: {0}. Error: {1}'.format(artist.name, err))
-    finally:
-      db.session.close()
-    return redirect(url_for('show_artist', artist_id=artist_id))
-
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
-def edit_venue(venue_id):
-  form = VenueForm(request.form)
-  venue = Venue.query.get(venue_id)
-  genres = venue.genres.split(',')
-  venue = venue.to_dict()
-  venue['website_link'] = venue['website']
-  venue['genres'] = genres
-  form = VenueForm(formdata=None, data=venue)
-  return render_template('forms/edit_venue.html', form=form, venue=venue)
-
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
-def edit_venue_submission(venue_id):
-  venue = Venue.query.get(venue_id)
-  form = VenueForm(request.form, meta={'csrf': False})
-  if not form.validate():
-    message = []
-    for field, err in form.errors.items():
-      message.append(field + ' - ' + '|'.join(err))
-    flash('Errors ' + str(message))
-    return redirect(url_for('edit_venue_submission', venue_id=venue_id))
-  else:
-    try:
-      venue.name = form.name.data
-      venue.genres = ','.join(form.genres.data)
-      venue.address = form.address.data
-      venue.city = form.city.data
-      venue.state = form.state.data
-      venue.phone = form.phone.data
-      venue.website = form.website_link.data
-      venue.facebook_link = form.facebook_link.data
-      venue.image_link = form.image_link.data
-      venue.seeking_talent = form.seeking_talent.data
-      venue.seeking_description = form.seeking_description.data
-      db.session.commit()
-      flash('Venue: {0} updated successfully'.format(venue.name))
-    except Exception as err:
-      db.session.rollback()
-      print(sys.exc_info())
-      flash('An error occurred updating the Venue: {0}. Error: {1}'.format(venue.name, err))
-    finally:
-      db.session.close()
-    return redirect(url_for('show_venue', venue_id=venue_id))
-
-#  Create Artist
-#  ----------------------------------------------------------------
-
-@app.route('/artists/create', methods=['GET'])
-def create_artist_form():
-  form = ArtistForm()
-  return render_template('forms/new_artist.html', form=form)
-
-@app.route('/artists/create', methods=['POST'])
-def create_artist_submission():
-  form = ArtistForm(request.form, meta={'csrf': False})
-  if not form.validate():
-    message = []
-    for field, err in form.errors.items():
-      message.append(field + ' - ' + '|'.join(err))
-    flash('Errors ' + str(message))
-    return redirect(url_for('create_artist_submission'))
-  else:
-    try:
-      artist = Artist()
-      artist.name = form.name.data
-      artist.city = form.city.data
-      artist.state = form.state.data
-      artist.phone = form.phone.data
-      tmp_genres = request.form.getlist('genres')
-      artist.genres = ','.join(tmp_genres)
-      artist.facebook_link = form.facebook_link.data
-      artist.image_link = form.image_link.data
-      artist.website = form.website_link.data
-      artist.seeking_venue = form.seeking_venue.data
-      artist.seeking_description = form.seeking_description.data
-
-      db.session.add(artist)
-      db.session.commit()
-      flash('Artist: {0} created successfully'.format(artist.name))
-    except Exception as err:
-      db.session.rollback()
-      print(sys.exc_info())
-      flash('An error occurred creating the Artist: {0}. Error: {1}'.format(artist.name, err))
-    finally:
-      db.session.close()
-    return render_template('pages/home.html')
-
-#  Shows
-#  ----------------------------------------------------------------
-
-@app.route('/shows')
-def shows():
-  list = db.session.query(Show, Venue, Artist).join(Venue).join(Artist).order_by('start_time').all()
-  data = []
-
-  for item in list:
-    data.append({
-      'venue_id': item.Venue.id,
-      'venue_name': item.Venue.name,
-      'artist_id': item.Artist.id,
-      'artist_name': item.Artist.name,
-      'artist_image_link': item.Artist.image_link,
-      'start_time': item.Show.start_time.strftime('%Y-%m-%d %H:%I')
-    })
-  return render_template('pages/shows.html', shows=data)
-
-@app.route('/shows/create')
-def create_shows():
-  # renders form. do not touch.
-  form = ShowForm()
-  return render_template('forms/new_show.html', form=form)
-
-@app.route('/shows/create', methods=['POST'])
-def create_show_submission():
-  form = ShowForm(request.form, meta={'csrf': False})
-  if not form.validate():
-    message = []
-    for field, err in form.errors.items():
-      message.append(field + ' - ' + '|'.join(err))
-    flash('Errors ' + str(message))
-    return redirect(url_for('create_show_submission'))
-  else:
-    try:
-      show = Show()
-      show.venue_id = form.venue_id.data
-      show.artist_id = form.artist_id.data
-      show.start_time = form.start_time.data
-      db.session.add(show)
-      db.session.commit()
-      flash('Show created successfully!')
-    except Exception as err:
-      db.session.rollback()
-      print(sys.exc_info())
-      flash('An error occurred creating the Show. Error: {0}'.format(err))
-    finally:
-      db.session.close()
-    return render_template('pages/home.html')
-
-@app.errorhandler(404)
-def not_found_error(error):
-    return render_template('errors/404.html'), 404
-
-@app.errorhandler(500)
-def server_error(error):
-    return render_template('errors/500.html'), 500
-
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+    response_cache.invalidate('venues', 'artists')
+    click.echo('Recounted shows for every venue and artist.')
+    return
+
+  # Shows that started within the window, found by a start_time range scan
+  started = db.session.query(Show.venue_id, Show.artist_id) \
+    .filter(Show.start_time >= now - timedelta(minutes=window), Show.start_time < now) \
+    .all()
+  venue_ids = {show.venue_id for show in started}
+  artist_ids = {show.artist_id for show in started}
+  refresh_show_counts(venue_ids, artist_ids, now=now)
+  db.session.commit()
+  response_cache.invalidate(*['venue:{}'.format(id) for id in venue_ids] +
+                            ['artist:{}'.format(id) for id in artist_ids])
+  click.echo('Recounted shows for {} venues and {} artists.'.format(len(venue_ids), len(artist_ids)))
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -498,11 +166,11 @@ if not app.debug:
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
@@ -0,0 +1,199 @@
+#----------------------------------------------------------------------------#
+# Artist pages: the listing, search, detail pages and calendars, and the
+# create and edit handlers.
+#----------------------------------------------------------------------------#
+
+import sys
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+
+import autocomplete
+import calendars
+import fanout
+import feed
+import freshness
+import loading
+import replicas
+import search
+from cache import response_cache
+from forms import ArtistForm
+from models import db, Venue, Artist, Show, Genre, show_now
+from pagination import keyset_paginate
+
+bp = Blueprint('artists', __name__)
+
+@bp.route('/artists')
+@response_cache.cached('artists')
+def artists():
+  query = db.session.query(*loading.profile().columns)
+  page = keyset_paginate(query, [Artist.name, Artist.id],
+                         key=lambda row: (row.name, row.id),
+                         per_page=current_app.config['PAGE_SIZE'],
+                         after=request.args.get('after'), before=request.args.get('before'))
+  return render_template('pages/artists.html', artists=page.items, page=page)
+
+@bp.route('/artists/search', methods=['POST'])
+@replicas.use_replica
+def search_artists():
+  search_term = request.form.get('search_term', '').strip()
+  page = request.form.get('page', 1, type=int)
+  results = search.get_backend().search(Artist, search_term, page, current_app.config['SEARCH_PAGE_SIZE'])
+
+  artist_list = []
+  for artist in results.items:
+    artist_list.append({
+      "id": artist.id,
+      "name": artist.name,
+      "num_upcoming_shows": artist.upcoming_shows_count
+    })
+
+  response = {
+    "count": results.total,
+    "data": artist_list
+  }
+  return render_template('pages/search_artists.html', results=response, pagination=results, search_term=request.form.get('search_term', ''))
+
+# lists the artists tagged with a genre, through the genre index
+@bp.route('/artists/genres/<genre>')
+def artists_by_genre(genre):
+  artist_list = [{"id": artist.id, "name": artist.name} for artist in loading.profile().apply(Artist.by_genre(genre))]
+  response = {
+    "count": len(artist_list),
+    "data": artist_list
+  }
+  return render_template('pages/search_artists.html', results=response, search_term=genre)
+
+@bp.route('/artists/<int:artist_id>')
+@freshness.conditional(freshness.artist_freshness)
+@response_cache.cached('artist:{artist_id}')
+def show_artist(artist_id):
+  profile = loading.profile()
+  now = show_now()
+
+  # Both lists are (artist_id, start_time) range scans on the Show table,
+  # joined to the few Venue columns the page shows. They and the artist are
+  # loaded concurrently, see fanout.py.
+  def shows(*criteria):
+    return lambda: loading.shows_to_list(db.session.query(*profile.columns)
+                                 .join(Venue, Show.venue_id == Venue.id)
+                                 .filter(Show.artist_id == artist_id, *criteria)
+                                 .order_by(Show.start_time))
+
+  artist, past_shows, upcoming_shows = fanout.gather(
+    lambda: profile.query(Artist).get_or_404(artist_id),
+    shows(Show.start_time < now),
+    shows(Show.start_time >= now))
+  data = artist.to_dict()
+  response_cache.tag(*['venue:{}'.format(show['venue_id']) for show in past_shows + upcoming_shows])
+
+  data["past_shows"] = past_shows
+  data["upcoming_shows"] = upcoming_shows
+  data["past_shows_count"] = len(past_shows)
+  data["upcoming_shows_count"] = len(upcoming_shows)
+
+  data['genres'] = artist.genre_names
+
+  return render_template('pages/show_artist.html', artist=data)
+
+# the artist's shows in a range of days
+@bp.route('/artists/<int:artist_id>/calendar')
+def artist_calendar(artist_id):
+  artist = db.session.query(Artist.id, Artist.name).filter(Artist.id == artist_id).first_or_404()
+  return calendars.render(loading.profile().columns, request.args, artist.name, artist_id=artist.id)
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@replicas.use_primary
+def edit_artist(artist_id):
+  form = ArtistForm(request.form)
+  artist = loading.profile().query(Artist).get(artist_id)
+  genres = artist.genre_names
+  artist = artist.to_dict()
+  artist['website_link'] = artist['website']
+  artist['genres'] = genres
+  form = ArtistForm(formdata=None, data=artist)
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  artist = loading.profile().query(Artist).get(artist_id)
+  form = ArtistForm(request.form, meta={'csrf': False})
+  if not form.validate():
+    message = []
+    for field, err in form.errors.items():
+      message.append(field + ' - ' + '|'.join(err))
+    flash('Errors ' + str(message))
+    return redirect(url_for('artists.edit_artist_submission', artist_id=artist_id))
+  else:
+    try:
+      artist.name = form.name.data
+      artist.city = form.city.data
+      artist.state = form.state.data
+      artist.phone = form.phone.data
+      artist.genres = Genre.get_or_create(form.genres.data)
+      artist.facebook_link = form.facebook_link.data
+      artist.image_link = form.image_link.data
+      artist.website = form.website_link.data
+      artist.seeking_venue = form.seeking_venue.data
+      artist.seeking_description = form.seeking_description.data
+      feed.update_artist(artist)
+      search.get_backend().index(artist)
+      db.session.commit()
+      autocomplete.index(artist)
+      response_cache.invalidate('artists', 'artist:{}'.format(artist_id))
+      flash('Artist: {0} updated successfully'.format(artist.name))
+    except Exception as err:
+      db.session.rollback()
+      print(sys.exc_info())
+      flash('An error occurred updating the Artist: {0}. Error: {1}'.format(artist.name, err))
+    finally:
+      db.session.close()
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  form = ArtistForm(request.form, meta={'csrf': False})
+  if not form.validate():
+    message = []
+    for field, err in form.errors.items():
+      message.append(field + ' - ' + '|'.join(err))
+    flash('Errors ' + str(message))
+    return redirect(url_for('artists.create_artist_submission'))
+  else:
+    try:
+      artist = Artist()
+      artist.name = form.name.data
+      artist.city = form.city.data
+      artist.state = form.state.data
+      artist.phone = form.phone.data
+      artist.genres = Genre.get_or_create(request.form.getlist('genres'))
+      artist.facebook_link = form.facebook_link.data
+      artist.image_link = form.image_link.data
+      artist.website = form.website_link.data
+      artist.seeking_venue = form.seeking_venue.data
+      artist.seeking_description = form.seeking_description.data
+
+      db.session.add(artist)
+      db.session.flush()
+      search.get_backend().index(artist)
+      db.session.commit()
+      autocomplete.index(artist)
+      response_cache.invalidate('artists')
+      flash('Artist: {0} created successfully'.format(artist.name))
+    except Exception as err:
+      db.session.rollback()
+      print(sys.exc_info())
+      flash('An error occurred creating the Artist: {0}. Error: {1}'.format(artist.name, err))
+    finally:
+      db.session.close()
+    return render_template('pages/home.html')
@@ -0,0 +1,167 @@
+#----------------------------------------------------------------------------#
+# Fingerprinted, precompressed static assets.
+#
+#   flask assets build [--minify]
+#
+# copies every file of static/ to ASSETS_DIR under a name carrying a hash of
+# its content (css/main.css -> css/main.1f3c9a0b72de.css), rewriting the
+# url() references inside stylesheets to the hashed names, and writes .gz
+# and, with the brotli package installed, .br variants of the text files
+# next to them. manifest.json maps the source names to the hashed ones.
+# Files of earlier builds are left in place, so pages rendered (or cached)
+# before a rebuild keep working; empty ASSETS_DIR to prune them.
+#
+# Templates link assets with asset_url('css/main.css'), which resolves the
+# hashed name from the manifest, and falls back to the plain /static/ URL
+# for files that were not built (or before the first build). Hashed files
+# are served from /assets/ with a one-year immutable Cache-Control, as the
+# .br or .gz variant when the client accepts it.
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+# Worth compressing; images and web fonts other than SVG already are
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.ttf', '.eot', '.otf', '.json', '.txt', '.html')
+# Encodings in order of preference, with the suffix of their variant
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_CSS_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s*([{};,>])\s*')
+
+def hashed_name(name, content):
+  digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+  root, ext = posixpath.splitext(name)
+  return '{}.{}{}'.format(root, digest, ext)
+
+def minify_css(css):
+  # Conservative: drops comments (except /*! licences */) and the
+  # whitespace around punctuation; leaves everything else alone.
+  css = _CSS_COMMENT.sub('', css)
+  css = _CSS_SPACE.sub(r'\1', css)
+  return re.sub(r'\s+', ' ', css).strip()
+
+def rewrite_css_urls(css, name, manifest):
+  # url(../fonts/x.woff?v=1#id) -> url(../fonts/x.<hash>.woff?v=1#id)
+  base = posixpath.dirname(name)
+  def replace(match):
+    quote, url = match.groups()
+    if re.match(r'^(?:[a-z]+:|//|/|#)', url):
+      return match.group(0)
+    path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+    target = manifest.get(posixpath.normpath(posixpath.join(base, path)))
+    if target is None:
+      return match.group(0)
+    return 'url({0}{1}{2}{0})'.format(quote, posixpath.relpath(target, base or '.'), suffix)
+  return _CSS_URL.sub(replace, css)
+
+def write_variants(path, content):
+  with gzip.GzipFile(path + '.gz', 'wb', compresslevel=9, mtime=0) as f:
+    f.write(content)
+  if brotli is not None:
+    with open(path + '.br', 'wb') as f:
+      f.write(brotli.compress(content, quality=11))
+
+def build(source, output, minify=False):
+  """Build the hashed assets of source into output; returns the manifest."""
+  names = []
+  for root, dirs, files in os.walk(source):
+    dirs[:] = [d for d in dirs if os.path.join(root, d) != output]
+    for filename in files:
+      if not filename.startswith('.'):
+        names.append(os.path.relpath(os.path.join(root, filename), source).replace(os.sep, '/'))
+
+  manifest = {}
+  # Stylesheets last, so the files they reference already have their names
+  for name in sorted(names, key=lambda name: (name.endswith('.css'), name)):
+    with open(os.path.join(source, name), 'rb') as f:
+      content = f.read()
+    if name.endswith('.css'):
+      css = content.decode('utf-8')
+      if minify and not name.endswith('.min.css'):
+        css = minify_css(css)
+      content = rewrite_css_urls(css, name, manifest).encode('utf-8')
+
+    manifest[name] = hashed_name(name, content)
+    path = os.path.join(output, manifest[name])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+      f.write(content)
+    if name.endswith(COMPRESSIBLE):
+      write_variants(path, content)
+
+  with open(os.path.join(output, MANIFEST), 'w') as f:
+    json.dump(manifest, f, indent=2, sort_keys=True)
+  return manifest
+
+def load_manifest(app):
+  path = os.path.join(app.config['ASSETS_DIR'], MANIFEST)
+  if not os.path.exists(path):
+    return {}
+  with open(path) as f:
+    return json.load(f)
+
+def asset_url(filename):
+  """url_for('static', filename=...) for built assets: the hashed URL."""
+  manifest = current_app.extensions['assets']
+  if current_app.debug:
+    # Pick up a rebuild without a restart
+    manifest = load_manifest(current_app)
+  hashed = manifest.get(filename)
+  if hashed is None:
+    return url_for('static', filename=filename)
+  return url_for('assets', filename=hashed)
+
+def serve(filename):
+  directory = current_app.config['ASSETS_DIR']
+  mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+  served, encoding = filename, None
+  for name, suffix in ENCODINGS:
+    if name in request.accept_encodings and os.path.isfile(os.path.join(directory, filename + suffix)):
+      served, encoding = filename + suffix, name
+      break
+  response = send_from_directory(directory, served, mimetype=mimetype)
+  if encoding:
+    response.headers['Content-Encoding'] = encoding
+  if filename.endswith(COMPRESSIBLE):
+    response.vary.add('Accept-Encoding')
+  response.headers['Cache-Control'] = CACHE_CONTROL
+  return response
+
+assets_cli = AppGroup('assets', help='Static assets.')
+
+@assets_cli.command('build')
+@click.option('--minify/--no-minify', default=False, help='Minify stylesheets that are not .min.css yet.')
+def build_command(minify):
+  """Fingerprint and precompress static/ into ASSETS_DIR."""
+  app = current_app
+  manifest = build(app.static_folder, app.config['ASSETS_DIR'], minify)
+  app.extensions['assets'] = manifest
+  click.echo('Built {} assets into {}.'.format(len(manifest), app.config['ASSETS_DIR']))
+  if brotli is None:
+    click.echo('The brotli package is not installed; wrote gzip variants only.', err=True)
+
+def init_app(app):
+  app.config.setdefault('ASSETS_DIR', os.path.join(app.static_folder, 'dist'))
+  app.extensions['assets'] = load_manifest(app)
+  app.add_url_rule('/assets/<path:filename>', 'assets', serve)
+  app.jinja_env.globals['asset_url'] = asset_url
+  app.cli.add_command(assets_cli)
@@ -0,0 +1,152 @@
+#----------------------------------------------------------------------------#
+# Name autocomplete for the show booking form.
+#
+#   /autocomplete/venues?q=musical%20h
+#   /autocomplete/artists?q=gun&limit=5
+#
+# answer with the venues/artists whose name has a word starting with q, as
+# [{"id": ..., "name": ...}], from an in-memory PrefixIndex per model: a
+# sorted list of (word onwards, id) keys, searched with bisect. A lookup is
+# one bisect plus a walk over the matching keys, whatever the size of the
+# catalogue; nothing touches the database.
+#
+# Each process builds its index on its first lookup (one query), so an app
+# built before a pre-fork server forks stays cheap. The create and edit
+# handlers update the index of their process as they commit; other
+# processes, and 'flask import', are picked up by re-reading the rows
+# updated since the last sync, every AUTOCOMPLETE_REFRESH_SECONDS. A venue
+# deleted through another process is offered until this one restarts;
+# booking it fails.
+#----------------------------------------------------------------------------#
+
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+
+from models import db, Venue, Artist
+
+bp = Blueprint('autocomplete', __name__, url_prefix='/autocomplete')
+
+MODELS = (Venue, Artist)
+
+_lock = threading.Lock()
+
+def fold(text):
+  # Case- and spacing-insensitive form of names and prefixes
+  return ' '.join(text.casefold().split())
+
+class PrefixIndex(object):
+  """Names by id, searchable by the prefix of any of their words."""
+
+  def __init__(self):
+    self._keys = []
+    self._names = {}
+    self._lock = threading.Lock()
+    self.synced_at = None
+
+  @staticmethod
+  def keys(id, name):
+    # 'The Musical Hop' -> 'the musical hop', 'musical hop', 'hop'
+    words = fold(name).split(' ')
+    return [(' '.join(words[i:]), id) for i in range(len(words)) if words[i]]
+
+  def build(self, rows):
+    """Replace the index with (id, name) rows."""
+    names = {id: name for id, name in rows if name}
+    keys = sorted(key for id, name in names.items() for key in self.keys(id, name))
+    with self._lock:
+      self._keys, self._names = keys, names
+
+  def add(self, id, name):
+    """Index id under name, replacing the name it had."""
+    with self._lock:
+      self._discard(id)
+      if name:
+        self._names[id] = name
+        for key in self.keys(id, name):
+          insort(self._keys, key)
+
+  def remove(self, id):
+    with self._lock:
+      self._discard(id)
+
+  def _discard(self, id):
+    name = self._names.pop(id, None)
+    if name is not None:
+      for key in self.keys(id, name):
+        del self._keys[bisect_left(self._keys, key)]
+
+  def complete(self, prefix, limit=10):
+    """(id, name) of up to limit names with a word starting with prefix."""
+    prefix = fold(prefix)
+    if not prefix:
+      return []
+    results, seen = [], set()
+    with self._lock:
+      keys = self._keys
+      for i in range(bisect_left(keys, (prefix,)), len(keys)):
+        text, id = keys[i]
+        if not text.startswith(prefix):
+          break
+        if id not in seen:
+          seen.add(id)
+          results.append((id, self._names[id]))
+          if len(results) == limit:
+            break
+    return results
+
+  def __len__(self):
+    return len(self._names)
+
+def get_index(model):
+  """The PrefixIndex of model, built or brought up to date as needed."""
+  entry = current_app.extensions['autocomplete'][model.__name__]
+  refresh = current_app.config['AUTOCOMPLETE_REFRESH_SECONDS']
+  now = datetime.utcnow()
+  if entry.synced_at is not None and (not refresh or now - entry.synced_at < timedelta(seconds=refresh)):
+    return entry
+  with _lock:
+    if entry.synced_at is None:
+      entry.build(db.session.query(model.id, model.name))
+      entry.synced_at = now
+    elif now - entry.synced_at >= timedelta(seconds=refresh):
+      # Overlap the previous sync by a period: a row stamped just before it
+      # may have been committed just after
+      since = entry.synced_at - timedelta(seconds=refresh)
+      for id, name in db.session.query(model.id, model.name).filter(model.updated_at >= since):
+        entry.add(id, name)
+      entry.synced_at = now
+  return entry
+
+def index(obj):
+  """Index a venue or artist the handler just committed, if this process has built its index."""
+  entry = current_app.extensions['autocomplete'][type(obj).__name__]
+  if entry.synced_at is not None:
+    entry.add(obj.id, obj.name)
+
+def remove(model, id):
+  entry = current_app.extensions['autocomplete'][model.__name__]
+  if entry.synced_at is not None:
+    entry.remove(id)
+
+def complete(model):
+  prefix = request.args.get('q', '')[:100]
+  limit = request.args.get('limit', current_app.config['AUTOCOMPLETE_LIMIT'], type=int)
+  limit = max(1, min(limit, current_app.config['AUTOCOMPLETE_LIMIT']))
+  return jsonify([{'id': id, 'name': name} for id, name in get_index(model).complete(prefix, limit)])
+
+@bp.route('/venues')
+def venues():
+  return complete(Venue)
+
+@bp.route('/artists')
+def artists():
+  return complete(Artist)
+
+def init_app(app):
+  app.config.setdefault('AUTOCOMPLETE_LIMIT', 10)
+  app.config.setdefault('AUTOCOMPLETE_REFRESH_SECONDS', 60)
+  app.extensions['autocomplete'] = {model.__name__: PrefixIndex() for model in MODELS}
+  app.register_blueprint(bp)
@@ -0,0 +1 @@
+# Benchmarks and the synthetic data they run against. See bench/run.py.
@@ -0,0 +1,51 @@
+#----------------------------------------------------------------------------#
+# Micro-benchmark of the autocomplete PrefixIndex.
+#
+#   python -m bench.autocomplete [--names 100000] [--lookups 10000]
+#
+# Builds an index of generated venue-style names, then times lookups for
+# prefixes of one to six letters and incremental updates, and prints the
+# build time and the p50/p99 time per lookup and per update.
+#----------------------------------------------------------------------------#
+
+import argparse
+import random
+import time
+
+from bench.run import percentile
+from bench.seed import WORDS
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Time PrefixIndex lookups over a large catalogue.')
+  parser.add_argument('--names', type=int, default=100000)
+  parser.add_argument('--lookups', type=int, default=10000)
+  parser.add_argument('--seed', type=int, default=1)
+  args = parser.parse_args(argv)
+
+  from autocomplete import PrefixIndex
+
+  rng = random.Random(args.seed)
+  rows = [(id, '{} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS), id)) for id in range(1, args.names + 1)]
+  index = PrefixIndex()
+  start = time.perf_counter()
+  index.build(rows)
+  print('build            {:>8.1f} ms for {} names'.format((time.perf_counter() - start) * 1000, len(index)))
+
+  lookups = []
+  for _ in range(args.lookups):
+    prefix = rng.choice(WORDS)[:rng.randint(1, 6)]
+    start = time.perf_counter()
+    index.complete(prefix)
+    lookups.append((time.perf_counter() - start) * 1000)
+  print('lookup           p50 {:>7.4f} ms  p99 {:>7.4f} ms'.format(percentile(lookups, 50), percentile(lookups, 99)))
+
+  updates = []
+  for _ in range(min(args.lookups, 1000)):
+    id = rng.randint(1, args.names)
+    start = time.perf_counter()
+    index.add(id, '{} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS), id))
+    updates.append((time.perf_counter() - start) * 1000)
+  print('update           p50 {:>7.4f} ms  p99 {:>7.4f} ms'.format(percentile(updates, 50), percentile(updates, 99)))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,61 @@
+#----------------------------------------------------------------------------#
+# Micro-benchmark of the 'datetime' template filter.
+#
+#   python -m bench.datetimes [--count 500] [--repeat 20]
+#
+# Formats one page worth of show start times the way the pages did before
+# (isoformat() in the view, dateutil parse plus babel.dates.format_datetime
+# in the filter) and the way they do now (datetimes straight into the
+# filter), and prints the best time per page for each.
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+def legacy_format_datetime(value, format='medium'):
+  date = dateutil.parser.parse(value)
+  if format == 'full':
+      format="EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+      format="EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format, locale='en')
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Time the datetime filter over one page of shows.')
+  parser.add_argument('--count', type=int, default=500, help='Start times per page.')
+  parser.add_argument('--repeat', type=int, default=20)
+  args = parser.parse_args(argv)
+
+  os.environ.setdefault('SECRET_KEY', 'bench')
+  os.environ.setdefault('ERROR_LOG', '')
+  from app import create_app, format_datetime
+
+  start = datetime(2021, 6, 1, 20, 0)
+  times = [start + timedelta(hours=7 * i, minutes=15 * (i % 4)) for i in range(args.count)]
+
+  with create_app().app_context():
+    assert [format_datetime(t, 'full') for t in times] == \
+      [legacy_format_datetime(t.isoformat(), 'full') for t in times]
+
+    def legacy():
+      for t in times:
+        legacy_format_datetime(t.isoformat(), 'full')
+
+    def current():
+      for t in times:
+        format_datetime(t, 'full')
+
+    results = {}
+    for name, run in (('isoformat + parse', legacy), ('datetime', current)):
+      results[name] = min(timeit.repeat(run, number=1, repeat=args.repeat)) * 1000
+      print('{:<20} {:>8.2f} ms per {} start times'.format(name, results[name], args.count))
+  print('speedup {:.1f}x'.format(results['isoformat + parse'] / results['datetime']))
+  return results
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,413 @@
+#----------------------------------------------------------------------------#
+# Route benchmark.
+#
+#   python -m bench.run --venues 1000 --artists 2000 --shows 50000 \
+#     --iterations 50 --output bench.json [--compare baseline.json]
+#
+# Seeds a throwaway database (a temporary SQLite file unless --database is
+# given), then drives every route of the app through Flask's test client
+# and records, per route, latency percentiles, the number of SQL statements
+# per request and the peak Python memory allocated by one request. Results
+# are written as JSON with sorted keys, so runs on two commits can be
+# diffed directly or with --compare. With --check, a route running more
+# statements than its budget in loading.py fails the run.
+#
+# --db-latency adds a delay to every statement, standing in for the round
+# trip to a database server; compare --fanout-workers 0 against the default
+# to see what running a detail page's queries concurrently buys.
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+SEARCH_TERMS = ['the', 'blue', 'velvet 1', 'ja', 'New York, NY', 'electric']
+PREFIXES = ['b', 'blu', 'velvet', 'e', 'golden h', 'x']
+
+# Endpoints that are not part of the application's own pages
+SKIPPED = {'static', 'assets', 'cache_stats', 'profiles_index', 'profile_download', 'profile_summary'}
+
+def venue_form(rng, id):
+  return {
+    'name': 'Bench Venue {}'.format(id),
+    'city': 'Austin',
+    'state': 'TX',
+    'address': '{} Congress Ave'.format(rng.randint(1, 999)),
+    'phone': '512-555-0100',
+    'genres': ['Jazz', 'Blues'],
+    'image_link': 'https://images.example.com/venue/{}.jpg'.format(id),
+    'facebook_link': '',
+    'website_link': '',
+    'seeking_description': '',
+  }
+
+def artist_form(rng, id):
+  return {
+    'name': 'Bench Artist {}'.format(id),
+    'city': 'Austin',
+    'state': 'TX',
+    'phone': '512-555-0199',
+    'genres': ['Rock n Roll'],
+    'image_link': 'https://images.example.com/artist/{}.jpg'.format(id),
+    'facebook_link': '',
+    'website_link': '',
+    'seeking_description': '',
+  }
+
+class Scenarios(object):
+  """One request per call for each endpoint: (method, url, form data).
+
+  Methods are named after endpoints (dots replaced by underscores); an
+  endpoint without a method is requested with GET if its URL takes no
+  arguments, and reported as skipped otherwise.
+  """
+
+  def __init__(self, rng, sizes):
+    self.rng = rng
+    self.sizes = sizes
+    self.counter = 0
+
+  def venue_id(self):
+    return self.rng.randint(1, self.sizes['venues'])
+
+  def artist_id(self):
+    return self.rng.randint(1, self.sizes['artists'])
+
+  def next_id(self):
+    self.counter += 1
+    return self.counter
+
+  def cursor(self, model, columns):
+    from models import db
+    from pagination import encode_cursor
+    row = db.session.query(*columns).filter(model.id == self.rng.randint(1, self.sizes[model.__tablename__.lower() + 's'])).first()
+    return encode_cursor(row)
+
+  def venues_venues(self):
+    from models import Venue
+    return 'GET', '/venues?after=' + self.cursor(Venue, [Venue.state, Venue.city, Venue.id]), None
+
+  def artists_artists(self):
+    from models import Artist
+    return 'GET', '/artists?after=' + self.cursor(Artist, [Artist.name, Artist.id]), None
+
+  def shows_shows(self):
+    from models import Show
+    return 'GET', '/shows?after=' + self.cursor(Show, [Show.start_time, Show.id]), None
+
+  def calendar_range(self):
+    # A year of shows, streamed in chunks
+    first = datetime.now().date() - timedelta(days=self.rng.randint(0, 365))
+    return 'from={}&to={}'.format(first.isoformat(), (first + timedelta(days=365)).isoformat())
+
+  def venues_venue_calendar(self):
+    return 'GET', '/venues/{}/calendar?{}'.format(self.venue_id(), self.calendar_range()), None
+
+  def artists_artist_calendar(self):
+    return 'GET', '/artists/{}/calendar?{}'.format(self.artist_id(), self.calendar_range()), None
+
+  def venues_show_venue(self):
+    return 'GET', '/venues/{}'.format(self.venue_id()), None
+
+  def artists_show_artist(self):
+    return 'GET', '/artists/{}'.format(self.artist_id()), None
+
+  def venues_edit_venue(self):
+    return 'GET', '/venues/{}/edit'.format(self.venue_id()), None
+
+  def artists_edit_artist(self):
+    return 'GET', '/artists/{}/edit'.format(self.artist_id()), None
+
+  def venues_venues_by_genre(self):
+    return 'GET', '/venues/genres/Jazz', None
+
+  def artists_artists_by_genre(self):
+    return 'GET', '/artists/genres/Jazz', None
+
+  def venues_search_venues(self):
+    return 'POST', '/venues/search', {'search_term': self.rng.choice(SEARCH_TERMS)}
+
+  def artists_search_artists(self):
+    return 'POST', '/artists/search', {'search_term': self.rng.choice(SEARCH_TERMS)}
+
+  def venues_create_venue_submission(self):
+    return 'POST', '/venues/create', venue_form(self.rng, self.next_id())
+
+  def artists_create_artist_submission(self):
+    return 'POST', '/artists/create', artist_form(self.rng, self.next_id())
+
+  def venues_edit_venue_submission(self):
+    return 'POST', '/venues/{}/edit'.format(self.venue_id()), venue_form(self.rng, self.next_id())
+
+  def artists_edit_artist_submission(self):
+    return 'POST', '/artists/{}/edit'.format(self.artist_id()), artist_form(self.rng, self.next_id())
+
+  def shows_create_show_submission(self):
+    start_time = datetime.now() + timedelta(days=self.rng.randint(1, 365), hours=self.rng.randint(0, 23))
+    return 'POST', '/shows/create', {
+      'venue_id': str(self.venue_id()),
+      'artist_id': str(self.artist_id()),
+      'start_time': start_time.strftime('%Y-%m-%d %H:00:00'),
+    }
+
+  def venues_delete_venue(self):
+    # A fresh venue without shows, created outside the timed request
+    from models import db, Venue
+    venue = Venue(name='Bench Venue to delete', city='Austin', state='TX')
+    db.session.add(venue)
+    db.session.commit()
+    id = venue.id
+    db.session.remove()
+    return 'DELETE', '/venues/{}'.format(id), None
+
+  def api_venues(self):
+    return 'GET', '/api/v1' + self.venues_venues()[1], None
+
+  def api_artists(self):
+    return 'GET', '/api/v1' + self.artists_artists()[1], None
+
+  def api_shows(self):
+    return 'GET', '/api/v1' + self.shows_shows()[1], None
+
+  def api_venue(self):
+    return 'GET', '/api/v1' + self.venues_show_venue()[1], None
+
+  def api_artist(self):
+    return 'GET', '/api/v1' + self.artists_show_artist()[1], None
+
+  def autocomplete_venues(self):
+    return 'GET', '/autocomplete/venues?q=' + self.rng.choice(PREFIXES), None
+
+  def autocomplete_artists(self):
+    return 'GET', '/autocomplete/artists?q=' + self.rng.choice(PREFIXES), None
+
+  def export_dump(self):
+    # A whole table, gzipped
+    from flask import current_app
+    from export import make_token
+    return 'GET', '/export/{}.{}.gz?token={}'.format(
+      self.rng.choice(['venues', 'artists', 'shows']), self.rng.choice(['csv', 'ndjson']),
+      make_token(current_app)), None
+
+  def request_for(self, rule):
+    scenario = getattr(self, rule.endpoint.replace('.', '_'), None)
+    if scenario is not None:
+      return scenario
+    if not rule.arguments and 'GET' in rule.methods:
+      return lambda: ('GET', rule.rule, None)
+    return None
+
+class QueryCounter(object):
+  def __init__(self):
+    self.count = 0
+    self._lock = threading.Lock()
+
+  def __call__(self, conn, cursor, statement, parameters, context, executemany):
+    with self._lock:
+      self.count += 1
+
+class Latency(object):
+  def __init__(self, ms):
+    self.seconds = ms / 1000.0
+
+  def __call__(self, conn, cursor, statement, parameters, context, executemany):
+    time.sleep(self.seconds)
+
+def percentile(values, pct):
+  values = sorted(values)
+  index = min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+  return values[index]
+
+def bench_route(app, client, scenario, iterations, counter):
+  latencies = []
+  queries = []
+  statuses = set()
+  for i in range(iterations + 1):
+    with app.app_context():
+      method, url, data = scenario()
+    counter.count = 0
+    start = time.perf_counter()
+    response = client.open(url, method=method, data=data)
+    elapsed = time.perf_counter() - start
+    response.get_data()
+    statuses.add(response.status_code)
+    if i:
+      # The first request warms up templates and caches
+      latencies.append(elapsed * 1000)
+      queries.append(counter.count)
+
+  with app.app_context():
+    method, url, data = scenario()
+  tracemalloc.start()
+  client.open(url, method=method, data=data).get_data()
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  return {
+    'requests': iterations,
+    'status': sorted(statuses),
+    'latency_ms': {
+      'mean': round(statistics.mean(latencies), 3),
+      'p50': round(percentile(latencies, 50), 3),
+      'p90': round(percentile(latencies, 90), 3),
+      'p99': round(percentile(latencies, 99), 3),
+      'max': round(max(latencies), 3),
+    },
+    'queries': {
+      'min': min(queries),
+      'median': statistics.median(queries),
+      'max': max(queries),
+    },
+    'peak_memory_kb': round(peak / 1024.0, 1),
+  }
+
+def git_commit():
+  try:
+    return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def compare(baseline, results):
+  print('{:<32} {:>10} {:>10} {:>8} {:>10} {:>10}'.format(
+    'route', 'p50 base', 'p50 new', 'p50 x', 'queries', 'base'))
+  for name, new in sorted(results['routes'].items()):
+    old = baseline['routes'].get(name)
+    if not old:
+      continue
+    ratio = new['latency_ms']['p50'] / old['latency_ms']['p50'] if old['latency_ms']['p50'] else float('inf')
+    print('{:<32} {:>10.2f} {:>10.2f} {:>8.2f} {:>10} {:>10}'.format(
+      name, old['latency_ms']['p50'], new['latency_ms']['p50'], ratio,
+      new['queries']['max'], old['queries']['max']))
+
+def check_budgets(results):
+  # Returns one line per route over its query budget or without one
+  import loading
+  problems = []
+  for name, route in sorted(results['routes'].items()):
+    budget = loading.max_queries(name)
+    if budget is None:
+      problems.append('{}: no max_queries in loading.PROFILES'.format(name))
+    elif route['queries']['max'] > budget:
+      problems.append('{}: {} queries, budget {}'.format(name, route['queries']['max'], budget))
+  return problems
+
+def run(args):
+  """Bench every route against args.database; returns the results."""
+  os.environ['DATABASE_URL'] = args.database
+  # Throwaway catalogue, throwaway sessions
+  os.environ.setdefault('SECRET_KEY', 'bench')
+  os.environ.setdefault('ERROR_LOG', '')
+  if args.fanout_workers is not None:
+    os.environ['DETAIL_FANOUT_WORKERS'] = str(args.fanout_workers)
+
+  from sqlalchemy import event
+  from sqlalchemy.engine import Engine
+  from app import create_app
+  from bench.seed import seed
+
+  app = create_app()
+
+  app.config['CACHE_ENABLED'] = args.cache
+  sizes = {'venues': args.venues, 'artists': args.artists, 'shows': args.shows}
+  with app.app_context():
+    seed(args.venues, args.artists, args.shows, args.past_ratio, args.seed)
+    dialect = app.extensions['sqlalchemy'].db.engine.dialect.name
+
+  counter = QueryCounter()
+  event.listen(Engine, 'before_cursor_execute', counter)
+  if args.db_latency:
+    event.listen(Engine, 'before_cursor_execute', Latency(args.db_latency))
+  client = app.test_client()
+  scenarios = Scenarios(random.Random(args.seed), sizes)
+
+  routes = {}
+  skipped = []
+  # Writes last, so the read routes see the seeded catalogue unchanged
+  rules = sorted(app.url_map.iter_rules(), key=lambda rule: ('GET' not in rule.methods, rule.endpoint))
+  for rule in rules:
+    if rule.endpoint in SKIPPED or rule.endpoint in routes or (args.routes and rule.endpoint not in args.routes):
+      # An endpoint with several rules (export.dump) is benched once
+      continue
+    scenario = scenarios.request_for(rule)
+    if scenario is None:
+      skipped.append(rule.endpoint)
+      continue
+    routes[rule.endpoint] = bench_route(app, client, scenario, args.iterations, counter)
+    print('{:<32} p50 {:>8.2f} ms  p99 {:>8.2f} ms  {:>4} queries'.format(
+      rule.endpoint, routes[rule.endpoint]['latency_ms']['p50'],
+      routes[rule.endpoint]['latency_ms']['p99'], routes[rule.endpoint]['queries']['max']))
+
+  results = {
+    'meta': {
+      'commit': git_commit(),
+      'python': platform.python_version(),
+      'database': dialect,
+      'sizes': sizes,
+      'past_ratio': args.past_ratio,
+      'seed': args.seed,
+      'iterations': args.iterations,
+      'cache': args.cache,
+      'db_latency_ms': args.db_latency,
+      'fanout_workers': app.config['DETAIL_FANOUT_WORKERS'],
+      'timestamp': datetime.utcnow().isoformat() + 'Z',
+    },
+    'routes': routes,
+    'skipped': sorted(skipped),
+  }
+  if skipped:
+    print('No scenario for: ' + ', '.join(sorted(skipped)), file=sys.stderr)
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+  if args.compare:
+    with open(args.compare) as f:
+      compare(json.load(f), results)
+  if args.check:
+    problems = check_budgets(results)
+    for problem in problems:
+      print('Over budget: ' + problem, file=sys.stderr)
+    if problems:
+      sys.exit(1)
+  return results
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark every route against a synthetic catalogue.')
+  parser.add_argument('--database', help='SQLAlchemy URL of a throwaway database. [default: a temporary SQLite file]')
+  parser.add_argument('--venues', type=int, default=200)
+  parser.add_argument('--artists', type=int, default=400)
+  parser.add_argument('--shows', type=int, default=5000)
+  parser.add_argument('--past-ratio', type=float, default=0.6)
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--iterations', type=int, default=30, help='Timed requests per route.')
+  parser.add_argument('--routes', nargs='*', help='Only these endpoints.')
+  parser.add_argument('--cache', action='store_true', help='Leave the page cache on.')
+  parser.add_argument('--db-latency', type=float, default=0, help='Milliseconds added to every SQL statement.')
+  parser.add_argument('--fanout-workers', type=int, help='DETAIL_FANOUT_WORKERS. [default: the config]')
+  parser.add_argument('--output', help='Write the results here as JSON.')
+  parser.add_argument('--compare', help='Print p50 changes against an earlier results file.')
+  parser.add_argument('--check', action='store_true', help='Exit with an error if a route is over its query budget.')
+  args = parser.parse_args(argv)
+
+  tmpdir = None
+  if not args.database:
+    tmpdir = tempfile.mkdtemp(prefix='fyyur-bench-')
+    args.database = 'sqlite:///' + os.path.join(tmpdir, 'bench.db')
+  try:
+    return run(args)
+  finally:
+    if tmpdir:
+      shutil.rmtree(tmpdir, ignore_errors=True)
+
+if __name__ == '__main__':
+  main()
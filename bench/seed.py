@@ -0,0 +1,158 @@
+#----------------------------------------------------------------------------#
+# Synthetic catalogue generator.
+#
+#   python -m bench.seed --database sqlite:////tmp/fyyur.db \
+#     --venues 1000 --artists 2000 --shows 50000
+#
+# Creates the tables in a throwaway database and fills them with venues,
+# artists and shows spread over a fixed set of cities, with a skewed genre
+# distribution and a configurable share of past shows. The same --seed
+# always produces the same catalogue.
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import random
+from datetime import timedelta
+
+CITIES = [
+  ('New York', 'NY', 12), ('Los Angeles', 'CA', 9), ('Chicago', 'IL', 6),
+  ('San Francisco', 'CA', 6), ('Austin', 'TX', 5), ('Nashville', 'TN', 5),
+  ('Seattle', 'WA', 4), ('New Orleans', 'LA', 4), ('Boston', 'MA', 3),
+  ('Denver', 'CO', 3), ('Atlanta', 'GA', 3), ('Portland', 'OR', 2),
+  ('Detroit', 'MI', 2), ('Memphis', 'TN', 2), ('Minneapolis', 'MN', 1),
+  ('Miami', 'FL', 1),
+]
+
+WORDS = [
+  'Blue', 'Velvet', 'Electric', 'Golden', 'Midnight', 'Silver', 'Crimson',
+  'Echo', 'Lantern', 'Harbor', 'Summit', 'Wild', 'Neon', 'Rusty', 'Lucky',
+  'Hollow', 'Iron', 'Paper', 'Quiet', 'Copper',
+]
+
+BATCH_SIZE = 10000
+
+def genre_choices():
+  from forms import VenueForm
+  return [value for value, _ in VenueForm.genres.kwargs['choices']]
+
+def pick_genres(rng, genres, weights):
+  return set(rng.choices(genres, weights=weights, k=rng.randint(1, 3)))
+
+def insert(table, rows):
+  from models import db
+  for start in range(0, len(rows), BATCH_SIZE):
+    db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+def seed(venues=200, artists=400, shows=5000, past_ratio=0.6, seed=1, now=None):
+  """Create the tables and fill them; call inside an app context."""
+  from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres, refresh_show_counts, show_now
+  from booking import IntervalIndex
+  import feed
+  import search
+
+  rng = random.Random(seed)
+  now = (now or show_now()).replace(minute=0, second=0, microsecond=0)
+  db.drop_all()
+  db.create_all()
+
+  genres = genre_choices()
+  # Zipf-like popularity: a few genres dominate
+  weights = [1.0 / (rank + 1) for rank in range(len(genres))]
+  insert(Genre.__table__, [{'id': id, 'name': name} for id, name in enumerate(genres, 1)])
+  genre_ids = {name: id for id, name in enumerate(genres, 1)}
+
+  places = [(city, state) for city, state, _ in CITIES]
+  place_weights = [weight for _, _, weight in CITIES]
+
+  def entity(id, kind):
+    city, state = rng.choices(places, weights=place_weights)[0]
+    return {
+      'id': id,
+      'name': '{} {} {}'.format(rng.choice(WORDS), rng.choice(WORDS), id),
+      'city': city,
+      'state': state,
+      'phone': '{}-{}-{}'.format(rng.randint(200, 999), rng.randint(100, 999), rng.randint(1000, 9999)),
+      'website': 'https://example.com/{}/{}'.format(kind, id),
+      'facebook_link': 'https://www.facebook.com/{}{}'.format(kind, id),
+      'image_link': 'https://images.example.com/{}/{}.jpg'.format(kind, id),
+      'seeking_description': 'Looking for {} to play with.'.format(rng.choice(genres)),
+    }
+
+  venue_rows = []
+  venue_links = []
+  for id in range(1, venues + 1):
+    row = entity(id, 'venue')
+    row['address'] = '{} {} St'.format(rng.randint(1, 9999), rng.choice(WORDS))
+    row['seeking_talent'] = rng.random() < 0.3
+    venue_rows.append(row)
+    venue_links.extend({'venue_id': id, 'genre_id': genre_ids[name]}
+                       for name in pick_genres(rng, genres, weights))
+  insert(Venue.__table__, venue_rows)
+  insert(venue_genres, venue_links)
+
+  artist_rows = []
+  artist_links = []
+  for id in range(1, artists + 1):
+    row = entity(id, 'artist')
+    row['seeking_venue'] = rng.random() < 0.3
+    artist_rows.append(row)
+    artist_links.extend({'artist_id': id, 'genre_id': genre_ids[name]}
+                        for name in pick_genres(rng, genres, weights))
+  insert(Artist.__table__, artist_rows)
+  insert(artist_genres, artist_links)
+
+  # Draw again until the show double-books neither its venue nor its artist
+  venue_slots = IntervalIndex(Show.MAX_DURATION)
+  artist_slots = IntervalIndex(Show.MAX_DURATION)
+  show_rows = []
+  for id in range(1, shows + 1):
+    while True:
+      if rng.random() < past_ratio:
+        start_time = now - timedelta(hours=rng.randint(1, 2 * 365 * 24))
+      else:
+        start_time = now + timedelta(hours=rng.randint(1, 365 * 24))
+      end_time = start_time + timedelta(hours=rng.choice((1, 2, 2, 3)))
+      venue_id = rng.randint(1, venues)
+      artist_id = rng.randint(1, artists)
+      if not venue_slots.find(venue_id, start_time, end_time) and \
+         not artist_slots.find(artist_id, start_time, end_time):
+        break
+    venue_slots.add(venue_id, start_time, end_time)
+    artist_slots.add(artist_id, start_time, end_time)
+    show_rows.append({
+      'id': id,
+      'venue_id': venue_id,
+      'artist_id': artist_id,
+      'start_time': start_time,
+      'end_time': end_time,
+    })
+  insert(Show.__table__, show_rows)
+
+  refresh_show_counts()
+  feed.rebuild()
+  db.session.commit()
+  search.get_backend().rebuild()
+
+def main():
+  parser = argparse.ArgumentParser(description='Fill a throwaway database with a synthetic catalogue.')
+  parser.add_argument('--database', required=True, help='SQLAlchemy URL of the database to (re)create.')
+  parser.add_argument('--venues', type=int, default=200)
+  parser.add_argument('--artists', type=int, default=400)
+  parser.add_argument('--shows', type=int, default=5000)
+  parser.add_argument('--past-ratio', type=float, default=0.6, help='Share of shows in the past.')
+  parser.add_argument('--seed', type=int, default=1)
+  args = parser.parse_args()
+
+  os.environ['DATABASE_URL'] = args.database
+  # Throwaway catalogue, throwaway sessions
+  os.environ.setdefault('SECRET_KEY', 'bench')
+  os.environ.setdefault('ERROR_LOG', '')
+  from app import create_app
+  with create_app().app_context():
+    seed(args.venues, args.artists, args.shows, args.past_ratio, args.seed)
+  print('Seeded {} venues, {} artists and {} shows into {}'.format(
+    args.venues, args.artists, args.shows, args.database))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,83 @@
+#----------------------------------------------------------------------------#
+# Cold start budget.
+#
+#   python -m bench.startup [--runs 5] [--budget 2000]
+#
+# Starts fresh interpreters that each import app, call create_app() and
+# serve one request for the home page from a small seeded SQLite database,
+# and prints how long each step took. The median of import + create_app() +
+# first request is what a new worker costs before it answers; the run exits
+# with an error when it is over --budget milliseconds, so a module-level
+# import or a query at startup that creeps back in fails 'fab test'.
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+STEPS = ('import', 'create_app', 'first_request')
+BUDGET_MS = 2000
+
+# Run in each fresh interpreter; prints the milliseconds of every step
+CHILD = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+response = application.test_client().get('/')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+  'import': (imported - start) * 1000,
+  'create_app': (created - imported) * 1000,
+  'first_request': (served - created) * 1000,
+}))
+'''
+
+def cold_start(root, env):
+  output = subprocess.check_output([sys.executable, '-c', CHILD], cwd=root, env=env)
+  return json.loads(output.decode().strip().splitlines()[-1])
+
+def measure(runs):
+  """The step times of runs cold starts against a small seeded catalogue."""
+  root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  tmpdir = tempfile.mkdtemp(prefix='fyyur-startup-')
+  try:
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmpdir, 'startup.db'))
+    env.setdefault('SECRET_KEY', 'bench')
+    env.setdefault('ERROR_LOG', os.path.join(tmpdir, 'error.log'))
+    subprocess.check_call([sys.executable, '-m', 'bench.seed', '--database', env['DATABASE_URL'],
+                           '--venues', '20', '--artists', '40', '--shows', '200'],
+                          cwd=root, env=env, stdout=subprocess.DEVNULL)
+    return [cold_start(root, env) for _ in range(runs)]
+  finally:
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+def median_total(runs):
+  return statistics.median(sum(run[step] for step in STEPS) for run in runs)
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Time a cold import, create_app() and first request.')
+  parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start.')
+  parser.add_argument('--budget', type=float, default=BUDGET_MS, help='Milliseconds allowed for the median total.')
+  args = parser.parse_args(argv)
+
+  runs = measure(args.runs)
+  for step in STEPS:
+    print('{:<14} median {:>8.1f} ms  max {:>8.1f} ms'.format(
+      step, statistics.median(run[step] for run in runs), max(run[step] for run in runs)))
+  total = median_total(runs)
+  print('{:<14} median {:>8.1f} ms  budget {:>6.0f} ms'.format('total', total, args.budget))
+  if total > args.budget:
+    print('Cold start is over its budget.', file=sys.stderr)
+    sys.exit(1)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,162 @@
+#----------------------------------------------------------------------------#
+# Double-booking checks.
+#
+# A show holds its venue and its artist for [start_time, end_time); two
+# shows of the same venue, or of the same artist, must not overlap. On
+# Postgres the database enforces this with two exclusion constraints over
+# tsrange(start_time, end_time), backed by GiST indexes (see models.py).
+# On every database, new shows are checked before they are written against
+# an IntervalIndex of the existing shows around them. Those are loaded per
+# venue and per artist, as one (venue_id|artist_id, start_time) index range
+# around each new show (nearby ones merged), so a schedule spread over a
+# year reads the shows near it, not the whole year of the table. The same
+# check runs over whole schedules, e.g. an import batch, where each show is
+# also checked against the ones before it. It first checks that the venues
+# and artists exist: SQLite does not enforce the foreign keys, and the
+# /shows feed joins them.
+#----------------------------------------------------------------------------#
+
+import bisect
+import functools
+from collections import defaultdict
+
+from models import db, Venue, Artist, Show
+
+class IntervalIndex(object):
+  """Half-open [start, end) intervals per key, sorted by start.
+
+  No interval is longer than max_length, so only the intervals starting in
+  (start - max_length, end) can overlap [start, end): a bisect plus a short
+  scan back.
+  """
+
+  def __init__(self, max_length):
+    self.max_length = max_length
+    self._starts = defaultdict(list)
+    self._entries = defaultdict(list)
+
+  def find(self, key, start, end):
+    """An (start, end, value) entry of key overlapping [start, end), or None."""
+    starts = self._starts.get(key)
+    if not starts:
+      return None
+    entries = self._entries[key]
+    earliest = start - self.max_length
+    i = bisect.bisect_left(starts, end) - 1
+    while i >= 0 and starts[i] > earliest:
+      if entries[i][1] > start:
+        return entries[i]
+      i -= 1
+    return None
+
+  def add(self, key, start, end, value=None):
+    starts = self._starts[key]
+    i = bisect.bisect_right(starts, start)
+    starts.insert(i, start)
+    self._entries[key].insert(i, (start, end, value))
+
+  def __len__(self):
+    return sum(len(starts) for starts in self._starts.values())
+
+# Index ranges per query: each takes three bound parameters and a link in
+# an OR chain, both of which SQLite caps
+RANGES_PER_QUERY = 100
+
+# Compiled range queries, one per shape: compiling a hundred ranges costs
+# more than running them
+_compiled = {}
+
+def windows(spans, max_length):
+  """The start_time windows (low, high) that existing shows overlapping any
+  of the [start, end) spans start in, merged where they touch."""
+  merged = []
+  for start, end in sorted(spans):
+    low = start - max_length
+    if merged and low <= merged[-1][1]:
+      merged[-1][1] = max(merged[-1][1], end)
+    else:
+      merged.append([low, end])
+  return [tuple(window) for window in merged]
+
+@functools.lru_cache(maxsize=None)
+def ranges_query(name, size):
+  """The shows in size (name, start_time) ranges, given as key<n>, low<n>
+  and high<n> parameters."""
+  table = Show.__table__
+  column, start_time = table.c[name], table.c.start_time
+  return db.select([column, start_time, table.c.end_time, table.c.id]).where(db.or_(*[
+    db.and_(column == db.bindparam('key{}'.format(n)),
+            start_time > db.bindparam('low{}'.format(n)),
+            start_time < db.bindparam('high{}'.format(n)))
+    for n in range(size)]))
+
+def load_index(column, spans):
+  """An IntervalIndex of the existing shows of venues (column Show.venue_id)
+  or artists (Show.artist_id) that could overlap spans, {key: [(start, end)]}."""
+  index = IntervalIndex(Show.MAX_DURATION)
+  ranges = [(key, low, high) for key in sorted(spans) for low, high in windows(spans[key], Show.MAX_DURATION)]
+  connection = db.session.connection(mapper=Show.__mapper__).execution_options(compiled_cache=_compiled)
+  for i in range(0, len(ranges), RANGES_PER_QUERY):
+    chunk = ranges[i:i + RANGES_PER_QUERY]
+    params = {}
+    for n, (key, low, high) in enumerate(chunk):
+      params['key{}'.format(n)], params['low{}'.format(n)], params['high{}'.format(n)] = key, low, high
+    for key, show_start, show_end, id in connection.execute(ranges_query(column.key, len(chunk)), params):
+      index.add(key, show_start, show_end, id)
+  return index
+
+def existing_ids(shows):
+  """{'venue_id': ids, 'artist_id': ids}: the venues and artists of shows that exist."""
+  found = {'venue_id': set(), 'artist_id': set()}
+  query = db.union_all(
+    db.select([db.literal('venue_id'), Venue.id]).where(Venue.id.in_({show['venue_id'] for show in shows})),
+    db.select([db.literal('artist_id'), Artist.id]).where(Artist.id.in_({show['artist_id'] for show in shows})))
+  for field, id in db.session.execute(query):
+    found[field].add(id)
+  return found
+
+def describe(entry):
+  start, end, id = entry
+  owner = 'show {}'.format(id) if id is not None else 'another show in this schedule'
+  return '{} to {} ({})'.format(start.strftime('%Y-%m-%d %H:%M'), end.strftime('%Y-%m-%d %H:%M'), owner)
+
+def check_schedule(shows):
+  """Check new shows for unknown venues/artists and double bookings.
+
+  shows is a list of dicts with venue_id, artist_id, start_time and
+  end_time. Each is checked against the existing shows and the shows
+  before it in the list. Returns {position: errors} for the shows that
+  fail, with errors shaped like form errors.
+  """
+  if not shows:
+    return {}
+  known = existing_ids(shows)
+  venue_spans, artist_spans = defaultdict(list), defaultdict(list)
+  for show in shows:
+    venue_spans[show['venue_id']].append((show['start_time'], show['end_time']))
+    artist_spans[show['artist_id']].append((show['start_time'], show['end_time']))
+  venues = load_index(Show.venue_id, venue_spans)
+  artists = load_index(Show.artist_id, artist_spans)
+
+  conflicts = {}
+  for position, show in enumerate(shows):
+    errors = {}
+    if show['venue_id'] not in known['venue_id']:
+      errors['venue_id'] = ['No venue with id {}.'.format(show['venue_id'])]
+    if show['artist_id'] not in known['artist_id']:
+      errors['artist_id'] = ['No artist with id {}.'.format(show['artist_id'])]
+    if errors:
+      conflicts[position] = errors
+      continue
+    taken = venues.find(show['venue_id'], show['start_time'], show['end_time'])
+    if taken:
+      errors['venue_id'] = ['Venue {} is booked {}.'.format(show['venue_id'], describe(taken))]
+    taken = artists.find(show['artist_id'], show['start_time'], show['end_time'])
+    if taken:
+      errors['artist_id'] = ['Artist {} is booked {}.'.format(show['artist_id'], describe(taken))]
+    if errors:
+      conflicts[position] = errors
+    else:
+      venues.add(show['venue_id'], show['start_time'], show['end_time'])
+      artists.add(show['artist_id'], show['start_time'], show['end_time'])
+  return conflicts
@@ -0,0 +1,227 @@
+#----------------------------------------------------------------------------#
+# Rendered-page cache for the read pages.
+#
+# Views decorated with response_cache.cached() are stored under their path
+# and query string, together with a set of tags naming the data they show:
+#
+#   'venues', 'artists', 'shows'   the listing pages
+#   'venue:<id>', 'artist:<id>'    any page showing that venue/artist
+#
+# The write handlers call response_cache.invalidate() with the tags their
+# commit touched, which drops exactly the pages built from that data.
+# Entries also expire after CACHE_TTL seconds, since the past/upcoming
+# split of shows changes as time passes. A page under freshness.conditional
+# is also keyed by its ETag, so a show that has started since it was
+# rendered (no write, no invalidation) misses instead of serving the old
+# page with the new validators.
+#----------------------------------------------------------------------------#
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, jsonify, make_response, request, session
+from werkzeug.urls import url_encode
+from werkzeug.utils import import_string
+
+# Response headers stored with a cached page, so validators set by a view
+# survive a cache hit.
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+class CacheBackend(object):
+  """Storage interface for cached responses.
+
+  A shared backend (memcached, Redis, ...) implements these methods so the
+  cache and its invalidations span every worker.
+  """
+
+  def begin(self):
+    # Returns a token taken before a response is rendered; set() must drop
+    # the entry if any of its tags were invalidated after that token.
+    raise NotImplementedError
+
+  def get(self, key):
+    raise NotImplementedError
+
+  def set(self, key, value, tags, token, ttl):
+    raise NotImplementedError
+
+  def invalidate(self, tags):
+    raise NotImplementedError
+
+  def clear(self):
+    raise NotImplementedError
+
+  def __len__(self):
+    raise NotImplementedError
+
+class LRUCache(CacheBackend):
+  """In-process backend: least recently used eviction plus a TTL."""
+
+  def __init__(self, max_entries=1024, **options):
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._tags = {}
+    # Tag -> stamp of its last invalidation, oldest first, for the renders
+    # still in flight. Only the newest max_entries are kept; _floor is the
+    # newest stamp dropped, and a render begun before it is not stored.
+    self._invalidated = OrderedDict()
+    self._floor = 0
+    self._clock = itertools.count(1)
+    self._lock = threading.Lock()
+
+  def begin(self):
+    return next(self._clock)
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      expires, value, tags = entry
+      if expires < time.monotonic():
+        self._discard(key)
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, tags, token, ttl):
+    with self._lock:
+      if token < self._floor or any(self._invalidated.get(tag, 0) > token for tag in tags):
+        return
+      self._discard(key)
+      self._entries[key] = (time.monotonic() + ttl, value, tags)
+      for tag in tags:
+        self._tags.setdefault(tag, set()).add(key)
+      while len(self._entries) > self.max_entries:
+        self._discard(next(iter(self._entries)))
+
+  def invalidate(self, tags):
+    with self._lock:
+      stamp = next(self._clock)
+      for tag in tags:
+        self._invalidated.pop(tag, None)
+        self._invalidated[tag] = stamp
+        for key in list(self._tags.get(tag, ())):
+          self._discard(key)
+      while len(self._invalidated) > self.max_entries:
+        self._floor = self._invalidated.popitem(last=False)[1]
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._tags.clear()
+
+  def _discard(self, key):
+    entry = self._entries.pop(key, None)
+    if entry is None:
+      return
+    for tag in entry[2]:
+      keys = self._tags.get(tag)
+      if keys is not None:
+        keys.discard(key)
+        if not keys:
+          del self._tags[tag]
+
+  def __len__(self):
+    return len(self._entries)
+
+class ResponseCache(object):
+  def __init__(self, app=None):
+    self.hits = 0
+    self.misses = 0
+    self.bypasses = 0
+    self.invalidations = 0
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.config.setdefault('CACHE_ENABLED', True)
+    app.config.setdefault('CACHE_BACKEND', None)
+    app.config.setdefault('CACHE_TTL', 60)
+    app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+
+    backend_class = app.config['CACHE_BACKEND'] or LRUCache
+    if isinstance(backend_class, str):
+      backend_class = import_string(backend_class)
+    app.extensions['response_cache'] = backend_class(max_entries=app.config['CACHE_MAX_ENTRIES'])
+    app.add_url_rule('/_cache/stats', 'cache_stats', self.stats_view)
+
+  @property
+  def backend(self):
+    return current_app.extensions['response_cache']
+
+  def _cacheable(self):
+    # Pending flash messages are rendered into (and consumed by) the next
+    # page, so that page must be built fresh.
+    return current_app.config['CACHE_ENABLED'] \
+      and request.method == 'GET' \
+      and not session.get('_flashes')
+
+  def _key(self):
+    key = request.path + '?' + url_encode(request.args, sort=True)
+    # Set by freshness.conditional: the validators the page is served with
+    if 'cache_etag' in g:
+      key += '#' + g.cache_etag
+    return key
+
+  def cached(self, *tags):
+    """Cache a GET view. Tags may use the view arguments, e.g. 'venue:{venue_id}'."""
+    def decorator(view):
+      @wraps(view)
+      def wrapper(*args, **kwargs):
+        if not self._cacheable():
+          self.bypasses += 1
+          return view(*args, **kwargs)
+
+        backend = self.backend
+        key = self._key()
+        cached = backend.get(key)
+        if cached is not None:
+          self.hits += 1
+          body, status, mimetype, headers = cached
+          response = current_app.response_class(body, status=status, mimetype=mimetype, headers=headers)
+          response.headers['X-Cache'] = 'HIT'
+          return response
+
+        self.misses += 1
+        token = backend.begin()
+        g.cache_tags = {tag.format(**kwargs) for tag in tags}
+        response = make_response(view(*args, **kwargs))
+        # Streamed pages (calendars.py) would have to be buffered to be stored
+        if response.status_code == 200 and not response.direct_passthrough and not response.is_streamed:
+          headers = [(name, response.headers[name]) for name in CACHED_HEADERS if name in response.headers]
+          value = (response.get_data(), response.status_code, response.mimetype, headers)
+          backend.set(key, value, frozenset(g.cache_tags), token, current_app.config['CACHE_TTL'])
+        response.headers['X-Cache'] = 'MISS'
+        return response
+      return wrapper
+    return decorator
+
+  def tag(self, *tags):
+    """Add tags to the page being cached, for data found while building it."""
+    if 'cache_tags' in g:
+      g.cache_tags.update(tags)
+
+  def invalidate(self, *tags):
+    self.invalidations += 1
+    self.backend.invalidate(tags)
+
+  def stats(self):
+    lookups = self.hits + self.misses
+    return {
+      'hits': self.hits,
+      'misses': self.misses,
+      'bypasses': self.bypasses,
+      'invalidations': self.invalidations,
+      'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+      'entries': len(self.backend),
+      'max_entries': current_app.config['CACHE_MAX_ENTRIES'],
+    }
+
+  def stats_view(self):
+    return jsonify(self.stats())
+
+response_cache = ResponseCache()
@@ -0,0 +1,109 @@
+#----------------------------------------------------------------------------#
+# Show calendars.
+#
+#   /shows?from=2026-11-01&to=2026-11-30&city=Austin&state=TX&genre=Jazz
+#   /venues/<id>/calendar?from=...&to=...
+#   /artists/<id>/calendar?from=...&to=...
+#
+# list the shows starting on the days from..to (both included, in
+# SHOW_TIMEZONE), grouped by day. Each is one range scan: over
+# ix_Show_start_time, or (venue_id|artist_id, start_time) for the calendar
+# of one venue or artist, with city/state served by ix_Venue_state_city_id and
+# the genre (the artist's) by ix_ArtistGenre_genre_id. A range may span up
+# to CALENDAR_MAX_DAYS; the rows are fetched CALENDAR_CHUNK_SIZE at a time
+# and the page is streamed as they arrive, so a year of shows is never held
+# in memory at once. Streamed pages are not kept in the page cache.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+from flask import abort, current_app, get_flashed_messages, request, stream_with_context, url_for
+
+from models import db, Venue, Artist, Show, Genre, artist_genres, show_now
+
+FILTERS = ('from', 'to', 'city', 'state', 'genre')
+
+def requested(args):
+  """Whether a /shows request asks for a calendar rather than the listing."""
+  return any(args.get(name) for name in FILTERS)
+
+def parse_day(value):
+  try:
+    return datetime.strptime(value, '%Y-%m-%d').date()
+  except ValueError:
+    abort(400)
+
+def parse_range(args):
+  """(first, last) day of a calendar request; defaults to CALENDAR_DAYS from today."""
+  first = parse_day(args['from']) if args.get('from') else show_now().date()
+  last = parse_day(args['to']) if args.get('to') \
+    else first + timedelta(days=current_app.config['CALENDAR_DAYS'] - 1)
+  if last < first or (last - first).days >= current_app.config['CALENDAR_MAX_DAYS']:
+    abort(400)
+  return first, last
+
+def shows_query(columns, first, last, venue_id=None, artist_id=None, city=None, state=None, genre=None):
+  """The shows starting on the days first..last, in start_time order, fetched in chunks."""
+  start = datetime.combine(first, time())
+  end = datetime.combine(last + timedelta(days=1), time())
+  query = db.session.query(*columns) \
+    .join(Venue, Show.venue_id == Venue.id) \
+    .join(Artist, Show.artist_id == Artist.id) \
+    .filter(Show.start_time >= start, Show.start_time < end)
+  if venue_id is not None:
+    query = query.filter(Show.venue_id == venue_id)
+  if artist_id is not None:
+    query = query.filter(Show.artist_id == artist_id)
+  if state:
+    query = query.filter(Venue.state == state)
+  if city:
+    query = query.filter(Venue.city == city)
+  if genre:
+    query = query.filter(Show.artist_id.in_(
+      db.session.query(artist_genres.c.artist_id)
+        .join(Genre, artist_genres.c.genre_id == Genre.id)
+        .filter(Genre.name == genre)))
+  return query.order_by(Show.start_time, Show.id) \
+    .yield_per(current_app.config['CALENDAR_CHUNK_SIZE'])
+
+def by_day(rows):
+  """(day, rows) for each day with shows, lazily."""
+  return groupby(rows, key=lambda row: row.start_time.date())
+
+def stream_template(template_name, **context):
+  """A response rendering template_name as it goes, within the request context."""
+  app = current_app._get_current_object()
+  # The session is saved before the body is sent: take the flashed messages
+  # now, the template then reads them from the request.
+  get_flashed_messages()
+  app.update_template_context(context)
+  stream = app.jinja_env.get_template(template_name).stream(context)
+  stream.enable_buffering(current_app.config['CALENDAR_BUFFER_SIZE'])
+  return app.response_class(stream_with_context(stream), mimetype='text/html')
+
+def render(columns, args, heading, **filters):
+  """Stream pages/calendar.html for the from/to range of a request.
+
+  filters are those of shows_query(); the template echoes them in the
+  range form.
+  """
+  first, last = parse_range(args)
+  rows = shows_query(columns, first, last, **filters)
+  return stream_template('pages/calendar.html', heading=heading, days=by_day(rows),
+                         first=first, last=last, filters=filters,
+                         previous_url=range_url(first - (last - first) - timedelta(days=1), first - timedelta(days=1)),
+                         next_url=range_url(last + timedelta(days=1), last + (last - first) + timedelta(days=1)))
+
+def range_url(first, last):
+  """This calendar, over the days first..last."""
+  params = {name: value for name, value in request.args.items() if name in FILTERS and value}
+  params.update(request.view_args)
+  params['from'], params['to'] = first.isoformat(), last.isoformat()
+  return url_for(request.endpoint, **params)
+
+def init_app(app):
+  app.config.setdefault('CALENDAR_DAYS', 30)
+  app.config.setdefault('CALENDAR_MAX_DAYS', 366)
+  app.config.setdefault('CALENDAR_CHUNK_SIZE', 500)
+  app.config.setdefault('CALENDAR_BUFFER_SIZE', 20)
@@ -1,15 +1,119 @@
 import os
-SECRET_KEY = os.urandom(32)
+# Signs sessions and flashed messages: every worker and process must share
+# it, so it comes from the environment. create_app() refuses to start
+# without it outside debug mode.
+SECRET_KEY = os.environ.get('SECRET_KEY')
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Enable debug mode with FLASK_DEBUG=1; never in production, where it would
+# also let the app start without SECRET_KEY.
+DEBUG = os.environ.get('FLASK_DEBUG', '0').lower() not in ('', '0', 'false', 'no')
+
+# Outside debug and testing, the app's log is appended to ERROR_LOG; an
+# empty value turns the file off (the benchmarks log nowhere).
+ERROR_LOG = os.environ.get('ERROR_LOG', 'error.log')
 
 # Connect to the database
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://postgres:1@localhost:5432/fyyur_app'
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://postgres:1@localhost:5432/fyyur_app')
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Read replicas (see replicas.py): comma-separated database URLs that GET
+# requests read from. Writes, and a client's reads for DB_STICKY_SECONDS
+# after it wrote, go to SQLALCHEMY_DATABASE_URI.
+DATABASE_REPLICA_URLS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+SQLALCHEMY_BINDS = {'replica_{}'.format(n): url for n, url in enumerate(DATABASE_REPLICA_URLS, 1)}
+DB_STICKY_SECONDS = 10
+
+# Connection pool of every engine. A detail page can hold
+# DETAIL_FANOUT_WORKERS + 1 connections at once. SQLite ignores the sizes.
+SQLALCHEMY_ENGINE_OPTIONS = {
+  'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+  'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+  'pool_timeout': 10,
+  'pool_recycle': 1800,
+  'pool_pre_ping': True,
+}
+
+# Search backend for /venues/search and /artists/search: 'like', 'pg_trgm'
+# or 'fts5'. Left unset, it follows the database (see search.py).
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND')
+SEARCH_PAGE_SIZE = 20
+
+# Venue and artist names offered by /autocomplete (see autocomplete.py),
+# and how often a process re-reads the names changed by the others.
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_REFRESH_SECONDS = 60
+
+# Rows per page on the /venues, /artists and /shows listings.
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 20))
+
+# Newest venues and artists listed on the home page.
+RECENTLY_LISTED = 8
+
+# Show calendars (see calendars.py): the days shown when a request gives
+# no 'to', the longest range it may ask for, and the rows fetched per
+# round trip while the page is streamed.
+CALENDAR_DAYS = 30
+CALENDAR_MAX_DAYS = 366
+CALENDAR_CHUNK_SIZE = 500
+CALENDAR_BUFFER_SIZE = 20
+
+# Rows fetched, and written out, per round trip by /export and
+# 'flask export' (see export.py). /export only answers requests with a
+# token from 'flask export-token', signed with EXPORT_SECRET.
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_SECRET = os.environ.get('EXPORT_SECRET')
+EXPORT_TOKEN_MAX_AGE = 3600
+
+# Rendered-page cache for the read pages (see cache.py). CACHE_BACKEND is
+# the import path of a cache.CacheBackend class; unset uses the in-process
+# LRU cache.
+CACHE_ENABLED = True
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND')
+CACHE_TTL = 60
+CACHE_MAX_ENTRIES = 1024
+
+# Per-request SQL counts and timings (see instrumentation.py). A statement
+# shape repeated more than SQL_REPEAT_THRESHOLD times in one request is
+# logged as a likely N+1 loop; SQL_STRICT raises instead.
+SQL_INSTRUMENTATION = True
+SQL_REPEAT_THRESHOLD = 10
+SQL_STRICT = os.environ.get('SQL_STRICT') == '1'
+
+# On-demand cProfile of single requests (see profiler.py). Off, nothing is
+# installed. Requests are profiled when they carry an X-Profile token from
+# 'flask profiler token' (signed with PROFILER_SECRET), or at random for a
+# PROFILER_SAMPLE_RATE share of requests. The newest PROFILER_KEEP profiles
+# are kept in PROFILER_DIR and listed at /_profiles.
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED') == '1'
+PROFILER_SECRET = os.environ.get('PROFILER_SECRET')
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+PROFILER_DIR = os.path.join(basedir, 'profiles')
+PROFILER_KEEP = 100
+PROFILER_TOKEN_MAX_AGE = 3600
+
+# Show.start_time is stored without a zone, as wall time in SHOW_TIMEZONE;
+# pages show times in DISPLAY_TIMEZONE.
+SHOW_TIMEZONE = os.environ.get('SHOW_TIMEZONE', 'UTC')
+DISPLAY_TIMEZONE = os.environ.get('DISPLAY_TIMEZONE', SHOW_TIMEZONE)
+DATETIME_LOCALE = 'en'
+
+# Threads running the independent queries of a detail page concurrently
+# (see fanout.py); 0 runs them one after another in the request's thread.
+DETAIL_FANOUT_WORKERS = int(os.environ.get('DETAIL_FANOUT_WORKERS', 4))
+
+# Compiled templates are kept in TEMPLATE_BYTECODE_DIR for the next worker;
+# rendered {% cache %} fragments in an in-process LRU of
+# TEMPLATE_FRAGMENT_CACHE_SIZE entries (0 turns it off). See templating.py.
+TEMPLATE_BYTECODE_DIR = os.environ.get('TEMPLATE_BYTECODE_DIR', os.path.join(basedir, '.jinja_cache'))
+TEMPLATE_FRAGMENT_CACHE_SIZE = 4096
+TEMPLATE_FRAGMENT_CACHE_TTL = 3600
+
+# Fingerprinted and compressed copies of static/, built by
+# 'flask assets build' and served from /assets/ (see assets.py).
+ASSETS_DIR = os.path.join(basedir, 'static', 'dist')
@@ -0,0 +1,182 @@
+#----------------------------------------------------------------------------#
+# Streaming export of venues, artists and shows.
+#
+#   /export/venues.csv?state=TX            /export/shows.ndjson.gz?from=2026-11-01
+#   flask export shows --from 2026-11-01 --to 2026-11-30 -o shows.csv.gz
+#
+# The HTTP exports dump whole tables, so like /_profiles they answer only
+# requests with a signed token, from 'flask export-token', in the
+# X-Export-Token header or a token argument; anything else is a 404.
+#
+# Rows are selected with the column projections of the JSON API (api.py)
+# and fetched EXPORT_CHUNK_SIZE at a time with yield_per, which on Postgres
+# reads them through a server-side cursor. Each chunk is written out as CSV
+# (header row first) or NDJSON, and gzipped incrementally when asked, before
+# the next one is fetched, so an export holds one chunk in memory whatever
+# the size of the table. Venues and artists can be filtered by city/state
+# and by the days they were listed (created_at, UTC); shows by the city/state
+# of their venue and the days they start on (in SHOW_TIMEZONE).
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import sys
+import zlib
+from datetime import datetime, time, timedelta
+
+import click
+from flask import Blueprint, abort, current_app, request, stream_with_context
+from flask.cli import with_appcontext
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from api import venue_schema, artist_schema, show_schema
+from calendars import parse_day
+from models import db, Venue, Artist, Show
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+export = Blueprint('export', __name__, url_prefix='/export')
+
+def _serializer(app):
+  # EXPORT_SECRET lets export tokens be handed out (and rotated) without
+  # the key that signs sessions
+  secret = app.config['EXPORT_SECRET'] or app.config['SECRET_KEY']
+  return URLSafeTimedSerializer(secret, salt='fyyur-export')
+
+def make_token(app):
+  return _serializer(app).dumps('export')
+
+def check_token(app, token):
+  if not token:
+    return False
+  try:
+    _serializer(app).loads(token, max_age=app.config['EXPORT_TOKEN_MAX_AGE'])
+  except BadSignature:
+    return False
+  return True
+
+def export_query(kind, city=None, state=None, first=None, last=None):
+  """The rows of an export: (schema, query)."""
+  if kind == 'shows':
+    schema, located, dated = show_schema, Venue, Show.start_time
+    query = db.session.query(*schema.columns) \
+      .join(Venue, Show.venue_id == Venue.id) \
+      .join(Artist, Show.artist_id == Artist.id) \
+      .order_by(Show.start_time, Show.id)
+  else:
+    model, schema = (Venue, venue_schema) if kind == 'venues' else (Artist, artist_schema)
+    located, dated = model, model.created_at
+    query = db.session.query(*schema.columns).order_by(model.id)
+  if state:
+    query = query.filter(located.state == state)
+  if city:
+    query = query.filter(located.city == city)
+  if first:
+    query = query.filter(dated >= datetime.combine(first, time()))
+  if last:
+    query = query.filter(dated < datetime.combine(last + timedelta(days=1), time()))
+  return schema, query.yield_per(current_app.config['EXPORT_CHUNK_SIZE'])
+
+def _csv_value(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  return value
+
+def ndjson_chunks(schema, rows, size):
+  chunk = []
+  for row in rows:
+    chunk.append(schema.dumps(row) + '\n')
+    if len(chunk) >= size:
+      yield ''.join(chunk)
+      chunk = []
+  if chunk:
+    yield ''.join(chunk)
+
+def csv_chunks(schema, rows, size):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(schema.names)
+  count = 0
+  for row in rows:
+    writer.writerow([_csv_value(value) for value in row])
+    count += 1
+    if count % size == 0:
+      yield buffer.getvalue()
+      buffer.seek(0)
+      buffer.truncate()
+  yield buffer.getvalue()
+
+def generate(kind, format, compress=False, **filters):
+  """The bytes of an export, chunk by chunk."""
+  schema, rows = export_query(kind, **filters)
+  size = current_app.config['EXPORT_CHUNK_SIZE']
+  chunks = (csv_chunks if format == 'csv' else ndjson_chunks)(schema, rows, size)
+  if not compress:
+    for chunk in chunks:
+      yield chunk.encode('utf-8')
+    return
+  # wbits 31: a gzip stream, written as it goes
+  compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+  for chunk in chunks:
+    data = compressor.compress(chunk.encode('utf-8'))
+    if data:
+      yield data
+  yield compressor.flush()
+
+@export.route('/<any(venues, artists, shows):kind>.<any(csv, ndjson):format>', defaults={'compress': False})
+@export.route('/<any(venues, artists, shows):kind>.<any(csv, ndjson):format>.gz', defaults={'compress': True})
+def dump(kind, format, compress):
+  args = request.args
+  if not check_token(current_app, request.headers.get('X-Export-Token') or args.get('token')):
+    abort(404)
+  body = generate(kind, format, compress,
+                  city=args.get('city'), state=args.get('state'),
+                  first=parse_day(args['from']) if args.get('from') else None,
+                  last=parse_day(args['to']) if args.get('to') else None)
+  filename = '{}.{}{}'.format(kind, format, '.gz' if compress else '')
+  response = current_app.response_class(stream_with_context(body),
+                                        mimetype='application/gzip' if compress else FORMATS[format])
+  response.headers['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+  return response
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.option('-o', '--output', type=click.Path(dir_okay=False, allow_dash=True), default='-',
+              help='File to write; a .gz name turns on --gzip. [default: stdout]')
+@click.option('--format', 'format', type=click.Choice(sorted(FORMATS)),
+              help='Output format; defaults to the file extension, else csv.')
+@click.option('--gzip', 'compress', is_flag=True, default=None, help='Gzip the output.')
+@click.option('--city')
+@click.option('--state')
+@click.option('--from', 'first', type=click.DateTime(['%Y-%m-%d']), help='First day, YYYY-MM-DD.')
+@click.option('--to', 'last', type=click.DateTime(['%Y-%m-%d']), help='Last day, YYYY-MM-DD.')
+@with_appcontext
+def export_command(kind, output, format, compress, city, state, first, last):
+  """Export venues, artists or shows as CSV or NDJSON."""
+  name = output[:-3] if output.endswith('.gz') else output
+  format = format or ('ndjson' if name.endswith(('.ndjson', '.jsonl')) else 'csv')
+  if compress is None:
+    compress = output.endswith('.gz')
+  body = generate(kind, format, compress, city=city, state=state,
+                  first=first.date() if first else None, last=last.date() if last else None)
+  out = sys.stdout.buffer if output == '-' else open(output, 'wb')
+  try:
+    for data in body:
+      out.write(data)
+  finally:
+    if out is not sys.stdout.buffer:
+      out.close()
+
+@click.command('export-token')
+@with_appcontext
+def export_token_command():
+  """Print a token for the X-Export-Token header of /export."""
+  click.echo(make_token(current_app))
+
+def init_app(app):
+  app.config.setdefault('EXPORT_CHUNK_SIZE', 1000)
+  app.config.setdefault('EXPORT_TOKEN_MAX_AGE', 3600)
+  app.config.setdefault('EXPORT_SECRET', None)
+  app.register_blueprint(export)
+  app.cli.add_command(export_command)
+  app.cli.add_command(export_token_command)
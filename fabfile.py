@@ -6,10 +6,12 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
+        tests = local("python -m pytest -q", capture=True)
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m bench.run --iterations 3 --check --output bench_output.json", capture=True
         )
-    if result.failed and not confirm("Tests failed. Continue?"):
+        startup = local("python -m bench.startup", capture=True)
+    if (tests.failed or result.failed or startup.failed) and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
@@ -40,7 +42,7 @@ def heroku():
 
 def heroku_test():
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python -m pytest -q && heroku run python -m bench.run --iterations 3 --check"
     )
 
 
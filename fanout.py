@@ -0,0 +1,52 @@
+#----------------------------------------------------------------------------#
+# Concurrent queries within one request.
+#
+# gather(f, g, h) runs a page's independent loaders at the same time and
+# returns their results in order, so the page waits for its slowest query
+# instead of the sum of all of them. The first loader runs in the request's
+# thread, the others in a shared thread pool, each inside a copy of the
+# request context: a worker gets its own scoped session, and so its own
+# pooled connection, which goes back to the pool when the copied context is
+# popped. Loaders therefore build their queries themselves (a query made on
+# the request's session must not be run from a worker) and must not use g,
+# which the workers don't share. Each concurrent detail page holds up to
+# DETAIL_FANOUT_WORKERS + 1 connections; size the engine pool to match.
+# DETAIL_FANOUT_WORKERS = 0 runs every loader in the request's thread.
+#
+# The pool is started by the first gather() of each process, so an app built
+# before a pre-fork server forks (gunicorn --preload) hands every worker a
+# pool of its own rather than one whose threads stayed in the parent.
+#----------------------------------------------------------------------------#
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import copy_current_request_context, current_app
+
+_lock = threading.Lock()
+
+def get_pool(app):
+  """This process's pool for app, or None when fan-out is off."""
+  workers = app.config['DETAIL_FANOUT_WORKERS']
+  if not workers:
+    return None
+  state = app.extensions['fanout']
+  if state.get('pid') != os.getpid():
+    with _lock:
+      if state.get('pid') != os.getpid():
+        state['pool'] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fyyur-fanout')
+        state['pid'] = os.getpid()
+  return state['pool']
+
+def gather(*loaders):
+  pool = get_pool(current_app) if len(loaders) > 1 else None
+  if pool is None:
+    return [loader() for loader in loaders]
+  futures = [pool.submit(copy_current_request_context(loader)) for loader in loaders[1:]]
+  first = loaders[0]()
+  return [first] + [future.result() for future in futures]
+
+def init_app(app):
+  app.config.setdefault('DETAIL_FANOUT_WORKERS', 4)
+  app.extensions['fanout'] = {}
@@ -0,0 +1,113 @@
+#----------------------------------------------------------------------------#
+# Materialized show feed.
+#
+# /shows reads the ShowFeed table (models.py): one row per show holding its
+# start time and the venue and artist fields the listing displays, paged
+# with one (start_time, show_id) index range scan. The write paths keep it
+# up to date in the same transaction as their change:
+#
+#   add_shows(*criteria)     after inserting shows (the criteria select them)
+#   update_venue(venue)      after editing a venue; rewrites only the copies
+#   update_artist(artist)    of its name (and image) that changed
+#   remove_shows(*criteria)  before deleting shows
+#
+#   flask feed check         lists the shows whose feed rows are missing,
+#                            stale or left over; exits 1 if there are any
+#   flask feed rebuild       refills the whole table from Show
+#----------------------------------------------------------------------------#
+
+import sys
+
+import click
+from flask.cli import AppGroup
+
+from cache import response_cache
+from models import db, Venue, Artist, Show, ShowFeed
+
+# The feed's columns and what they copy
+COPIED = (
+  (ShowFeed.show_id, Show.id),
+  (ShowFeed.start_time, Show.start_time),
+  (ShowFeed.venue_id, Venue.id),
+  (ShowFeed.venue_name, Venue.name),
+  (ShowFeed.artist_id, Artist.id),
+  (ShowFeed.artist_name, Artist.name),
+  (ShowFeed.artist_image_link, Artist.image_link),
+)
+
+def source(*criteria):
+  """The feed rows of the shows matching criteria, computed from Show."""
+  query = db.select([copy.label(column.name) for column, copy in COPIED]) \
+    .select_from(Show.__table__
+                 .join(Venue.__table__, Show.venue_id == Venue.id)
+                 .join(Artist.__table__, Show.artist_id == Artist.id))
+  return query.where(db.and_(*criteria)) if criteria else query
+
+def stored():
+  return db.select([column for column, _ in COPIED])
+
+def add_shows(*criteria):
+  """Add the feed rows of the shows matching criteria that have none yet."""
+  missing = ~db.exists().where(ShowFeed.show_id == Show.id)
+  db.session.execute(ShowFeed.__table__.insert().from_select(
+    [column.name for column, _ in COPIED], source(missing, *criteria)))
+
+def remove_shows(*criteria):
+  """Remove the feed rows matching criteria (on ShowFeed columns)."""
+  db.session.execute(ShowFeed.__table__.delete().where(db.and_(*criteria)))
+
+def _update(key, id, values):
+  changed = db.or_(*[column.is_distinct_from(value) for column, value in values.items()])
+  db.session.execute(ShowFeed.__table__.update()
+                     .where(key == id).where(changed)
+                     .values({column.name: value for column, value in values.items()}))
+
+def update_venue(venue):
+  _update(ShowFeed.venue_id, venue.id, {ShowFeed.venue_name: venue.name})
+
+def update_artist(artist):
+  _update(ShowFeed.artist_id, artist.id, {
+    ShowFeed.artist_name: artist.name,
+    ShowFeed.artist_image_link: artist.image_link,
+  })
+
+def rebuild():
+  db.session.execute(ShowFeed.__table__.delete())
+  add_shows()
+
+def check(limit=20):
+  """Show ids, up to limit of each: (those whose row, as computed from Show,
+  Venue and Artist, is not in the feed; those of feed rows that match no
+  such row). A stale row shows up in both."""
+  show_id = lambda query: db.select([query.c.show_id]).order_by(query.c.show_id).limit(limit)
+  wrong = db.except_(source(), stored()).alias()
+  extra = db.except_(stored(), source()).alias()
+  return ([id for (id,) in db.session.execute(show_id(wrong))],
+          [id for (id,) in db.session.execute(show_id(extra))])
+
+feed_cli = AppGroup('feed', help='The materialized /shows feed.')
+
+@feed_cli.command('rebuild')
+def rebuild_command():
+  """Refill the show feed from the Show table."""
+  rebuild()
+  db.session.commit()
+  response_cache.invalidate('shows')
+  click.echo('Rebuilt the show feed: {} shows.'.format(db.session.query(ShowFeed).count()))
+
+@feed_cli.command('check')
+@click.option('--limit', default=20, show_default=True, help='Show ids to list per problem.')
+def check_command(limit):
+  """Compare the show feed with the Show table."""
+  wrong, extra = check(limit)
+  if wrong:
+    click.echo('Shows missing from the feed, or stale in it: {}'.format(', '.join(map(str, wrong))))
+  if extra:
+    click.echo('Feed rows that match no show: {}'.format(', '.join(map(str, extra))))
+  if wrong or extra:
+    click.echo("Run 'flask feed rebuild' to repair the feed.", err=True)
+    sys.exit(1)
+  click.echo('The show feed is consistent.')
+
+def init_app(app):
+  app.cli.add_command(feed_cli)
@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------#
+# HTTP validators for the venue and artist pages.
+#
+# A detail page depends on the entity, its shows, the other side of each
+# show (the artist names on a venue page) and on which shows are still
+# upcoming. One aggregate query over those rows gives their latest
+# updated_at, the number of shows and the number still upcoming; the
+# ETag is a hash of that row. Last-Modified is the latest of those
+# timestamps and of the start of the last show that has begun: a show
+# moving from upcoming to past changes the page without touching a row.
+# A request whose If-None-Match / If-Modified-Since still match is answered
+# with a 304 after that single query, before the page cache or the view;
+# otherwise the page cache is looked up under the ETag too, so a cached
+# page is only served with the validators it was rendered under.
+#----------------------------------------------------------------------------#
+
+import hashlib
+from functools import wraps
+
+import pytz
+from flask import current_app, g, make_response, request
+
+from models import db, Venue, Artist, Show, show_now
+
+def freshness(model, other, key, other_key, id):
+  """(etag, last_modified) for the page of one venue or artist, or None if it doesn't exist."""
+  now = show_now()
+  row = db.session.query(
+      model.updated_at,
+      db.func.count(Show.id),
+      db.func.count(db.case([(Show.start_time >= now, Show.id)])),
+      db.func.max(Show.updated_at),
+      db.func.max(other.updated_at),
+      db.func.max(db.case([(Show.start_time < now, Show.start_time)]))
+    ).outerjoin(Show, key == model.id) \
+    .outerjoin(other, other_key == other.id) \
+    .filter(model.id == id) \
+    .group_by(model.id, model.updated_at) \
+    .first()
+  if row is None:
+    return None
+  etag = hashlib.sha1(repr((request.path,) + tuple(row)).encode()).hexdigest()
+  stamps = [row[0], row[3], row[4]]
+  if row[5] is not None:
+    # start_time is in SHOW_TIMEZONE, the updated_at stamps in UTC
+    started = pytz.timezone(current_app.config['SHOW_TIMEZONE']).localize(row[5])
+    stamps.append(started.astimezone(pytz.utc).replace(tzinfo=None))
+  return etag, max(stamp for stamp in stamps if stamp is not None)
+
+def venue_freshness(venue_id):
+  return freshness(Venue, Artist, Show.venue_id, Show.artist_id, venue_id)
+
+def artist_freshness(artist_id):
+  return freshness(Artist, Venue, Show.artist_id, Show.venue_id, artist_id)
+
+def conditional(get_freshness):
+  """Set ETag/Last-Modified on a GET view from get_freshness(**view_args),
+  answering 304 without calling the view when the client is up to date."""
+  def decorator(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+      fresh = get_freshness(**kwargs) if request.method in ('GET', 'HEAD') else None
+      if fresh is None:
+        return view(*args, **kwargs)
+      etag, last_modified = fresh
+
+      response = current_app.response_class()
+      response.set_etag(etag)
+      response.last_modified = last_modified
+      response.make_conditional(request)
+      if response.status_code == 304:
+        return response
+
+      g.cache_etag = etag
+      response = make_response(view(*args, **kwargs))
+      if response.status_code == 200:
+        response.set_etag(etag)
+        response.last_modified = last_modified
+      return response
+    return wrapper
+  return decorator
@@ -0,0 +1,329 @@
+#----------------------------------------------------------------------------#
+# Bulk import of venues, artists and shows.
+#
+#   flask import venues venues.csv
+#   flask import shows shows.jsonl --batch-size 5000
+#
+# Records are streamed from CSV (header row) or JSONL, validated with the
+# same forms as the create pages and inserted in batches, one transaction
+# per batch. Shows go in with one multi-row INSERT (or COPY) per batch on
+# Postgres and one executemany elsewhere. After each batch the number of
+# records consumed is written to a checkpoint file; an interrupted import
+# run again with the same checkpoint picks up after the last committed
+# batch. Rejected records are reported with their record number and form
+# errors; shows are also rejected when they double-book a venue or artist,
+# against the database or an earlier record of the file.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from werkzeug.datastructures import MultiDict
+
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, Genre, refresh_show_counts
+from cache import response_cache
+import booking
+import feed
+import search
+
+BOOLEAN_FIELDS = ('seeking_talent', 'seeking_venue')
+FALSE_VALUES = ('', '0', 'false', 'f', 'no', 'n')
+
+def read_records(path, format):
+  with open(path, newline='', encoding='utf-8') as f:
+    if format == 'csv':
+      for record in csv.DictReader(f):
+        yield record
+    else:
+      for line in f:
+        if line.strip():
+          yield json.loads(line)
+
+def parse_id(value):
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    return None
+
+def to_formdata(record):
+  # Records hold lists (JSONL) or comma-joined strings (CSV) for genres and
+  # any truthy spelling for the booleans; forms expect request.form shape.
+  formdata = MultiDict()
+  for key, value in record.items():
+    if key in BOOLEAN_FIELDS:
+      if value is False or value is None or str(value).strip().lower() in FALSE_VALUES:
+        continue
+      value = 'y'
+    if key == 'genres' and isinstance(value, str):
+      value = [genre.strip() for genre in value.split(',') if genre.strip()]
+    if key == 'start_time' and isinstance(value, str):
+      value = value.replace('T', ' ')
+    if isinstance(value, list):
+      for item in value:
+        formdata.add(key, item)
+    elif value is not None:
+      formdata.add(key, str(value))
+  return formdata
+
+class Importer(object):
+  form_class = None
+  tags = ()
+
+  def __init__(self):
+    self.venue_ids = set()
+    self.artist_ids = set()
+
+  def validate(self, record):
+    # Returns (form, None) for a good record or (None, errors)
+    form = self.form_class(formdata=to_formdata(record), meta={'csrf': False})
+    if not form.validate():
+      return None, form.errors
+    return form, None
+
+  def check_batch(self, batch):
+    # Cross-record checks against the database, per batch; returns a dict
+    # of record number -> errors
+    return {}
+
+  def insert(self, batch):
+    raise NotImplementedError
+
+  def finish(self):
+    response_cache.invalidate(*self.tags)
+
+class EntityImporter(Importer):
+  model = None
+
+  def build(self, form):
+    raise NotImplementedError
+
+  def insert(self, batch):
+    genres = {}
+    entities = []
+    for _, form in batch:
+      entity = self.build(form)
+      names = [name for name in form.genres.data if name]
+      missing = [name for name in names if name not in genres]
+      for genre in Genre.get_or_create(missing):
+        genres[genre.name] = genre
+      entity.genres = [genres[name] for name in names]
+      entities.append(entity)
+    db.session.add_all(entities)
+
+  def finish(self):
+    search.get_backend().rebuild()
+    super(EntityImporter, self).finish()
+
+class VenueImporter(EntityImporter):
+  form_class = VenueForm
+  model = Venue
+  tags = ('venues',)
+
+  def build(self, form):
+    return Venue(
+      name=form.name.data,
+      city=form.city.data,
+      state=form.state.data,
+      address=form.address.data,
+      phone=form.phone.data,
+      website=form.website_link.data,
+      facebook_link=form.facebook_link.data,
+      image_link=form.image_link.data,
+      seeking_talent=form.seeking_talent.data,
+      seeking_description=form.seeking_description.data
+    )
+
+class ArtistImporter(EntityImporter):
+  form_class = ArtistForm
+  model = Artist
+  tags = ('artists',)
+
+  def build(self, form):
+    return Artist(
+      name=form.name.data,
+      city=form.city.data,
+      state=form.state.data,
+      phone=form.phone.data,
+      website=form.website_link.data,
+      facebook_link=form.facebook_link.data,
+      image_link=form.image_link.data,
+      seeking_venue=form.seeking_venue.data,
+      seeking_description=form.seeking_description.data
+    )
+
+class ShowImporter(Importer):
+  form_class = ShowForm
+
+  def __init__(self, use_copy):
+    super(ShowImporter, self).__init__()
+    self.use_copy = use_copy
+
+  def validate(self, record):
+    form, errors = super(ShowImporter, self).validate(record)
+    # A record without one would get ShowForm's default start_time, the
+    # time the app was started
+    if not str(record.get('start_time') or '').strip():
+      return None, dict(errors or {}, start_time=['This field is required.'])
+    return form, errors
+
+  def row(self, form):
+    duration = timedelta(minutes=form.duration.data) if form.duration.data else Show.DEFAULT_DURATION
+    return {
+      'start_time': form.start_time.data,
+      'end_time': form.start_time.data + duration,
+      'venue_id': int(form.venue_id.data),
+      'artist_id': int(form.artist_id.data)
+    }
+
+  def check_batch(self, batch):
+    errors = {}
+    for number, form in batch:
+      problems = {}
+      if parse_id(form.venue_id.data) is None:
+        problems['venue_id'] = ['Not a number.']
+      if parse_id(form.artist_id.data) is None:
+        problems['artist_id'] = ['Not a number.']
+      if problems:
+        errors[number] = problems
+
+    # Unknown venues/artists and double bookings, for the records that
+    # passed so far
+    numbers = [number for number, _ in batch if number not in errors]
+    forms = dict(batch)
+    conflicts = booking.check_schedule([self.row(forms[number]) for number in numbers])
+    for position, problems in conflicts.items():
+      errors[numbers[position]] = problems
+    return errors
+
+  def insert(self, batch):
+    rows = [self.row(form) for _, form in batch]
+    if self.use_copy:
+      self.copy(rows)
+    elif db.engine.dialect.name == 'postgresql':
+      db.session.execute(Show.__table__.insert().values(rows))
+    else:
+      # executemany; a multi-row VALUES would run into SQLite's bound
+      # parameter limit on large batches
+      db.session.execute(Show.__table__.insert(), rows)
+    venue_ids = {row['venue_id'] for row in rows}
+    artist_ids = {row['artist_id'] for row in rows}
+    refresh_show_counts(venue_ids, artist_ids)
+    # The new shows, by a (venue_id, start_time) range scan
+    feed.add_shows(Show.venue_id.in_(venue_ids),
+                   Show.start_time >= min(row['start_time'] for row in rows),
+                   Show.start_time <= max(row['start_time'] for row in rows))
+    self.venue_ids |= venue_ids
+    self.artist_ids |= artist_ids
+
+  def copy(self, rows):
+    # COPY bypasses the column defaults, so the timestamps go in explicitly
+    now = datetime.utcnow().isoformat()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+      writer.writerow([row['start_time'].isoformat(), row['end_time'].isoformat(),
+                       row['venue_id'], row['artist_id'], now, now])
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert('COPY "Show" (start_time, end_time, venue_id, artist_id, created_at, updated_at) '
+                       'FROM STDIN WITH (FORMAT csv)', buffer)
+
+  def finish(self):
+    response_cache.invalidate('shows', 'venues', 'artists',
+                              *['venue:{}'.format(id) for id in self.venue_ids] +
+                              ['artist:{}'.format(id) for id in self.artist_ids])
+
+def read_checkpoint(path):
+  if path and os.path.exists(path):
+    with open(path) as f:
+      return json.load(f)['records']
+  return 0
+
+def write_checkpoint(path, records):
+  tmp = path + '.tmp'
+  with open(tmp, 'w') as f:
+    json.dump({'records': records}, f)
+  os.replace(tmp, path)
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']),
+              help='Input format; defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='Checkpoint file. [default: PATH.checkpoint]')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False),
+              help='Write rejected records here as JSONL instead of to stderr.')
+@click.option('--copy/--no-copy', 'use_copy', default=None,
+              help='Load shows with COPY. [default: on for Postgres]')
+@with_appcontext
+def import_command(kind, path, format, batch_size, checkpoint, errors_path, use_copy):
+  """Import venues, artists or shows from a CSV or JSONL file."""
+  format = format or ('jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+  checkpoint = checkpoint or path + '.checkpoint'
+  if use_copy is None:
+    use_copy = db.engine.dialect.name == 'postgresql'
+  importer = {
+    'venues': VenueImporter,
+    'artists': ArtistImporter,
+    'shows': lambda: ShowImporter(use_copy),
+  }[kind]()
+
+  skip = read_checkpoint(checkpoint)
+  if skip:
+    click.echo('Resuming after record {}.'.format(skip))
+  errors_file = open(errors_path, 'a') if errors_path else None
+  counts = {'inserted': 0, 'rejected': 0}
+
+  def reject(number, errors):
+    counts['rejected'] += 1
+    line = json.dumps({'record': number, 'errors': errors})
+    if errors_file:
+      errors_file.write(line + '\n')
+    else:
+      click.echo(line, err=True)
+
+  def flush(batch, consumed):
+    bad = importer.check_batch(batch)
+    for number, errors in sorted(bad.items()):
+      reject(number, errors)
+    batch = [item for item in batch if item[0] not in bad]
+    if batch:
+      importer.insert(batch)
+    db.session.commit()
+    write_checkpoint(checkpoint, consumed)
+    counts['inserted'] += len(batch)
+
+  try:
+    batch = []
+    number = 0
+    for number, record in enumerate(read_records(path, format), 1):
+      if number <= skip:
+        continue
+      form, errors = importer.validate(record)
+      if errors:
+        reject(number, errors)
+      else:
+        batch.append((number, form))
+      if len(batch) >= batch_size:
+        flush(batch, number)
+        batch = []
+        click.echo('{} records read, {} inserted, {} rejected.'.format(number, counts['inserted'], counts['rejected']))
+    flush(batch, number)
+    importer.finish()
+  finally:
+    if errors_file:
+      errors_file.close()
+
+  os.remove(checkpoint)
+  click.echo('Done: {} inserted, {} rejected.'.format(counts['inserted'], counts['rejected']))
+
+def init_app(app):
+  app.cli.add_command(import_command)
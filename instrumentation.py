@@ -0,0 +1,158 @@
+#----------------------------------------------------------------------------#
+# Per-request SQL instrumentation.
+#
+# Listeners on every engine of `db` count and time each statement run while
+# a request is being handled. When the request finishes the totals are sent
+# as a Server-Timing header and logged as one JSON line on the 'fyyur.sql'
+# logger. Statements are grouped by shape (the SQL with IN-lists collapsed);
+# a shape run more than SQL_REPEAT_THRESHOLD times in one request is the
+# mark of an N+1 loop and is logged as a warning, or raises
+# RepeatedQueryError when SQL_STRICT is set (use that in tests). Requests
+# that run more statements than their view's budget in loading.py are
+# logged too, or raise QueryBudgetExceeded under SQL_STRICT.
+#
+# Statements a streamed response runs while its body is sent (the
+# calendars of calendars.py, the exports of export.py) come after the
+# after_request hook: they are not in the header, the log line or the
+# budget check. assert_max_queries() counts them when the block reads the
+# body.
+#----------------------------------------------------------------------------#
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+
+import loading
+from models import db
+
+logger = logging.getLogger('fyyur.sql')
+
+ENVIRON_KEY = 'fyyur.sql_stats'
+
+# "IN (?, ?, ?)" and "IN (%(id_1)s, %(id_2)s)" both become "IN (?)"
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s)(?:\s*,\s*(?:\?|%\(\w+\)s))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+class RepeatedQueryError(Exception):
+  pass
+
+class QueryBudgetExceeded(AssertionError):
+  pass
+
+def statement_shape(statement):
+  return _PLACEHOLDER_LIST.sub('(?)', _WHITESPACE.sub(' ', statement).strip())
+
+class RequestStats(object):
+  def __init__(self, threshold, strict):
+    self.threshold = threshold
+    self.strict = strict
+    self.started = time.perf_counter()
+    self.queries = 0
+    self.seconds = 0.0
+    self.shapes = Counter()
+    self._lock = threading.Lock()
+
+  def record(self, statement, seconds):
+    shape = statement_shape(statement)
+    with self._lock:
+      self.queries += 1
+      self.seconds += seconds
+      self.shapes[shape] += 1
+      count = self.shapes[shape]
+    if self.strict and count > self.threshold:
+      raise RepeatedQueryError('Statement ran {} times in one request (limit {}): {}'.format(
+        count, self.threshold, shape))
+
+  def repeated(self):
+    return [(shape, count) for shape, count in self.shapes.most_common() if count > self.threshold]
+
+def current_stats():
+  """The RequestStats of the request being handled, or None."""
+  if has_request_context():
+    return request.environ.get(ENVIRON_KEY)
+  return None
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+  """Fail if the block runs more than limit SQL statements.
+
+    with assert_max_queries(4):
+      client.get('/venues/1')
+
+  Yields the list of statements run so far.
+  """
+  statements = []
+  def count(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+  engine = engine or db.engine
+  event.listen(engine, 'before_cursor_execute', count)
+  try:
+    yield statements
+  finally:
+    event.remove(engine, 'before_cursor_execute', count)
+  if len(statements) > limit:
+    raise QueryBudgetExceeded('{} statements, expected at most {}:\n{}'.format(
+      len(statements), limit, '\n'.join(statement_shape(s) for s in statements)))
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  # On the statement's own execution context: a statement that fails gets
+  # no after_cursor_execute, and must not leave a start time behind
+  context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  elapsed = time.perf_counter() - context._query_start
+  stats = current_stats()
+  if stats is not None:
+    stats.record(statement, elapsed)
+
+def instrument_engine(engine):
+  event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+  event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+def _start_request():
+  if current_app.config['SQL_INSTRUMENTATION']:
+    request.environ[ENVIRON_KEY] = RequestStats(
+      current_app.config['SQL_REPEAT_THRESHOLD'], current_app.config['SQL_STRICT'])
+
+def _finish_request(response):
+  stats = current_stats()
+  if stats is None:
+    return response
+  total_ms = (time.perf_counter() - stats.started) * 1000
+  db_ms = stats.seconds * 1000
+  response.headers.add('Server-Timing', 'db;dur={:.2f};desc="{} queries"'.format(db_ms, stats.queries))
+  response.headers.add('Server-Timing', 'app;dur={:.2f}'.format(total_ms))
+
+  repeated = stats.repeated()
+  budget = loading.max_queries(request.endpoint)
+  over_budget = budget is not None and stats.queries > budget
+  logger.log(logging.WARNING if repeated or over_budget else logging.INFO, json.dumps({
+    'method': request.method,
+    'path': request.path,
+    'endpoint': request.endpoint,
+    'status': response.status_code,
+    'queries': stats.queries,
+    'max_queries': budget,
+    'db_ms': round(db_ms, 2),
+    'total_ms': round(total_ms, 2),
+    'repeated': [{'count': count, 'statement': shape[:300]} for shape, count in repeated],
+  }))
+  if over_budget and stats.strict:
+    raise QueryBudgetExceeded('{} ran {} statements, budget {}'.format(request.endpoint, stats.queries, budget))
+  return response
+
+def init_app(app):
+  app.config.setdefault('SQL_INSTRUMENTATION', True)
+  app.config.setdefault('SQL_REPEAT_THRESHOLD', 10)
+  app.config.setdefault('SQL_STRICT', False)
+  if instrument_engine not in db.engine_hooks:
+    db.engine_hooks.append(instrument_engine)
+  app.before_request(_start_request)
+  app.after_request(_finish_request)
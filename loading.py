@@ -0,0 +1,153 @@
+#----------------------------------------------------------------------------#
+# Loading profiles.
+#
+# Every view declares here how it loads what it renders:
+#
+#   options      loader options for the entities it queries through the ORM.
+#                Relationships not named are raiseload, so a view or template
+#                that reaches for an undeclared relationship fails at once
+#                instead of lazy loading it row by row.
+#   columns      the column projection it selects instead of entities.
+#   max_queries  the most SQL statements one request may run, whatever the
+#                size of the data. instrumentation.py checks it on every
+#                request, tests/test_query_budgets.py and bench.run --check
+#                on every route.
+#
+# Venue.shows, Artist.shows and the genre collections stay lazy='select' in
+# models.py; the views opt in to what they need here.
+#----------------------------------------------------------------------------#
+
+from flask import request
+from sqlalchemy.orm import raiseload, selectinload
+
+from models import Venue, Artist, Show, ShowFeed
+
+class Profile(object):
+  def __init__(self, options=(), columns=(), max_queries=None):
+    self.options = tuple(options)
+    self.columns = tuple(columns)
+    self.max_queries = max_queries
+
+  def query(self, model):
+    """model.query with this profile's loader options."""
+    return self.apply(model.query)
+
+  def apply(self, query):
+    return query.options(*self.options + (raiseload('*'),))
+
+# A row of a show calendar (calendars.py)
+CALENDAR_COLUMNS = (
+  Show.id,
+  Show.start_time,
+  Show.end_time,
+  Venue.id.label('venue_id'),
+  Venue.name.label('venue_name'),
+  Venue.city.label('venue_city'),
+  Venue.state.label('venue_state'),
+  Artist.id.label('artist_id'),
+  Artist.name.label('artist_name'),
+  Artist.image_link.label('artist_image_link'),
+)
+
+PROFILES = {
+  # Venues
+  'venues.venues': Profile(
+    columns=(
+      Venue.city,
+      Venue.state,
+      Venue.id,
+      Venue.name,
+      Venue.upcoming_shows_count.label('num_upcoming_shows'),
+      Venue.updated_at,
+    ),
+    max_queries=1),
+  'venues.search_venues': Profile(max_queries=3),
+  'venues.venues_by_genre': Profile(max_queries=1),
+  'venues.show_venue': Profile(
+    options=(selectinload(Venue.genres),),
+    columns=(
+      Artist.id.label('artist_id'),
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link'),
+      Show.start_time,
+    ),
+    max_queries=5),
+  'venues.create_venue_form': Profile(max_queries=0),
+  'venues.create_venue_submission': Profile(max_queries=6),
+  'venues.edit_venue': Profile(options=(selectinload(Venue.genres),), max_queries=2),
+  'venues.edit_venue_submission': Profile(options=(selectinload(Venue.genres),), max_queries=11),
+  # The venue's name, then its shows
+  'venues.venue_calendar': Profile(columns=CALENDAR_COLUMNS, max_queries=2),
+  # Deleting a venue goes through its shows, feed rows and genre rows, then
+  # recounts the shows of the artists it had booked
+  'venues.delete_venue': Profile(options=(selectinload(Venue.shows), selectinload(Venue.genres)), max_queries=9),
+
+  # Artists
+  'artists.artists': Profile(columns=(Artist.id, Artist.name, Artist.updated_at), max_queries=1),
+  'artists.search_artists': Profile(max_queries=3),
+  'artists.artists_by_genre': Profile(max_queries=1),
+  'artists.show_artist': Profile(
+    options=(selectinload(Artist.genres),),
+    columns=(
+      Venue.id.label('venue_id'),
+      Venue.name.label('venue_name'),
+      Venue.image_link.label('venue_image_link'),
+      Show.start_time,
+    ),
+    max_queries=5),
+  'artists.artist_calendar': Profile(columns=CALENDAR_COLUMNS, max_queries=2),
+  'artists.create_artist_form': Profile(max_queries=0),
+  'artists.create_artist_submission': Profile(max_queries=6),
+  'artists.edit_artist': Profile(options=(selectinload(Artist.genres),), max_queries=2),
+  'artists.edit_artist_submission': Profile(options=(selectinload(Artist.genres),), max_queries=11),
+
+  # Shows
+  # The listing, from the show feed (feed.py), or a calendar: one range
+  # scan however many chunks it takes
+  'shows.shows': Profile(
+    columns=(
+      ShowFeed.show_id.label('id'),
+      ShowFeed.start_time,
+      ShowFeed.venue_id,
+      ShowFeed.venue_name,
+      ShowFeed.artist_id,
+      ShowFeed.artist_name,
+      ShowFeed.artist_image_link,
+    ),
+    max_queries=1),
+  'shows.create_shows': Profile(max_queries=0),
+  # The venue/artist lookup and two booking-check range scans, the insert,
+  # the show counters and the feed
+  'shows.create_show_submission': Profile(max_queries=8),
+
+  # JSON API; the columns are the schemas in api.py
+  'api.venues': Profile(max_queries=1),
+  'api.venue': Profile(max_queries=4),
+  'api.artists': Profile(max_queries=1),
+  'api.artist': Profile(max_queries=4),
+  'api.shows': Profile(max_queries=1),
+
+  # Name autocomplete, from memory; one query to build or refresh the
+  # process's index (autocomplete.py)
+  'autocomplete.venues': Profile(max_queries=1),
+  'autocomplete.artists': Profile(max_queries=1),
+
+  # Streaming exports: one query, read in chunks
+  'export.dump': Profile(max_queries=1),
+
+  # Recently listed venues and artists
+  'pages.index': Profile(max_queries=2),
+}
+
+def shows_to_list(query):
+  # Turn the rows of a Show column projection into the dicts the templates use
+  return [row._asdict() for row in query]
+
+def profile(endpoint=None):
+  """The profile of an endpoint, by default the one being requested."""
+  return PROFILES[endpoint or request.endpoint]
+
+def max_queries(endpoint):
+  """The query budget of an endpoint, or None if it has none."""
+  entry = PROFILES.get(endpoint)
+  return entry.max_queries if entry is not None else None
@@ -27,6 +27,22 @@ config.set_main_option(
     str(current_app.extensions['migrate'].db.engine.url).replace('%', '%%'))
 target_metadata = current_app.extensions['migrate'].db.metadata
 
+# Schema kept outside the metadata, which autogenerate must not propose to
+# drop: the pg_trgm indexes models.py creates with DDL, and the FTS5 search
+# tables (with their <name>_data, _idx, ... shadow tables) on SQLite
+from models import TRIGRAM_INDEXES
+from search import FTS5SearchBackend
+DDL_INDEXES = {name for name, _, _ in TRIGRAM_INDEXES}
+SEARCH_TABLES = {table for table, _, _ in FTS5SearchBackend.tables.values()}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'index':
+        return name not in DDL_INDEXES
+    if type_ == 'table' and reflected and compare_to is None:
+        return name not in SEARCH_TABLES and name.rsplit('_', 1)[0] not in SEARCH_TABLES
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,7 +63,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True
+        url=url, target_metadata=target_metadata, literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -83,6 +100,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
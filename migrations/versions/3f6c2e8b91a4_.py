@@ -0,0 +1,50 @@
+"""add upcoming/past show counters to Venue and Artist
+
+Revision ID: 3f6c2e8b91a4
+Revises: e7a3b90c4d16
+Create Date: 2026-10-18 12:41:07.377950
+
+"""
+from datetime import datetime
+
+from alembic import op
+from flask import current_app
+import pytz
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2e8b91a4'
+down_revision = 'e7a3b90c4d16'
+branch_labels = None
+depends_on = None
+
+show = sa.table('Show', sa.column('id', sa.Integer), sa.column('start_time', sa.DateTime),
+                sa.column('venue_id', sa.Integer), sa.column('artist_id', sa.Integer))
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill; `flask roll-forward` keeps the counts current from here on.
+    # Show.start_time is wall time in SHOW_TIMEZONE, as in models.show_now()
+    tz = pytz.timezone(current_app.config.get('SHOW_TIMEZONE', 'UTC'))
+    now = datetime.now(tz).replace(tzinfo=None)
+    for table, key in (('Venue', show.c.venue_id), ('Artist', show.c.artist_id)):
+        entity = sa.table(table, sa.column('id', sa.Integer),
+                          sa.column('upcoming_shows_count', sa.Integer),
+                          sa.column('past_shows_count', sa.Integer))
+        counts = sa.select([sa.func.count(show.c.id)]).where(key == entity.c.id)
+        op.execute(entity.update().values(
+            upcoming_shows_count=counts.where(show.c.start_time >= now).as_scalar(),
+            past_shows_count=counts.where(show.c.start_time < now).as_scalar()
+        ))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
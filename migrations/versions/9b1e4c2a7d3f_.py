@@ -0,0 +1,28 @@
+"""add Show start_time and foreign key indexes
+
+Revision ID: 9b1e4c2a7d3f
+Revises: 146afd19f079
+Create Date: 2026-10-18 09:12:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1e4c2a7d3f'
+down_revision = '146afd19f079'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_start_time', 'Show', ['start_time'], unique=False)
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_start_time', table_name='Show')
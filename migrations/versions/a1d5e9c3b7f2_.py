@@ -0,0 +1,57 @@
+"""add Show.end_time and double-booking constraints
+
+Revision ID: a1d5e9c3b7f2
+Revises: 3f6c2e8b91a4
+Create Date: 2026-10-18 14:02:36.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d5e9c3b7f2'
+down_revision = '3f6c2e8b91a4'
+branch_labels = None
+depends_on = None
+
+# Existing shows get the default two hour slot (Show.DEFAULT_DURATION).
+# On Postgres, double bookings already in the table make the exclusion
+# constraints fail to build; clear those up first.
+DEFAULT_MINUTES = 120
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # SQLite keeps datetimes as text; keep the fractional seconds of
+        # start_time so end_time sorts and compares the same way
+        op.execute("UPDATE \"Show\" SET end_time = strftime('%Y-%m-%d %H:%M:%S', start_time, "
+                   "'+{} minutes') || substr(start_time, 20)".format(DEFAULT_MINUTES))
+    else:
+        op.execute("UPDATE \"Show\" SET end_time = start_time + interval '{} minutes'".format(DEFAULT_MINUTES))
+
+    with op.batch_alter_table('Show') as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint('ck_Show_end_after_start', 'end_time > start_time')
+
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for key in ('venue_id', 'artist_id'):
+            op.execute('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{0}_overlap" '
+                       'EXCLUDE USING gist ({0} WITH =, tsrange(start_time, end_time) WITH &&)'.format(key))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for key in ('artist_id', 'venue_id'):
+            op.drop_constraint('ex_Show_{}_overlap'.format(key), 'Show')
+    with op.batch_alter_table('Show') as batch_op:
+        # SQLite's batch copy doesn't reflect CHECK constraints, so there
+        # the constraint goes with the table rebuild
+        if dialect != 'sqlite':
+            batch_op.drop_constraint('ck_Show_end_after_start', type_='check')
+        batch_op.drop_column('end_time')
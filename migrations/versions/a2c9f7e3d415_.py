@@ -0,0 +1,44 @@
+"""add the Artist keyset pagination index, make the listing sort keys NOT NULL
+
+Revision ID: a2c9f7e3d415
+Revises: f1c6b3a9e254
+Create Date: 2026-10-18 19:02:37.614208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2c9f7e3d415'
+down_revision = 'f1c6b3a9e254'
+branch_labels = None
+depends_on = None
+
+# The sort key columns of /venues and /artists. A row-value comparison is
+# never true for a NULL, so such rows would drop out of keyset paging.
+SORT_COLUMNS = {
+    'Venue': ('state', 'city'),
+    'Artist': ('name',),
+}
+
+
+def upgrade():
+    for table, columns in SORT_COLUMNS.items():
+        for column in columns:
+            rows = sa.table(table, sa.column(column, sa.String))
+            op.execute(rows.update().where(rows.c[column].is_(None)).values({column: ''}))
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.String(), nullable=False)
+
+    # The Venue one, (state, city, id), is d3a7c5e1f820's
+    op.create_index('ix_Artist_name_id', 'Artist', ['name', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_id', table_name='Artist')
+    for table, columns in SORT_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.String(), nullable=True)
@@ -0,0 +1,51 @@
+"""add created_at/updated_at to Venue, Artist and Show
+
+Revision ID: b8e2f4d61c09
+Revises: a1d5e9c3b7f2
+Create Date: 2026-10-18 15:20:44.103962
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2f4d61c09'
+down_revision = 'a1d5e9c3b7f2'
+branch_labels = None
+depends_on = None
+
+TABLES = ('Venue', 'Artist', 'Show')
+
+# SQLite's batch mode rebuilds the table without reflecting its CHECK
+# constraints; hand them over again.
+TABLE_ARGS = {
+    'Show': (sa.CheckConstraint('end_time > start_time', name='ck_Show_end_after_start'),),
+}
+
+
+def upgrade():
+    # Existing rows are stamped with the time of the migration
+    now = datetime.utcnow()
+    for table in TABLES:
+        op.add_column(table, sa.Column('created_at', sa.DateTime(), nullable=True))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        stamps = sa.table(table, sa.column('created_at', sa.DateTime), sa.column('updated_at', sa.DateTime))
+        op.execute(stamps.update().values(created_at=now, updated_at=now))
+        with op.batch_alter_table(table, table_args=TABLE_ARGS.get(table, ())) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+    op.create_index('ix_Venue_created_at', 'Venue', ['created_at'], unique=False)
+    op.create_index('ix_Artist_created_at', 'Artist', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Artist_created_at', table_name='Artist')
+    op.drop_index('ix_Venue_created_at', table_name='Venue')
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, table_args=TABLE_ARGS.get(table, ())) as batch_op:
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('created_at')
@@ -0,0 +1,124 @@
+"""move genres into Genre and VenueGenre/ArtistGenre link tables (expand)
+
+The Venue.genres/Artist.genres strings stay until the contract revision
+(c7e1d94b3a58) drops them, so code that still reads them keeps working
+while this one is deployed.
+
+Revision ID: c4d8a1f05e27
+Revises: 9b1e4c2a7d3f
+Create Date: 2026-10-18 10:03:11.502917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8a1f05e27'
+down_revision = '9b1e4c2a7d3f'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+genre = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+
+
+def _entities(name):
+    return sa.table(name, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+
+
+def _links(name, key):
+    return sa.table(name, sa.column(key, sa.Integer), sa.column('genre_id', sa.Integer))
+
+
+def _batches(bind, entities):
+    # Walk the table by primary key so no batch holds more than BATCH_SIZE rows
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select([entities.c.id, entities.c.genres])
+            .where(entities.c.id > last_id)
+            .order_by(entities.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _backfill(bind, entities, links, key, genre_ids):
+    for rows in _batches(bind, entities):
+        pairs = []
+        for row in rows:
+            names = dict.fromkeys(n.strip() for n in (row.genres or '').split(',') if n.strip())
+            for name in names:
+                if name not in genre_ids:
+                    bind.execute(genre.insert().values(name=name))
+                    genre_ids[name] = bind.execute(
+                        sa.select([genre.c.id]).where(genre.c.name == name)
+                    ).scalar()
+                pairs.append({key: row.id, 'genre_id': genre_ids[name]})
+        if pairs:
+            bind.execute(links.insert(), pairs)
+
+
+def _restore(bind, entities, links, key):
+    for rows in _batches(bind, entities):
+        for row in rows:
+            names = [name for (name,) in bind.execute(
+                sa.select([genre.c.name])
+                .select_from(links.join(genre, links.c.genre_id == genre.c.id))
+                .where(links.c[key] == row.id)
+                .order_by(genre.c.name)
+            )]
+            bind.execute(
+                entities.update().where(entities.c.id == row.id).values(genres=','.join(names) or None)
+            )
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('VenueGenre',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_VenueGenre_genre_id', 'VenueGenre', ['genre_id'], unique=False)
+    op.create_table('ArtistGenre',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_ArtistGenre_genre_id', 'ArtistGenre', ['genre_id'], unique=False)
+
+    # Backfill the link tables from the comma-joined strings in batches;
+    # the old columns are left in place.
+    bind = op.get_bind()
+    genre_ids = {}
+    _backfill(bind, _entities('Venue'), _links('VenueGenre', 'venue_id'), 'venue_id', genre_ids)
+    _backfill(bind, _entities('Artist'), _links('ArtistGenre', 'artist_id'), 'artist_id', genre_ids)
+
+
+def downgrade():
+    # The strings are still there; bring them up to date with the link
+    # tables, which have the edits made since the upgrade
+    bind = op.get_bind()
+    _restore(bind, _entities('Venue'), _links('VenueGenre', 'venue_id'), 'venue_id')
+    _restore(bind, _entities('Artist'), _links('ArtistGenre', 'artist_id'), 'artist_id')
+
+    op.drop_index('ix_ArtistGenre_genre_id', table_name='ArtistGenre')
+    op.drop_table('ArtistGenre')
+    op.drop_index('ix_VenueGenre_genre_id', table_name='VenueGenre')
+    op.drop_table('VenueGenre')
+    op.drop_table('Genre')
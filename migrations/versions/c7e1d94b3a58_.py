@@ -0,0 +1,101 @@
+"""drop Venue.genres and Artist.genres (contract)
+
+The link tables were created and backfilled by c4d8a1f05e27; nothing reads
+the old strings since. Rows written by older code between the two
+revisions are backfilled once more before the columns go.
+
+Revision ID: c7e1d94b3a58
+Revises: a2c9f7e3d415
+Create Date: 2026-10-18 19:24:51.208345
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e1d94b3a58'
+down_revision = 'a2c9f7e3d415'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+genre = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+
+LINKS = (
+    ('Venue', 'VenueGenre', 'venue_id'),
+    ('Artist', 'ArtistGenre', 'artist_id'),
+)
+
+
+def _entities(name):
+    return sa.table(name, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+
+
+def _links(name, key):
+    return sa.table(name, sa.column(key, sa.Integer), sa.column('genre_id', sa.Integer))
+
+
+def _batches(bind, entities):
+    # Walk the table by primary key so no batch holds more than BATCH_SIZE rows
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select([entities.c.id, entities.c.genres])
+            .where(entities.c.id > last_id)
+            .order_by(entities.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _catch_up(bind, entities, links, key):
+    # Link the rows that have genre strings but no links yet
+    for rows in _batches(bind, entities):
+        linked = {id for (id,) in bind.execute(
+            sa.select([links.c[key]]).where(links.c[key].in_([row.id for row in rows])))}
+        pairs = []
+        for row in rows:
+            if row.id in linked:
+                continue
+            for name in dict.fromkeys(n.strip() for n in (row.genres or '').split(',') if n.strip()):
+                genre_id = bind.execute(sa.select([genre.c.id]).where(genre.c.name == name)).scalar()
+                if genre_id is None:
+                    bind.execute(genre.insert().values(name=name))
+                    genre_id = bind.execute(sa.select([genre.c.id]).where(genre.c.name == name)).scalar()
+                pairs.append({key: row.id, 'genre_id': genre_id})
+        if pairs:
+            bind.execute(links.insert(), pairs)
+
+
+def _restore(bind, entities, links, key):
+    for rows in _batches(bind, entities):
+        for row in rows:
+            names = [name for (name,) in bind.execute(
+                sa.select([genre.c.name])
+                .select_from(links.join(genre, links.c.genre_id == genre.c.id))
+                .where(links.c[key] == row.id)
+                .order_by(genre.c.name)
+            )]
+            bind.execute(
+                entities.update().where(entities.c.id == row.id).values(genres=','.join(names) or None)
+            )
+
+
+def upgrade():
+    bind = op.get_bind()
+    for table, link_table, key in LINKS:
+        _catch_up(bind, _entities(table), _links(link_table, key), key)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table, link_table, key in reversed(LINKS):
+        op.add_column(table, sa.Column('genres', sa.VARCHAR(length=120), autoincrement=False, nullable=True))
+        _restore(bind, _entities(table), _links(link_table, key), key)
@@ -0,0 +1,24 @@
+"""add Venue state/city index, with id for the /venues keyset order
+
+Revision ID: d3a7c5e1f820
+Revises: b8e2f4d61c09
+Create Date: 2026-10-18 16:41:09.527318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7c5e1f820'
+down_revision = 'b8e2f4d61c09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_state_city_id', 'Venue', ['state', 'city', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Venue_state_city_id', table_name='Venue')
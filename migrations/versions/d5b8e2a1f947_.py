@@ -0,0 +1,45 @@
+"""add FTS5 search tables on SQLite
+
+Revision ID: d5b8e2a1f947
+Revises: c7e1d94b3a58
+Create Date: 2026-10-18 19:51:06.330472
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b8e2a1f947'
+down_revision = 'c7e1d94b3a58'
+branch_labels = None
+depends_on = None
+
+# Shadow tables of the fts5 search backend (see search.py), filled from the
+# current rows; the write handlers keep them in step from here on. Other
+# databases skip this revision.
+TABLES = (
+    ('venue_search', 'Venue', 'VenueGenre', 'venue_id'),
+    ('artist_search', 'Artist', 'ArtistGenre', 'artist_id'),
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, entity, link_table, link_key in TABLES:
+        op.execute('DROP TABLE IF EXISTS {}'.format(table))
+        op.execute("CREATE VIRTUAL TABLE {} USING fts5(name, city, state, genres, tokenize='trigram')".format(table))
+        op.execute(
+            'INSERT INTO {table} (rowid, name, city, state, genres) '
+            'SELECT e.id, e.name, e.city, e.state, '
+            '(SELECT group_concat(g.name, \' \') FROM "{link_table}" l '
+            'JOIN "Genre" g ON g.id = l.genre_id WHERE l.{link_key} = e.id) '
+            'FROM "{entity}" e'.format(table=table, entity=entity, link_table=link_table, link_key=link_key))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, _, _, _ in reversed(TABLES):
+        op.execute('DROP TABLE IF EXISTS {}'.format(table))
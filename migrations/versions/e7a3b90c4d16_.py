@@ -0,0 +1,46 @@
+"""add pg_trgm search indexes
+
+Revision ID: e7a3b90c4d16
+Revises: c4d8a1f05e27
+Create Date: 2026-10-18 11:26:52.840163
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3b90c4d16'
+down_revision = 'c4d8a1f05e27'
+branch_labels = None
+depends_on = None
+
+# GIN trigram indexes serve the ILIKE '%term%' predicates of the pg_trgm
+# search backend. Other databases skip this revision: the SQLite backend
+# keeps its own FTS5 shadow tables (see search.py).
+INDEXES = [
+    ('ix_Venue_name_trgm', 'Venue', 'name'),
+    ('ix_Venue_city_trgm', 'Venue', 'city'),
+    ('ix_Venue_state_trgm', 'Venue', 'state'),
+    ('ix_Artist_name_trgm', 'Artist', 'name'),
+    ('ix_Artist_city_trgm', 'Artist', 'city'),
+    ('ix_Artist_state_trgm', 'Artist', 'state'),
+    ('ix_Genre_name_trgm', 'Genre', 'name'),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in INDEXES:
+        op.create_index(name, table, [column], unique=False,
+                        postgresql_using='gin',
+                        postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, column in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
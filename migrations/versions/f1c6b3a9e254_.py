@@ -0,0 +1,46 @@
+"""add ShowFeed, the materialized /shows listing
+
+Revision ID: f1c6b3a9e254
+Revises: d3a7c5e1f820
+Create Date: 2026-10-18 17:32:15.684021
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6b3a9e254'
+down_revision = 'd3a7c5e1f820'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ShowFeed',
+    sa.Column('show_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('venue_name', sa.String(), nullable=True),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('artist_name', sa.String(), nullable=True),
+    sa.Column('artist_image_link', sa.String(length=500), nullable=True),
+    sa.ForeignKeyConstraint(['show_id'], ['Show.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('show_id')
+    )
+    op.create_index('ix_ShowFeed_start_time_show_id', 'ShowFeed', ['start_time', 'show_id'], unique=False)
+    op.create_index('ix_ShowFeed_venue_id', 'ShowFeed', ['venue_id'], unique=False)
+    op.create_index('ix_ShowFeed_artist_id', 'ShowFeed', ['artist_id'], unique=False)
+    # Fill it from the existing shows, as 'flask feed rebuild' does
+    op.execute(
+        'INSERT INTO "ShowFeed" (show_id, start_time, venue_id, venue_name, artist_id, artist_name, artist_image_link) '
+        'SELECT "Show".id, "Show".start_time, "Venue".id, "Venue".name, "Artist".id, "Artist".name, "Artist".image_link '
+        'FROM "Show" JOIN "Venue" ON "Show".venue_id = "Venue".id JOIN "Artist" ON "Show".artist_id = "Artist".id'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_ShowFeed_artist_id', table_name='ShowFeed')
+    op.drop_index('ix_ShowFeed_venue_id', table_name='ShowFeed')
+    op.drop_index('ix_ShowFeed_start_time_show_id', table_name='ShowFeed')
+    op.drop_table('ShowFeed')
@@ -1,24 +1,143 @@
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+import flask_sqlalchemy
+import pytz
+from datetime import datetime, timedelta
+from flask import current_app, has_request_context, request
+from sqlalchemy import DDL, event, orm
+
+# Set by replicas.py to the bind key of the replica a request reads from
+REPLICA_ENVIRON_KEY = 'fyyur.db_replica'
+
+# Sizing options of QueuePool; SQLite engines use NullPool (see
+# flask_sqlalchemy's driver hacks), which takes none of them.
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+class RoutingSession(flask_sqlalchemy.SignallingSession):
+  """SignallingSession that sends a request's reads to its replica.
+
+  While a request routed to a replica is handled, every statement outside
+  a flush runs on that replica's engine. Flushes, and everything outside
+  such a request (commands, writes), run on the primary.
+  """
+
+  def get_bind(self, mapper=None, clause=None):
+    bind_key = request.environ.get(REPLICA_ENVIRON_KEY) if has_request_context() else None
+    if bind_key is not None and not self._flushing:
+      return flask_sqlalchemy.get_state(self.app).db.get_engine(self.app, bind=bind_key)
+    return super(RoutingSession, self).get_bind(mapper, clause)
+
+class SQLAlchemy(flask_sqlalchemy.SQLAlchemy):
+  """flask_sqlalchemy.SQLAlchemy that lets extensions hook engine creation.
+
+  Callables appended to engine_hooks are called with every engine db
+  creates (the default one and any binds), e.g. to attach event listeners.
+  Sessions are RoutingSessions.
+  """
+
+  def __init__(self, *args, **kwargs):
+    self.engine_hooks = []
+    super(SQLAlchemy, self).__init__(*args, **kwargs)
+
+  def create_session(self, options):
+    return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+  def create_engine(self, sa_url, engine_opts):
+    if sa_url.get_backend_name() == 'sqlite':
+      engine_opts = {key: value for key, value in engine_opts.items() if key not in QUEUE_POOL_OPTIONS}
+    engine = super(SQLAlchemy, self).create_engine(sa_url, engine_opts)
+    for hook in self.engine_hooks:
+      hook(engine)
+    return engine
 
 db = SQLAlchemy()
 
-class Venue(db.Model):
+# Many-to-many links between venues/artists and their genres. The primary
+# keys serve lookups from the entity side; the genre_id indexes serve the
+# "venues/artists by genre" queries.
+venue_genres = db.Table('VenueGenre',
+  db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+  db.Index('ix_VenueGenre_genre_id', 'genre_id')
+)
+
+artist_genres = db.Table('ArtistGenre',
+  db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+  db.Index('ix_ArtistGenre_genre_id', 'genre_id')
+)
+
+class Timestamps(object):
+  """created_at/updated_at columns, in UTC.
+
+  updated_at moves on any change to the row, through the ORM or a bulk
+  UPDATE, and on changes to the object's collections (see
+  touch_updated_at), e.g. a venue's genres.
+  """
+  created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+  updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+@event.listens_for(RoutingSession, 'before_flush')
+def touch_updated_at(session, flush_context, instances):
+  now = datetime.utcnow()
+  for obj in session.dirty:
+    if isinstance(obj, Timestamps) and session.is_modified(obj):
+      obj.updated_at = now
+
+class Genre(db.Model):
+  __tablename__ = 'Genre'
+
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String(50), nullable=False, unique=True)
+
+  @classmethod
+  def get_or_create(cls, names):
+    # Returns the Genre rows for names, adding any that don't exist yet
+    names = list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+    if not names:
+      return []
+    genres = {genre.name: genre for genre in cls.query.filter(cls.name.in_(names))}
+    for name in names:
+      if name not in genres:
+        genres[name] = cls(name=name)
+        db.session.add(genres[name])
+    return [genres[name] for name in names]
+
+  def __repr__(self):
+    return f'<Genre {self.id} {self.name}>'
+
+class Venue(Timestamps, db.Model):
   __tablename__ = 'Venue'
+  # Recently listed venues, newest first; the city/state calendar filters;
+  # the /venues keyset order
+  __table_args__ = (
+    db.Index('ix_Venue_created_at', 'created_at'),
+    db.Index('ix_Venue_state_city_id', 'state', 'city', 'id'),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
   name = db.Column(db.String)
-  genres = db.Column(db.String(120))
   address = db.Column(db.String(120))
-  city = db.Column(db.String(120))
-  state = db.Column(db.String(120))
+  # Sort keys of /venues: NOT NULL, or keyset paging would skip the row
+  city = db.Column(db.String(120), nullable=False)
+  state = db.Column(db.String(120), nullable=False)
   phone = db.Column(db.String(120))
   website = db.Column(db.String(200))
   facebook_link = db.Column(db.String(120))
   seeking_talent = db.Column(db.Boolean, default=False)
   seeking_description = db.Column(db.String(120))
   image_link = db.Column(db.String(500))
+  # Denormalized from Show, see refresh_show_counts()
+  upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+  past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
   shows = db.relationship('Show', backref='venue', lazy=True)
+  genres = db.relationship('Genre', secondary=venue_genres, lazy=True, order_by=Genre.name)
+
+  @classmethod
+  def by_genre(cls, name):
+    return cls.query.join(venue_genres).join(Genre).filter(Genre.name == name).order_by(cls.name)
+
+  @property
+  def genre_names(self):
+    return [genre.name for genre in self.genres]
 
   def to_dict(self):
     return {
@@ -38,12 +157,17 @@ class Venue(db.Model):
   def __repr__(self):
     return f'<<Venue {self.id} {self.name}>'
 
-class Artist(db.Model):
+class Artist(Timestamps, db.Model):
   __tablename__ = 'Artist'
+  # Recently listed artists, newest first; the /artists keyset order
+  __table_args__ = (
+    db.Index('ix_Artist_created_at', 'created_at'),
+    db.Index('ix_Artist_name_id', 'name', 'id'),
+  )
 
   id = db.Column(db.Integer, primary_key=True)
-  name = db.Column(db.String)
-  genres = db.Column(db.String(120))
+  # Sort key of /artists, see Venue.city
+  name = db.Column(db.String, nullable=False)
   city = db.Column(db.String(120))
   state = db.Column(db.String(120))
   phone = db.Column(db.String(120))
@@ -52,7 +176,19 @@ class Artist(db.Model):
   seeking_venue = db.Column(db.Boolean, nullable=False, default=False)
   seeking_description = db.Column(db.String(120))
   image_link = db.Column(db.String(500))
+  # Denormalized from Show, see refresh_show_counts()
+  upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+  past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
   shows = db.relationship('Show', backref='artist', lazy=True)
+  genres = db.relationship('Genre', secondary=artist_genres, lazy=True, order_by=Genre.name)
+
+  @classmethod
+  def by_genre(cls, name):
+    return cls.query.join(artist_genres).join(Genre).filter(Genre.name == name).order_by(cls.name)
+
+  @property
+  def genre_names(self):
+    return [genre.name for genre in self.genres]
 
   def to_dict(self):
     return {
@@ -71,13 +207,111 @@ class Artist(db.Model):
   def __repr__(self):
     return f'<Artist {self.id} {self.name}>'
 
-class Show(db.Model):
+def show_now():
+  """The current time as a naive datetime in SHOW_TIMEZONE.
+
+  Show.start_time is stored naive, in that zone; compare it against this
+  rather than datetime.now(), which is in the server's local zone.
+  """
+  tz = pytz.timezone(current_app.config.get('SHOW_TIMEZONE', 'UTC'))
+  return datetime.now(tz).replace(tzinfo=None)
+
+def default_end_time(context):
+  return context.get_current_parameters()['start_time'] + Show.DEFAULT_DURATION
+
+class Show(Timestamps, db.Model):
   __tablename__ = 'Show'
+  # Detail pages and searches filter on one side of the booking plus a
+  # start_time range; /shows orders the whole table by start_time.
+  __table_args__ = (
+    db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.CheckConstraint('end_time > start_time', name='ck_Show_end_after_start'),
+  )
+  DEFAULT_DURATION = timedelta(hours=2)
+  # Bounds the booking checks' range scans, see booking.py
+  MAX_DURATION = timedelta(hours=24)
 
   id = db.Column(db.Integer, primary_key=True)
-  start_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+  start_time = db.Column(db.DateTime, nullable=False, default=show_now, index=True)
+  end_time = db.Column(db.DateTime, nullable=False, default=default_end_time)
   artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
   venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
 
   def __repr__(self):
     return f'<Show {self.id} {self.start_time} artist_id={self.artist_id} venue_id={self.venue_id}>'
+
+# No two shows of a venue, or of an artist, may overlap. Postgres only; the
+# app checks the same with booking.check_schedule() on every database.
+event.listen(Show.__table__, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS btree_gist').execute_if(dialect='postgresql'))
+for key in ('venue_id', 'artist_id'):
+  event.listen(Show.__table__, 'after_create', DDL(
+    'ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{0}_overlap" '
+    'EXCLUDE USING gist ({0} WITH =, tsrange(start_time, end_time) WITH &&)'.format(key)
+  ).execute_if(dialect='postgresql'))
+
+# GIN trigram indexes serving the ILIKE '%term%' predicates of the pg_trgm
+# search backend (see search.py), as migration e7a3b90c4d16 creates them.
+# Postgres only, so DDL rather than db.Index, which would build plain
+# indexes elsewhere; migrations/env.py keeps autogenerate off them.
+TRIGRAM_INDEXES = (
+  ('ix_Venue_name_trgm', Venue, 'name'),
+  ('ix_Venue_city_trgm', Venue, 'city'),
+  ('ix_Venue_state_trgm', Venue, 'state'),
+  ('ix_Artist_name_trgm', Artist, 'name'),
+  ('ix_Artist_city_trgm', Artist, 'city'),
+  ('ix_Artist_state_trgm', Artist, 'state'),
+  ('ix_Genre_name_trgm', Genre, 'name'),
+)
+event.listen(db.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+for name, model, column in TRIGRAM_INDEXES:
+  event.listen(model.__table__, 'after_create', DDL(
+    'CREATE INDEX "{}" ON "{}" USING gin ({} gin_trgm_ops)'.format(name, model.__tablename__, column)
+  ).execute_if(dialect='postgresql'))
+
+def refresh_show_counts(venue_ids=None, artist_ids=None, now=None):
+  """Recompute upcoming_shows_count/past_shows_count from the Show table.
+
+  Only the given venues/artists are updated (None means all of them), each
+  with two (venue_id|artist_id, start_time) index range counts. Call it in
+  the same transaction as any change to their shows.
+  """
+  now = now or show_now()
+  for model, key, ids in ((Venue, Show.venue_id, venue_ids), (Artist, Show.artist_id, artist_ids)):
+    if ids is not None and not ids:
+      continue
+    counts = db.select([db.func.count(Show.id)]).where(key == model.id)
+    query = model.query
+    if ids is not None:
+      query = query.filter(model.id.in_(set(ids)))
+    query.update({
+      model.upcoming_shows_count: counts.where(Show.start_time >= now).as_scalar(),
+      model.past_shows_count: counts.where(Show.start_time < now).as_scalar()
+    }, synchronize_session=False)
+
+class ShowFeed(db.Model):
+  """The /shows listing, materialized: per show, the fields it displays.
+
+  Copies of Show, Venue and Artist columns, kept up to date by feed.py so
+  the listing is one range scan of (start_time, show_id) without joins.
+  """
+  __tablename__ = 'ShowFeed'
+  __table_args__ = (
+    db.Index('ix_ShowFeed_start_time_show_id', 'start_time', 'show_id'),
+    # Rewriting the copies of one venue's or artist's name
+    db.Index('ix_ShowFeed_venue_id', 'venue_id'),
+    db.Index('ix_ShowFeed_artist_id', 'artist_id'),
+  )
+
+  show_id = db.Column(db.Integer, db.ForeignKey('Show.id', ondelete='CASCADE'), primary_key=True, autoincrement=False)
+  start_time = db.Column(db.DateTime, nullable=False)
+  venue_id = db.Column(db.Integer, nullable=False)
+  venue_name = db.Column(db.String)
+  artist_id = db.Column(db.Integer, nullable=False)
+  artist_name = db.Column(db.String)
+  artist_image_link = db.Column(db.String(500))
+
+  def __repr__(self):
+    return f'<ShowFeed {self.show_id} {self.start_time}>'
@@ -0,0 +1,31 @@
+#----------------------------------------------------------------------------#
+# The home page and the error pages.
+#----------------------------------------------------------------------------#
+
+from flask import Blueprint, current_app, render_template
+
+from cache import response_cache
+from models import db, Venue, Artist
+
+bp = Blueprint('pages', __name__)
+
+@bp.route('/')
+@response_cache.cached('venues', 'artists')
+def index():
+  # Newest first, through the created_at indexes
+  limit = current_app.config['RECENTLY_LISTED']
+  recent_venues = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state) \
+    .order_by(Venue.created_at.desc()).limit(limit).all()
+  recent_artists = db.session.query(Artist.id, Artist.name, Artist.city, Artist.state) \
+    .order_by(Artist.created_at.desc()).limit(limit).all()
+  response_cache.tag(*['venue:{}'.format(venue.id) for venue in recent_venues] +
+                     ['artist:{}'.format(artist.id) for artist in recent_artists])
+  return render_template('pages/home.html', recent_venues=recent_venues, recent_artists=recent_artists)
+
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    return render_template('errors/500.html'), 500
@@ -0,0 +1,99 @@
+#----------------------------------------------------------------------------#
+# Keyset (cursor) pagination for the listing pages.
+#
+# A page is fetched with a row-value comparison against the sort key of the
+# last (or first) row the user saw, so every page costs one index range scan
+# of per_page + 1 rows no matter how deep the user pages. Cursors are the
+# sort key of that boundary row, JSON encoded into an opaque URL-safe string.
+#
+# The sort columns must be NOT NULL (a row-value comparison is never true
+# for a NULL, so such rows would drop out of paging) and backed by an index
+# on exactly those columns: ix_Venue_state_city_id, ix_Artist_name_id,
+# ix_ShowFeed_start_time_show_id.
+#----------------------------------------------------------------------------#
+
+import base64
+import json
+from datetime import datetime
+
+from flask import abort
+from sqlalchemy import literal, tuple_
+
+class KeysetPage(object):
+  def __init__(self, items, next_cursor=None, prev_cursor=None):
+    self.items = items
+    self.next_cursor = next_cursor
+    self.prev_cursor = prev_cursor
+
+  @property
+  def has_next(self):
+    return self.next_cursor is not None
+
+  @property
+  def has_prev(self):
+    return self.prev_cursor is not None
+
+def _encode_value(value):
+  if isinstance(value, datetime):
+    return {'dt': value.isoformat()}
+  raise TypeError('Cannot encode {!r} in a cursor'.format(value))
+
+def _decode_value(obj):
+  if set(obj) == {'dt'}:
+    return datetime.fromisoformat(obj['dt'])
+  return obj
+
+def encode_cursor(values):
+  raw = json.dumps(list(values), default=_encode_value, separators=(',', ':'))
+  return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, columns):
+  try:
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    values = json.loads(raw.decode('utf-8'), object_hook=_decode_value)
+  except (ValueError, TypeError):
+    abort(400)
+  if not isinstance(values, list) or len(values) != len(columns):
+    abort(400)
+  # A value of another type (a stray dict, a string for a datetime) would
+  # only fail once bound into the query
+  for column, value in zip(columns, values):
+    if isinstance(value, bool) or not isinstance(value, column.type.python_type):
+      abort(400)
+  return values
+
+def _boundary(columns, values):
+  # Bind the cursor values with the column types so they compare the same
+  # way the stored values do (e.g. SQLite's datetime strings).
+  return tuple_(*[literal(value, type_=column.type) for column, value in zip(columns, values)])
+
+def keyset_paginate(query, columns, key, per_page, after=None, before=None):
+  """Return one KeysetPage of query, ordered ascending by columns.
+
+  key maps a result row to its values for columns. after/before are cursors
+  taken from a previous page's next_cursor/prev_cursor.
+  """
+  if before:
+    values = decode_cursor(before, columns)
+    rows = query.filter(tuple_(*columns) < _boundary(columns, values)) \
+      .order_by(*[column.desc() for column in columns]) \
+      .limit(per_page + 1).all()
+    has_prev = len(rows) > per_page
+    items = rows[:per_page][::-1]
+    has_next = True
+  else:
+    if after:
+      values = decode_cursor(after, columns)
+      query = query.filter(tuple_(*columns) > _boundary(columns, values))
+    rows = query.order_by(*columns).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+    has_prev = bool(after)
+
+  if not items:
+    return KeysetPage(items)
+  return KeysetPage(
+    items,
+    next_cursor=encode_cursor(key(items[-1])) if has_next else None,
+    prev_cursor=encode_cursor(key(items[0])) if has_prev else None
+  )
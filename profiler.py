@@ -0,0 +1,192 @@
+#----------------------------------------------------------------------------#
+# On-demand request profiler.
+#
+# With PROFILER_ENABLED set, a WSGI middleware runs cProfile over a request
+# when it carries a valid signed token in the X-Profile header, or at random
+# for a PROFILER_SAMPLE_RATE share of requests. The profile covers the whole
+# request: queries, ORM loading, filters and template rendering. It is
+# written to PROFILER_DIR as a .prof file (keeping the newest PROFILER_KEEP)
+# and can be browsed and downloaded from /_profiles with the same token.
+# Streamed responses stay streamed: the profiler runs while the app makes
+# each chunk, and the profile is written when the server closes the body.
+# The token is only read from the X-Profile header, never the query string,
+# which ends up in access logs. When PROFILER_ENABLED is off nothing is
+# installed.
+#
+#   flask profiler token          prints a token, valid PROFILER_TOKEN_MAX_AGE
+#   curl -H "X-Profile: <token>" http://localhost:5000/shows
+#----------------------------------------------------------------------------#
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+from datetime import datetime
+
+import click
+from flask import abort, current_app, render_template, request, send_from_directory
+from flask.cli import AppGroup
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+PROFILE_NAME = re.compile(r'^[\w.-]+\.prof$')
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+def _serializer(app):
+  # PROFILER_SECRET lets profiling tokens be handed out (and rotated)
+  # without the key that signs sessions
+  secret = app.config['PROFILER_SECRET'] or app.config['SECRET_KEY']
+  return URLSafeTimedSerializer(secret, salt='fyyur-profiler')
+
+def make_token(app):
+  return _serializer(app).dumps('profile')
+
+def check_token(app, token):
+  if not token:
+    return False
+  try:
+    _serializer(app).loads(token, max_age=app.config['PROFILER_TOKEN_MAX_AGE'])
+  except BadSignature:
+    return False
+  return True
+
+class ProfiledBody(object):
+  """The app's response iterable, profiled while it makes each chunk."""
+
+  def __init__(self, middleware, profile, iterable, environ, started, status):
+    self.middleware = middleware
+    self.profile = profile
+    self.iterable = iterable
+    self.environ = environ
+    self.started = started
+    self.status = status
+
+  def __iter__(self):
+    iterator = iter(self.iterable)
+    while True:
+      self.profile.enable()
+      try:
+        chunk = next(iterator)
+      except StopIteration:
+        return
+      finally:
+        self.profile.disable()
+      yield chunk
+
+  def close(self):
+    try:
+      if hasattr(self.iterable, 'close'):
+        self.profile.enable()
+        try:
+          self.iterable.close()
+        finally:
+          self.profile.disable()
+    finally:
+      self.middleware.save(self.profile, self.environ, (time.perf_counter() - self.started) * 1000,
+                           self.status[0] if self.status else '500')
+
+class ProfilerMiddleware(object):
+  def __init__(self, app, wsgi_app):
+    self.app = app
+    self.wsgi_app = wsgi_app
+
+  def should_profile(self, environ):
+    if environ.get('PATH_INFO', '').startswith('/_profiles'):
+      return False
+    rate = self.app.config['PROFILER_SAMPLE_RATE']
+    if rate and random.random() < rate:
+      return True
+    return check_token(self.app, environ.get('HTTP_X_PROFILE'))
+
+  def __call__(self, environ, start_response):
+    if not self.should_profile(environ):
+      return self.wsgi_app(environ, start_response)
+
+    profile = cProfile.Profile()
+    started = time.perf_counter()
+    status = []
+
+    def capture(code, headers, exc_info=None):
+      status.append(code)
+      return start_response(code, headers, exc_info)
+
+    profile.enable()
+    try:
+      iterable = self.wsgi_app(environ, capture)
+    finally:
+      profile.disable()
+    # Streamed templates run as the server reads the body; saved on close()
+    return ProfiledBody(self, profile, iterable, environ, started, status)
+
+  def save(self, profile, environ, elapsed_ms, status):
+    directory = self.app.config['PROFILER_DIR']
+    os.makedirs(directory, exist_ok=True)
+    path = re.sub(r'[^\w]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+    name = '{}-{}-{}-{}-{:.0f}ms.prof'.format(
+      datetime.utcnow().strftime('%Y%m%dT%H%M%S%f'), environ.get('REQUEST_METHOD', 'GET'),
+      path[:60], status.split()[0], elapsed_ms)
+    profile.dump_stats(os.path.join(directory, name))
+
+    # Rotate: keep only the newest PROFILER_KEEP profiles
+    names = sorted(n for n in os.listdir(directory) if PROFILE_NAME.match(n))
+    for old in names[:-self.app.config['PROFILER_KEEP']]:
+      os.remove(os.path.join(directory, old))
+
+def _authorize():
+  if not check_token(current_app, request.headers.get('X-Profile')):
+    abort(404)
+
+def profiles_index():
+  _authorize()
+  directory = current_app.config['PROFILER_DIR']
+  profiles = []
+  if os.path.isdir(directory):
+    for name in sorted(os.listdir(directory), reverse=True):
+      if PROFILE_NAME.match(name):
+        profiles.append({
+          'name': name,
+          'size_kb': round(os.path.getsize(os.path.join(directory, name)) / 1024.0, 1),
+        })
+  return render_template('pages/profiles.html', profiles=profiles)
+
+def profile_download(name):
+  _authorize()
+  if not PROFILE_NAME.match(name):
+    abort(404)
+  return send_from_directory(current_app.config['PROFILER_DIR'], name, as_attachment=True)
+
+def profile_summary(name):
+  _authorize()
+  path = os.path.join(current_app.config['PROFILER_DIR'], name)
+  if not PROFILE_NAME.match(name) or not os.path.exists(path):
+    abort(404)
+  out = io.StringIO()
+  stats = pstats.Stats(path, stream=out)
+  sort = request.args.get('sort')
+  stats.sort_stats(sort if sort in SORT_KEYS else 'cumulative').print_stats(60)
+  return current_app.response_class(out.getvalue(), mimetype='text/plain')
+
+profiler_cli = AppGroup('profiler', help='Request profiler.')
+
+@profiler_cli.command('token')
+def token_command():
+  """Print a token for the X-Profile header, of profiled requests and /_profiles."""
+  click.echo(make_token(current_app))
+
+def init_app(app):
+  app.config.setdefault('PROFILER_ENABLED', False)
+  app.config.setdefault('PROFILER_SAMPLE_RATE', 0.0)
+  app.config.setdefault('PROFILER_DIR', os.path.join(app.root_path, 'profiles'))
+  app.config.setdefault('PROFILER_KEEP', 100)
+  app.config.setdefault('PROFILER_TOKEN_MAX_AGE', 3600)
+  app.config.setdefault('PROFILER_SECRET', None)
+  app.cli.add_command(profiler_cli)
+  if not app.config['PROFILER_ENABLED']:
+    return
+
+  app.wsgi_app = ProfilerMiddleware(app, app.wsgi_app)
+  app.add_url_rule('/_profiles', 'profiles_index', profiles_index)
+  app.add_url_rule('/_profiles/<name>', 'profile_download', profile_download)
+  app.add_url_rule('/_profiles/<name>/summary', 'profile_summary', profile_summary)
@@ -0,0 +1,66 @@
+#----------------------------------------------------------------------------#
+# Read replicas.
+#
+# With replica binds configured (the 'replica_<n>' keys of SQLALCHEMY_BINDS,
+# filled from DATABASE_REPLICA_URLS), GET and HEAD requests read from one
+# replica picked per request; other methods use the primary. A view
+# overrides the method rule with @use_primary (a GET that must see the
+# latest data, e.g. an edit form) or @use_replica (a read-only POST such as
+# the searches). The routing itself is done by models.RoutingSession.
+#
+# Read-your-writes: a request that commits makes the client read from the
+# primary for the next DB_STICKY_SECONDS, so the page an edit handler
+# redirects to shows the edit however far the replicas lag. Other clients
+# may still see, and cache, the replica's older data until it catches up.
+#
+# To try it locally, copy the SQLite file and point a replica at the copy:
+#   DATABASE_URL=sqlite:///fyyur.db DATABASE_REPLICA_URLS=sqlite:///replica.db
+#----------------------------------------------------------------------------#
+
+import random
+import time
+
+from flask import current_app, has_request_context, request, session
+from sqlalchemy import event
+
+from models import RoutingSession, REPLICA_ENVIRON_KEY
+
+WROTE_ENVIRON_KEY = 'fyyur.db_wrote'
+STICKY_KEY = '_primary_until'
+
+def use_primary(view):
+  view.db_route = 'primary'
+  return view
+
+def use_replica(view):
+  view.db_route = 'replica'
+  return view
+
+def replica_binds(app):
+  return sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key.startswith('replica_'))
+
+def _route_request():
+  binds = current_app.extensions['replicas']
+  if not binds:
+    return
+  view = current_app.view_functions.get(request.endpoint)
+  route = getattr(view, 'db_route', None) or ('replica' if request.method in ('GET', 'HEAD') else 'primary')
+  if route == 'replica' and session.get(STICKY_KEY, 0) < time.time():
+    request.environ[REPLICA_ENVIRON_KEY] = random.choice(binds)
+
+def _after_commit(db_session):
+  if has_request_context():
+    request.environ[WROTE_ENVIRON_KEY] = True
+
+def _stick_to_primary(response):
+  if current_app.extensions['replicas'] and request.environ.get(WROTE_ENVIRON_KEY):
+    session[STICKY_KEY] = time.time() + current_app.config['DB_STICKY_SECONDS']
+  return response
+
+def init_app(app):
+  app.config.setdefault('DB_STICKY_SECONDS', 10)
+  app.extensions['replicas'] = replica_binds(app)
+  if not event.contains(RoutingSession, 'after_commit', _after_commit):
+    event.listen(RoutingSession, 'after_commit', _after_commit)
+  app.before_request(_route_request)
+  app.after_request(_stick_to_primary)
@@ -0,0 +1,206 @@
+#----------------------------------------------------------------------------#
+# Search backends for the venue and artist search pages.
+#
+# Every backend matches the search term case-insensitively anywhere in the
+# name, city, state or genres of a venue/artist ("San Francisco, CA" style
+# terms match on city and state), ranks name matches first and returns a
+# flask_sqlalchemy Pagination.
+#
+#   like    plain ILIKE on the base tables, works everywhere
+#   pg_trgm same ILIKE predicates, served by pg_trgm GIN indexes on Postgres
+#           and ranked by trigram similarity
+#   fts5    FTS5 trigram shadow tables on SQLite for local and test runs
+#
+# SEARCH_BACKEND picks one explicitly, otherwise it follows the database.
+# The FTS5 tables are created by a migration, or by 'flask search rebuild';
+# never by a request, which may be running on a read replica. Whether they
+# exist is checked once per process, before its first request and outside
+# that request's query budget; a worker started before they were created
+# searches the base tables until it restarts.
+#----------------------------------------------------------------------------#
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from flask_sqlalchemy import Pagination
+from sqlalchemy import text
+
+from models import db, Venue, Artist, Genre
+
+def like_pattern(term):
+  # Wrap term for a partial match, escaping LIKE wildcards typed by the user
+  term = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+  return '%{}%'.format(term)
+
+class LikeSearchBackend(object):
+  name = 'like'
+
+  def filter(self, model, term):
+    if ',' in term:
+      city, state = [part.strip() for part in term.split(',', 1)]
+      return db.and_(
+        model.city.ilike(like_pattern(city), escape='\\'),
+        model.state.ilike(like_pattern(state), escape='\\')
+      )
+    pattern = like_pattern(term)
+    return db.or_(
+      model.name.ilike(pattern, escape='\\'),
+      model.city.ilike(pattern, escape='\\'),
+      model.state.ilike(pattern, escape='\\'),
+      model.genres.any(Genre.name.ilike(pattern, escape='\\'))
+    )
+
+  def order_by(self, model, term):
+    name_match = db.case([(model.name.ilike(like_pattern(term), escape='\\'), 0)], else_=1)
+    return [name_match, model.name, model.id]
+
+  def search(self, model, term, page=1, per_page=20):
+    return model.query \
+      .filter(self.filter(model, term)) \
+      .order_by(*self.order_by(model, term)) \
+      .paginate(max(page, 1), per_page, error_out=False)
+
+  # Backends with a separate index keep it in step through these hooks,
+  # called by the write handlers before they commit, in their transaction:
+  # a failure to index rolls the write back with it.
+  def index(self, obj):
+    pass
+
+  def remove(self, model, id):
+    pass
+
+  def rebuild(self):
+    pass
+
+  # Called once before the first request of the process
+  def prepare(self):
+    pass
+
+class TrigramSearchBackend(LikeSearchBackend):
+  # The migration creates gin_trgm_ops indexes on name, city and state (and
+  # Genre.name), which Postgres uses for ILIKE '%term%' predicates.
+  name = 'pg_trgm'
+
+  def order_by(self, model, term):
+    return [db.func.similarity(model.name, term).desc(), model.name, model.id]
+
+class FTS5SearchBackend(LikeSearchBackend):
+  name = 'fts5'
+  tables = {
+    Venue: ('venue_search', 'VenueGenre', 'venue_id'),
+    Artist: ('artist_search', 'ArtistGenre', 'artist_id'),
+  }
+
+  def __init__(self):
+    self._ready = None
+
+  def prepare(self):
+    # On a connection of its own, so the probe is never part of a request's
+    # transaction or query count
+    with db.engine.connect() as connection:
+      existing = {row[0] for row in connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    self._ready = all(table in existing for table, _, _ in self.tables.values())
+    if not self._ready:
+      current_app.logger.warning("No FTS5 search tables; run 'flask db upgrade' or 'flask search rebuild'.")
+
+  def ready(self):
+    # Whether the tables exist; until they do, searches go through the base
+    # tables and writes leave the index alone (rebuild catches up). Outside
+    # requests (the CLI) the probe runs on first use.
+    if self._ready is None:
+      self.prepare()
+    return self._ready
+
+  def search(self, model, term, page=1, per_page=20):
+    # The trigram tokenizer needs at least three characters; shorter terms
+    # and "city, state" terms go through the base tables instead.
+    if len(term) < 3 or ',' in term or not self.ready():
+      return super(FTS5SearchBackend, self).search(model, term, page, per_page)
+    page = max(page, 1)
+    table = self.tables[model][0]
+    params = {'match': '"{}"'.format(term.replace('"', '""')), 'limit': per_page, 'offset': (page - 1) * per_page}
+    total = db.session.execute(
+      text('SELECT count(*) FROM {0} WHERE {0} MATCH :match'.format(table)), params).scalar()
+    ids = [row[0] for row in db.session.execute(text(
+      'SELECT rowid FROM {0} WHERE {0} MATCH :match '
+      'ORDER BY bm25({0}, 10.0, 2.0, 2.0, 1.0), rowid '
+      'LIMIT :limit OFFSET :offset'.format(table)), params)]
+    found = {obj.id: obj for obj in model.query.filter(model.id.in_(ids))} if ids else {}
+    items = [found[id] for id in ids if id in found]
+    return Pagination(None, page, per_page, total, items)
+
+  def index(self, obj):
+    if not self.ready():
+      return
+    table = self.tables[type(obj)][0]
+    db.session.execute(text('DELETE FROM {} WHERE rowid = :id'.format(table)), {'id': obj.id})
+    db.session.execute(text(
+      'INSERT INTO {} (rowid, name, city, state, genres) '
+      'VALUES (:id, :name, :city, :state, :genres)'.format(table)), {
+        'id': obj.id,
+        'name': obj.name,
+        'city': obj.city,
+        'state': obj.state,
+        'genres': ' '.join(obj.genre_names)
+      })
+
+  def remove(self, model, id):
+    if not self.ready():
+      return
+    db.session.execute(text('DELETE FROM {} WHERE rowid = :id'.format(self.tables[model][0])), {'id': id})
+
+  def rebuild(self):
+    for model, (table, link_table, link_key) in self.tables.items():
+      db.session.execute(text('DROP TABLE IF EXISTS {}'.format(table)))
+      db.session.execute(text(
+        "CREATE VIRTUAL TABLE {} USING fts5(name, city, state, genres, tokenize='trigram')".format(table)))
+      db.session.execute(text(
+        'INSERT INTO {table} (rowid, name, city, state, genres) '
+        'SELECT e.id, e.name, e.city, e.state, '
+        '(SELECT group_concat(g.name, \' \') FROM "{link_table}" l '
+        'JOIN "Genre" g ON g.id = l.genre_id WHERE l.{link_key} = e.id) '
+        'FROM "{entity}" e'.format(
+          table=table, link_table=link_table, link_key=link_key, entity=model.__tablename__)))
+    db.session.commit()
+    self._ready = True
+
+BACKENDS = {
+  'like': LikeSearchBackend,
+  'pg_trgm': TrigramSearchBackend,
+  'fts5': FTS5SearchBackend,
+}
+
+DIALECT_BACKENDS = {
+  'postgresql': 'pg_trgm',
+  'sqlite': 'fts5',
+}
+
+def get_backend():
+  backend = current_app.extensions.get('search')
+  if backend is None:
+    name = current_app.config.get('SEARCH_BACKEND') \
+      or DIALECT_BACKENDS.get(db.engine.dialect.name, 'like')
+    backend = current_app.extensions['search'] = BACKENDS[name]()
+  return backend
+
+def _prepare_backend():
+  get_backend().prepare()
+
+search_cli = AppGroup('search', help='Manage the venue/artist search index.')
+
+@search_cli.command('rebuild')
+@with_appcontext
+def rebuild_command():
+  """Rebuild the search index from the Venue and Artist tables."""
+  backend = get_backend()
+  backend.rebuild()
+  click.echo('Rebuilt {} search index.'.format(backend.name))
+
+def init_app(app):
+  app.config.setdefault('SEARCH_BACKEND', None)
+  app.config.setdefault('SEARCH_PAGE_SIZE', 20)
+  # Runs before the request's before_request hooks, so before
+  # instrumentation starts counting its statements
+  app.before_first_request(_prepare_backend)
+  app.cli.add_command(search_cli)
@@ -0,0 +1,95 @@
+#----------------------------------------------------------------------------#
+# Show pages: the listing (or a calendar) and the booking form.
+#----------------------------------------------------------------------------#
+
+import sys
+from datetime import timedelta
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+
+import booking
+import calendars
+import feed
+import loading
+from cache import response_cache
+from forms import ShowForm
+from models import db, Show, ShowFeed, refresh_show_counts
+from pagination import keyset_paginate
+
+bp = Blueprint('shows', __name__)
+
+@bp.route('/shows')
+@response_cache.cached('shows')
+def shows():
+  # With a date range or filters, the day-grouped calendar; else the listing
+  if calendars.requested(request.args):
+    return calendars.render(loading.CALENDAR_COLUMNS, request.args, 'Shows',
+                            city=request.args.get('city'), state=request.args.get('state'),
+                            genre=request.args.get('genre'))
+  # The listing reads the materialized feed, see feed.py
+  query = db.session.query(*loading.profile().columns)
+  page = keyset_paginate(query, [ShowFeed.start_time, ShowFeed.show_id],
+                         key=lambda row: (row.start_time, row.id),
+                         per_page=current_app.config['PAGE_SIZE'],
+                         after=request.args.get('after'), before=request.args.get('before'))
+  data = []
+
+  for item in page.items:
+    response_cache.tag('venue:{}'.format(item.venue_id), 'artist:{}'.format(item.artist_id))
+    data.append({
+      'id': item.id,
+      'venue_id': item.venue_id,
+      'venue_name': item.venue_name,
+      'artist_id': item.artist_id,
+      'artist_name': item.artist_name,
+      'artist_image_link': item.artist_image_link,
+      'start_time': item.start_time
+    })
+  return render_template('pages/shows.html', shows=data, page=page)
+
+@bp.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  form = ShowForm(request.form, meta={'csrf': False})
+  if not form.validate():
+    message = []
+    for field, err in form.errors.items():
+      message.append(field + ' - ' + '|'.join(err))
+    flash('Errors ' + str(message))
+    return redirect(url_for('shows.create_show_submission'))
+  else:
+    try:
+      show = Show()
+      show.venue_id = int(form.venue_id.data)
+      show.artist_id = int(form.artist_id.data)
+      show.start_time = form.start_time.data
+      show.end_time = form.start_time.data + (
+        timedelta(minutes=form.duration.data) if form.duration.data else Show.DEFAULT_DURATION)
+      conflicts = booking.check_schedule([{
+        'venue_id': show.venue_id,
+        'artist_id': show.artist_id,
+        'start_time': show.start_time,
+        'end_time': show.end_time
+      }])
+      if conflicts:
+        flash('Errors ' + str([field + ' - ' + '|'.join(err) for field, err in conflicts[0].items()]))
+        return redirect(url_for('shows.create_show_submission'))
+      db.session.add(show)
+      db.session.flush()
+      refresh_show_counts([show.venue_id], [show.artist_id])
+      feed.add_shows(Show.id == show.id)
+      db.session.commit()
+      response_cache.invalidate('shows', 'venue:{}'.format(show.venue_id), 'artist:{}'.format(show.artist_id))
+      flash('Show created successfully!')
+    except Exception as err:
+      db.session.rollback()
+      print(sys.exc_info())
+      flash('An error occurred creating the Show. Error: {0}'.format(err))
+    finally:
+      db.session.close()
+    return render_template('pages/home.html')
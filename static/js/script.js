@@ -25,3 +25,39 @@ for (let i = 0; i < deleteBtns.length; i++) {
       });
   };
 }
+
+// Name lookups on the show form: each suggestion is "Name #id"; picking one
+// fills in the id field named by data-target.
+const lookups = document.querySelectorAll("input[data-autocomplete]");
+
+for (let i = 0; i < lookups.length; i++) {
+  const lookup = lookups[i];
+  const names = document.getElementById(lookup.getAttribute("list"));
+  const target = document.getElementById(lookup.dataset.target);
+  let timer = null;
+  lookup.oninput = function() {
+    const picked = /#(\d+)$/.exec(lookup.value);
+    if (picked) {
+      target.value = picked[1];
+      return;
+    }
+    clearTimeout(timer);
+    timer = setTimeout(function() {
+      fetch(lookup.dataset.autocomplete + '?q=' + encodeURIComponent(lookup.value))
+        .then(function(response) {
+          return response.json();
+        })
+        .then(function(matches) {
+          names.innerHTML = "";
+          matches.forEach(function(match) {
+            const option = document.createElement("option");
+            option.value = match.name + " #" + match.id;
+            names.appendChild(option);
+          });
+        })
+        .catch(function(e) {
+          console.error(e);
+        });
+    }, 150);
+  };
+}
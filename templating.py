@@ -0,0 +1,76 @@
+#----------------------------------------------------------------------------#
+# Template caches.
+#
+# Bytecode: compiled templates are written to TEMPLATE_BYTECODE_DIR, so a
+# new worker loads them instead of parsing and compiling every template
+# again. Jinja checks each entry against the template's source checksum.
+#
+# Fragments: a block wrapped in
+#
+#   {% cache venue.id, venue.updated_at %} ... {% endcache %}
+#
+# is rendered once per distinct key and then served from an in-process LRU
+# of TEMPLATE_FRAGMENT_CACHE_SIZE entries. The key must name everything the
+# block shows: an entity's id and updated_at, or the values themselves for
+# rows such as the show feed's. Nothing is invalidated; a changed entity
+# has a new key and its old fragment ages out. Keys also carry a hash of
+# the template's source, so an edited template never serves the fragments
+# of its earlier version, and those age out the same way.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import os
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from cache import LRUCache
+
+class FragmentCacheExtension(Extension):
+  tags = {'cache'}
+
+  def __init__(self, environment):
+    super(FragmentCacheExtension, self).__init__(environment)
+    environment.extend(fragment_cache=None, fragment_cache_ttl=0)
+    self._checksums = {}
+
+  def preprocess(self, source, name, filename=None):
+    # Called with the source of each template about to be parsed
+    self._checksums[name] = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+    return source
+
+  def parse(self, parser):
+    lineno = next(parser.stream).lineno
+    # Fragments of different blocks, or versions of a template, never share a key
+    key = [nodes.Const(parser.name), nodes.Const(self._checksums.get(parser.name)),
+           nodes.Const(lineno), parser.parse_expression()]
+    while parser.stream.skip_if('comma'):
+      key.append(parser.parse_expression())
+    body = parser.parse_statements(['name:endcache'], drop_needle=True)
+    return nodes.CallBlock(self.call_method('_render', [nodes.List(key)]), [], [], body).set_lineno(lineno)
+
+  def _render(self, key, caller):
+    cache = self.environment.fragment_cache
+    if cache is None:
+      return caller()
+    key = repr(key)
+    fragment = cache.get(key)
+    if fragment is None:
+      fragment = caller()
+      cache.set(key, fragment, (), cache.begin(), self.environment.fragment_cache_ttl)
+    return fragment
+
+def init_app(app):
+  app.config.setdefault('TEMPLATE_BYTECODE_DIR', None)
+  app.config.setdefault('TEMPLATE_FRAGMENT_CACHE_SIZE', 4096)
+  app.config.setdefault('TEMPLATE_FRAGMENT_CACHE_TTL', 3600)
+
+  directory = app.config['TEMPLATE_BYTECODE_DIR']
+  if directory:
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+  app.jinja_env.add_extension(FragmentCacheExtension)
+  if app.config['TEMPLATE_FRAGMENT_CACHE_SIZE']:
+    app.jinja_env.fragment_cache = LRUCache(max_entries=app.config['TEMPLATE_FRAGMENT_CACHE_SIZE'])
+    app.jinja_env.fragment_cache_ttl = app.config['TEMPLATE_FRAGMENT_CACHE_TTL']
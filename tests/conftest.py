@@ -0,0 +1,33 @@
+import pytest
+
+from app import create_app
+from bench.seed import seed
+from models import db
+
+TEST_CONFIG = {
+  'TESTING': True,
+  # A request that raises pops its context, so the session goes with it
+  'PRESERVE_CONTEXT_ON_EXCEPTION': False,
+  'SECRET_KEY': 'test',
+  'SQLALCHEMY_BINDS': {},
+  'DATABASE_REPLICA_URLS': [],
+  'SQL_STRICT': True,
+  'CACHE_ENABLED': False,
+  'TEMPLATE_BYTECODE_DIR': None,
+  'PROFILER_ENABLED': False,
+}
+
+# A small catalogue; bench.seed fills it the same way on every run
+SIZES = {'venues': 20, 'artists': 40, 'shows': 200}
+
+@pytest.fixture
+def app(tmp_path):
+  app = create_app(dict(TEST_CONFIG, SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'test.db')))
+  with app.app_context():
+    seed(SIZES['venues'], SIZES['artists'], SIZES['shows'])
+  yield app
+  db.session.remove()
+
+@pytest.fixture
+def client(app):
+  return app.test_client()
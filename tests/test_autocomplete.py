@@ -0,0 +1,27 @@
+from autocomplete import PrefixIndex
+from models import Venue
+
+def test_prefix_lookup_after_rename_and_remove():
+  index = PrefixIndex()
+  index.build([(1, 'The Musical Hop'), (2, 'Park Square Live Music & Coffee'), (3, 'The Dueling Pianos Bar')])
+  # In word order: 'music &' sorts before 'musical'
+  assert index.complete('mus') == [(2, 'Park Square Live Music & Coffee'), (1, 'The Musical Hop')]
+  assert [id for id, name in index.complete('the')] == [3, 1]
+
+  index.add(1, 'Hop Street Hall')
+  assert index.complete('mus') == [(2, 'Park Square Live Music & Coffee')]
+  assert index.complete('the') == [(3, 'The Dueling Pianos Bar')]
+  assert index.complete('  STREET ') == [(1, 'Hop Street Hall')]
+
+  index.remove(3)
+  assert index.complete('the') == []
+  assert index.complete('pianos') == []
+  assert len(index) == 2
+
+def test_deleted_venue_is_not_offered(app, client):
+  with app.app_context():
+    venue = Venue.query.first()
+    id, name = venue.id, venue.name
+  assert {'id': id, 'name': name} in client.get('/autocomplete/venues', query_string={'q': name}).get_json()
+  assert client.delete('/venues/{}'.format(id)).status_code == 200
+  assert {'id': id, 'name': name} not in client.get('/autocomplete/venues', query_string={'q': name}).get_json()
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import booking
+from models import db, Show
+
+HOUR = timedelta(hours=1)
+
+def test_windows_merge_where_they_touch():
+  start = datetime(2026, 1, 1)
+  spans = [(start + 20 * HOUR, start + 22 * HOUR), (start, start + 2 * HOUR), (start + 100 * HOUR, start + 101 * HOUR)]
+  assert booking.windows(spans, 24 * HOUR) == [
+    (start - 24 * HOUR, start + 22 * HOUR),
+    (start + 76 * HOUR, start + 101 * HOUR)]
+
+def test_intervals_overlap_only_inside_their_edges():
+  start = datetime(2026, 1, 1, 20)
+  index = booking.IntervalIndex(Show.MAX_DURATION)
+  index.add(1, start, start + 2 * HOUR, 'show')
+  # Back to back is not an overlap; a minute into the show is
+  assert index.find(1, start - HOUR, start) is None
+  assert index.find(1, start + 2 * HOUR, start + 3 * HOUR) is None
+  assert index.find(1, start - HOUR, start + timedelta(minutes=1)) == (start, start + 2 * HOUR, 'show')
+  assert index.find(1, start + 2 * HOUR - timedelta(minutes=1), start + 3 * HOUR) is not None
+  assert index.find(2, start, start + 2 * HOUR) is None
+
+def test_intervals_scan_back_over_the_longest_show():
+  start = datetime(2026, 1, 1)
+  index = booking.IntervalIndex(Show.MAX_DURATION)
+  index.add(1, start, start + Show.MAX_DURATION, 'festival')
+  for hour in range(1, 23):
+    index.add(1, start + hour * HOUR, start + (hour + 1) * HOUR, hour)
+  # Found from the last minute of its day, past the shorter shows after it...
+  later = start + Show.MAX_DURATION - timedelta(minutes=1)
+  assert index.find(1, later, later + HOUR)[2] == 'festival'
+  # ...but not from where it ends
+  assert index.find(1, start + Show.MAX_DURATION, start + Show.MAX_DURATION + HOUR) is None
+
+def test_schedule_conflicts_within_the_batch(app):
+  with app.app_context():
+    start = datetime(2031, 1, 1, 20)
+    conflicts = booking.check_schedule([
+      {'venue_id': 1, 'artist_id': 1, 'start_time': start, 'end_time': start + 2 * HOUR},
+      {'venue_id': 1, 'artist_id': 2, 'start_time': start + HOUR, 'end_time': start + 3 * HOUR},
+      {'venue_id': 1, 'artist_id': 3, 'start_time': start + 3 * HOUR, 'end_time': start + 4 * HOUR},
+    ])
+    assert list(conflicts) == [1]
+    assert list(conflicts[1]) == ['venue_id']
+
+def test_index_reads_only_the_shows_near_the_schedule(app):
+  with app.app_context():
+    start = datetime(2030, 1, 1)
+    for day in range(0, 365, 5):
+      db.session.add(Show(venue_id=1, artist_id=1, start_time=start + timedelta(days=day),
+                          end_time=start + timedelta(days=day) + 2 * HOUR))
+    db.session.commit()
+
+    # Two new shows a year apart read the shows around each, not the year between
+    spans = {1: [(start + timedelta(days=10, hours=1), start + timedelta(days=10, hours=3)),
+                 (start + timedelta(days=360), start + timedelta(days=360, hours=2))]}
+    index = booking.load_index(Show.venue_id, spans)
+    assert len(index) == 2
+    conflicts = booking.check_schedule([{'venue_id': 1, 'artist_id': 2,
+                                         'start_time': spans[1][0][0], 'end_time': spans[1][0][1]}])
+    assert list(conflicts[0]) == ['venue_id']
+
+def test_show_for_an_unknown_venue_is_not_listed(app, client):
+  with app.app_context():
+    shows = Show.query.count()
+  response = client.post('/shows/create', data={
+    'venue_id': '9999', 'artist_id': '1', 'start_time': '2031-01-01 20:00:00'}, follow_redirects=True)
+  assert b'No venue with id 9999.' in response.data
+  assert b'Show created successfully' not in response.data
+  with app.app_context():
+    assert Show.query.count() == shows
@@ -0,0 +1,28 @@
+from cache import LRUCache
+
+def test_invalidation_stamps_are_bounded():
+  cache = LRUCache(max_entries=10)
+  for id in range(1000):
+    cache.invalidate(['venue:{}'.format(id)])
+  assert len(cache._invalidated) == 10
+
+def test_render_across_an_invalidation_is_not_stored():
+  cache = LRUCache(max_entries=10)
+  token = cache.begin()
+  cache.invalidate(['venue:1'])
+  cache.set('/venues/1', 'stale', ('venue:1',), token, 60)
+  assert cache.get('/venues/1') is None
+  cache.set('/venues/2', 'fresh', ('venue:2',), token, 60)
+  assert cache.get('/venues/2') == 'fresh'
+
+def test_render_older_than_the_pruned_stamps_is_not_stored():
+  cache = LRUCache(max_entries=10)
+  token = cache.begin()
+  for id in range(100):
+    cache.invalidate(['venue:{}'.format(id)])
+  # venue:0's stamp is gone; the render may still have read its old data
+  cache.set('/venues/0', 'stale', ('venue:0',), token, 60)
+  assert cache.get('/venues/0') is None
+  token = cache.begin()
+  cache.set('/venues/0', 'fresh', ('venue:0',), token, 60)
+  assert cache.get('/venues/0') == 'fresh'
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from models import db, Show
+
+def day_heading(day):
+  return day.strftime('%A, %B %d, %Y').encode()
+
+def test_calendar_days_are_inclusive(app, client):
+  first = datetime(2031, 3, 1)
+  with app.app_context():
+    for start in (first - timedelta(minutes=1), first, first + timedelta(days=1, hours=23, minutes=59),
+                  first + timedelta(days=2)):
+      db.session.add(Show(venue_id=1, artist_id=1, start_time=start, end_time=start + timedelta(minutes=1)))
+    db.session.commit()
+
+  response = client.get('/venues/1/calendar?from=2031-03-01&to=2031-03-02')
+  assert response.status_code == 200
+  assert day_heading(first) in response.data
+  assert day_heading(first + timedelta(days=1)) in response.data
+  # The shows a minute before and at midnight after the range are left out
+  assert day_heading(first - timedelta(days=1)) not in response.data
+  assert day_heading(first + timedelta(days=2)) not in response.data
+
+def test_calendar_range_bounds(app, client):
+  last = datetime(2031, 1, 1) + timedelta(days=app.config['CALENDAR_MAX_DAYS'] - 1)
+  assert client.get('/shows?from=2031-01-01&to={:%Y-%m-%d}'.format(last)).status_code == 200
+  assert client.get('/shows?from=2031-01-01&to={:%Y-%m-%d}'.format(last + timedelta(days=1))).status_code == 400
+  assert client.get('/shows?from=2031-01-01&to=2031-01-01').status_code == 200
+  assert client.get('/shows?from=2031-01-02&to=2031-01-01').status_code == 400
+  assert client.get('/shows?from=2031-02-30').status_code == 400
+  assert client.get('/artists/1/calendar?to=yesterday').status_code == 400
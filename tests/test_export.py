@@ -0,0 +1,18 @@
+import gzip
+
+from export import make_token
+
+from conftest import SIZES
+
+def test_export_needs_a_token(client):
+  assert client.get('/export/venues.csv').status_code == 404
+  assert client.get('/export/venues.csv?token=forged').status_code == 404
+
+def test_export_with_a_token(app, client):
+  token = make_token(app)
+  response = client.get('/export/venues.csv', headers={'X-Export-Token': token})
+  assert response.status_code == 200
+  assert response.get_data().decode().startswith('id,')
+  response = client.get('/export/shows.ndjson.gz?token=' + token)
+  assert response.status_code == 200
+  assert gzip.decompress(response.get_data()).count(b'\n') == SIZES['shows']
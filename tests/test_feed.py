@@ -0,0 +1,35 @@
+from datetime import datetime
+
+import feed
+from models import db, Show, ShowFeed
+
+def check_command(app):
+  return app.test_cli_runner().invoke(args=['feed', 'check'])
+
+def test_feed_drift_is_detected_and_rebuilt(app):
+  with app.app_context():
+    assert feed.check() == ([], [])
+    stale, gone = [row.show_id for row in ShowFeed.query.order_by(ShowFeed.show_id).limit(2)]
+    ShowFeed.query.filter_by(show_id=stale).update({'venue_name': 'Renamed Elsewhere'})
+    # A show written past the feed, and a feed row outliving its show
+    missing = Show(venue_id=1, artist_id=1, start_time=datetime(2031, 1, 1, 20))
+    db.session.add(missing)
+    Show.query.filter_by(id=gone).delete()
+    db.session.commit()
+
+    wrong, extra = feed.check()
+    assert wrong == sorted([stale, missing.id])
+    assert extra == sorted([stale, gone])
+    assert feed.check(limit=1) == ([min(stale, missing.id)], [min(stale, gone)])
+
+  result = check_command(app)
+  assert result.exit_code == 1
+  assert 'Feed rows that match no show: {}, {}'.format(*sorted([stale, gone])) in result.output
+
+  assert app.test_cli_runner().invoke(args=['feed', 'rebuild']).exit_code == 0
+  result = check_command(app)
+  assert result.exit_code == 0, result.output
+  assert 'The show feed is consistent.' in result.output
+  with app.app_context():
+    assert db.session.query(ShowFeed.venue_name).filter_by(show_id=stale).scalar() != 'Renamed Elsewhere'
+    assert ShowFeed.query.get(missing.id) is not None
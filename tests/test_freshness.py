@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+import freshness
+from models import db, Show, show_now
+
+def test_show_starting_moves_last_modified(app, client, monkeypatch):
+  with app.app_context():
+    now = show_now().replace(microsecond=0)
+    show = Show(venue_id=1, artist_id=1, start_time=now + timedelta(days=400))
+    db.session.add(show)
+    db.session.commit()
+    start_time = show.start_time
+
+  first = client.get('/venues/1')
+  assert first.status_code == 200
+  assert client.get('/venues/1', headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+
+  # Nothing is written when the show starts; the page still changes
+  with app.app_context():
+    later = start_time + timedelta(minutes=1)
+  monkeypatch.setattr(freshness, 'show_now', lambda: later)
+  second = client.get('/venues/1', headers={'If-Modified-Since': first.headers['Last-Modified']})
+  assert second.status_code == 200
+  assert second.last_modified > first.last_modified
+
+def test_show_starting_refreshes_the_cached_page(app, client, monkeypatch):
+  import venues
+  app.config['CACHE_ENABLED'] = True
+  with app.app_context():
+    now = show_now().replace(microsecond=0)
+    show = Show(venue_id=1, artist_id=1, start_time=now + timedelta(days=400))
+    db.session.add(show)
+    db.session.commit()
+    start_time = show.start_time
+
+  first = client.get('/venues/1')
+  assert client.get('/venues/1').headers['X-Cache'] == 'HIT'
+
+  # The show starts: no write and no invalidation, only the clock moves
+  later = start_time + timedelta(minutes=1)
+  monkeypatch.setattr(freshness, 'show_now', lambda: later)
+  monkeypatch.setattr(venues, 'show_now', lambda: later)
+  second = client.get('/venues/1', headers={'If-None-Match': first.headers['ETag']})
+  assert second.status_code == 200
+  assert second.headers['X-Cache'] == 'MISS'
+  assert second.headers['ETag'] != first.headers['ETag']
+  assert second.get_data() != first.get_data()
+  assert client.get('/venues/1', headers={'If-None-Match': second.headers['ETag']}).status_code == 304
@@ -0,0 +1,53 @@
+import json
+from datetime import datetime
+
+from models import Show
+
+def run_import(app, tmp_path, kind, records, *args):
+  """Import records through 'flask import'; returns (result, rejections)."""
+  path = tmp_path / '{}.jsonl'.format(kind)
+  path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+  errors = tmp_path / 'errors.jsonl'
+  result = app.test_cli_runner().invoke(args=['import', kind, str(path), '--errors', str(errors)] + list(args))
+  rejections = [json.loads(line) for line in errors.read_text().splitlines()] if errors.exists() else []
+  return result, rejections
+
+def test_only_the_unparsable_id_is_reported(app, tmp_path):
+  result, rejections = run_import(app, tmp_path, 'shows', [
+    {'venue_id': 'x', 'artist_id': 1, 'start_time': '2031-01-01 20:00:00'},
+    {'venue_id': 1, 'artist_id': 'y', 'start_time': '2031-01-02 20:00:00'},
+  ])
+  assert result.exit_code == 0, result.output
+  assert rejections == [
+    {'record': 1, 'errors': {'venue_id': ['Not a number.']}},
+    {'record': 2, 'errors': {'artist_id': ['Not a number.']}},
+  ]
+
+def test_show_without_start_time_is_rejected(app, tmp_path):
+  with app.app_context():
+    shows = Show.query.count()
+  result, rejections = run_import(app, tmp_path, 'shows', [
+    {'venue_id': 1, 'artist_id': 1},
+    {'venue_id': 1, 'artist_id': 1, 'start_time': ''},
+  ])
+  assert result.exit_code == 0, result.output
+  assert [rejection['errors'] for rejection in rejections] == [{'start_time': ['This field is required.']}] * 2
+  with app.app_context():
+    assert Show.query.count() == shows
+
+def test_import_resumes_after_the_checkpoint(app, tmp_path):
+  (tmp_path / 'shows.jsonl.checkpoint').write_text(json.dumps({'records': 2}))
+  result, rejections = run_import(app, tmp_path, 'shows', [
+    {'venue_id': 'x', 'artist_id': 1, 'start_time': '2031-01-01 20:00:00'},
+    {'venue_id': 1, 'artist_id': 1, 'start_time': '2031-01-02 20:00:00'},
+    {'venue_id': 1, 'artist_id': 1, 'start_time': '2031-01-03 20:00:00'},
+    {'venue_id': 1, 'artist_id': 1},
+  ])
+  assert result.exit_code == 0, result.output
+  assert 'Resuming after record 2.' in result.output
+  assert 'Done: 1 inserted, 1 rejected.' in result.output
+  # Records 1 and 2 were consumed by the earlier run: neither is read again
+  assert rejections == [{'record': 4, 'errors': {'start_time': ['This field is required.']}}]
+  assert not (tmp_path / 'shows.jsonl.checkpoint').exists()
+  with app.app_context():
+    assert [show.start_time.day for show in Show.query.filter(Show.start_time >= datetime(2031, 1, 1))] == [3]
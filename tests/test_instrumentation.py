@@ -0,0 +1,70 @@
+import pytest
+
+import loading
+from instrumentation import QueryBudgetExceeded, RepeatedQueryError, assert_max_queries
+from models import db, Venue
+
+def add_view(app, rule, view, max_queries=None):
+  app.add_url_rule(rule, view.__name__, view)
+  if max_queries is not None:
+    loading.PROFILES[view.__name__] = loading.Profile(max_queries=max_queries)
+
+@pytest.fixture(autouse=True)
+def restore_profiles():
+  profiles = dict(loading.PROFILES)
+  yield
+  loading.PROFILES.clear()
+  loading.PROFILES.update(profiles)
+
+def test_server_timing_header(client):
+  response = client.get('/venues')
+  assert response.status_code == 200
+  timings = response.headers.getlist('Server-Timing')
+  assert timings[0].startswith('db;dur=') and '1 queries' in timings[0]
+  assert timings[1].startswith('app;dur=')
+
+def test_strict_mode_raises_on_repeated_statement(app):
+  def n_plus_one():
+    for id in range(1, app.config['SQL_REPEAT_THRESHOLD'] + 2):
+      Venue.query.get(id)
+    return ''
+  add_view(app, '/_test/n_plus_one', n_plus_one)
+  with pytest.raises(RepeatedQueryError):
+    app.test_client().get('/_test/n_plus_one')
+
+def test_strict_mode_raises_over_budget(app):
+  def two_queries():
+    Venue.query.get(1)
+    Venue.query.get(2)
+    return ''
+  add_view(app, '/_test/two_queries', two_queries, max_queries=1)
+  with pytest.raises(QueryBudgetExceeded):
+    app.test_client().get('/_test/two_queries')
+
+def test_failed_statement_does_not_skew_timings(app):
+  def failing_statement():
+    try:
+      db.session.execute('SELECT * FROM no_such_table')
+    except Exception:
+      db.session.rollback()
+    Venue.query.get(1)
+    return ''
+  add_view(app, '/_test/failing_statement', failing_statement)
+  client = app.test_client()
+  for _ in range(3):
+    response = client.get('/_test/failing_statement')
+    assert response.status_code == 200
+    # The failed statement is not counted; the one that ran is, with a sane time
+    db_timing = response.headers.getlist('Server-Timing')[0]
+    assert '"1 queries"' in db_timing
+    assert 0 <= float(db_timing.split('dur=')[1].split(';')[0]) < 1000
+
+def test_assert_max_queries(app):
+  with app.app_context():
+    with assert_max_queries(1) as statements:
+      Venue.query.get(1)
+    assert len(statements) == 1
+    with pytest.raises(QueryBudgetExceeded):
+      with assert_max_queries(1):
+        Venue.query.get(1)
+        Venue.query.get(2)
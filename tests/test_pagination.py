@@ -0,0 +1,40 @@
+import pytest
+
+from models import db, Venue
+from pagination import keyset_paginate
+
+def venue_pages(query, per_page, after=None, before=None):
+  return keyset_paginate(query, [Venue.state, Venue.city, Venue.id],
+                         key=lambda row: (row.state, row.city, row.id),
+                         per_page=per_page, after=after, before=before)
+
+@pytest.fixture
+def tied_venues(app):
+  # Three areas for twenty venues: most pages start and end inside a run of
+  # equal (state, city), where only the id breaks the tie
+  with app.app_context():
+    for venue in Venue.query.order_by(Venue.id):
+      venue.state, venue.city = [('CA', 'San Francisco'), ('NY', 'New York'), ('CA', 'Oakland')][venue.id % 3]
+    db.session.commit()
+    yield db.session.query(Venue.state, Venue.city, Venue.id)
+
+def test_paging_forward_and_back_through_ties(app, tied_venues):
+  expected = sorted(tied_venues.all())
+  pages = [venue_pages(tied_venues, 3)]
+  while pages[-1].has_next:
+    pages.append(venue_pages(tied_venues, 3, after=pages[-1].next_cursor))
+  assert [row for page in pages for row in page.items] == expected
+  assert [len(page.items) for page in pages] == [3] * 6 + [2]
+  assert not pages[0].has_prev and pages[-1].has_prev
+
+  # Back from the last page, the same pages come up in reverse
+  back = [pages[-1]]
+  while back[-1].has_prev:
+    back.append(venue_pages(tied_venues, 3, before=back[-1].prev_cursor))
+  assert [page.items for page in back] == [page.items for page in reversed(pages)]
+  assert all(page.has_next for page in back[1:])
+
+def test_malformed_cursor_is_a_bad_request(client):
+  assert client.get('/venues?after=garbage').status_code == 400
+  assert client.get('/venues?before=WzEsMl0').status_code == 400
+  assert client.get('/venues').status_code == 200
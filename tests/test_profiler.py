@@ -0,0 +1,59 @@
+from flask import Flask
+
+from app import create_app
+from models import db
+from profiler import ProfilerMiddleware, make_token
+
+from conftest import TEST_CONFIG
+
+class Body(object):
+  def __init__(self):
+    self.made = 0
+    self.closed = False
+
+  def __iter__(self):
+    for _ in range(3):
+      self.made += 1
+      yield b'chunk'
+
+  def close(self):
+    self.closed = True
+
+def test_profiled_response_streams_and_is_saved_on_close(tmp_path):
+  app = Flask(__name__)
+  app.config.update(SECRET_KEY='test', PROFILER_SECRET=None, PROFILER_TOKEN_MAX_AGE=60,
+                    PROFILER_SAMPLE_RATE=0.0, PROFILER_DIR=str(tmp_path), PROFILER_KEEP=10)
+  body = Body()
+
+  def wsgi_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return body
+
+  middleware = ProfilerMiddleware(app, wsgi_app)
+  environ = {'PATH_INFO': '/shows', 'REQUEST_METHOD': 'GET', 'HTTP_X_PROFILE': make_token(app)}
+  response = middleware(environ, lambda status, headers, exc_info=None: None)
+  chunks = iter(response)
+  assert next(chunks) == b'chunk'
+  # Read as the server asks for it, not buffered up front
+  assert body.made == 1
+  assert list(chunks) == [b'chunk', b'chunk']
+  assert not list(tmp_path.iterdir())
+  response.close()
+  assert body.closed
+  assert [path.name.split('-')[-2] for path in tmp_path.iterdir()] == ['200']
+
+def test_profiles_take_the_token_from_the_header_only(tmp_path):
+  app = create_app(dict(TEST_CONFIG, PROFILER_ENABLED=True, PROFILER_DIR=str(tmp_path / 'profiles'),
+                        SQLALCHEMY_DATABASE_URI='sqlite:///' + str(tmp_path / 'test.db')))
+  with app.app_context():
+    db.create_all()
+  client = app.test_client()
+  token = make_token(app)
+  # Servers close the body when they are done with it, the test client on request
+  response = client.get('/', headers={'X-Profile': token})
+  assert response.status_code == 200
+  response.close()
+  assert client.get('/_profiles?token=' + token).status_code == 404
+  index = client.get('/_profiles', headers={'X-Profile': token})
+  assert index.status_code == 200
+  assert b'-GET-root-200-' in index.data
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+import loading
+from bench.run import Scenarios
+from instrumentation import assert_max_queries
+from models import db
+
+from conftest import SIZES
+
+def bench_request(app, endpoint):
+  """The request bench.run makes for endpoint: (method, url, data)."""
+  rule = next(rule for rule in app.url_map.iter_rules() if rule.endpoint == endpoint)
+  with app.app_context():
+    scenario = Scenarios(random.Random(1), SIZES).request_for(rule)
+    assert scenario is not None, 'no bench scenario for ' + endpoint
+    request = scenario()
+    db.session.remove()
+  return request
+
+@pytest.mark.parametrize('endpoint', sorted(loading.PROFILES))
+def test_query_budget(app, endpoint):
+  # Body included: streamed pages run their queries while it is read
+  method, url, data = bench_request(app, endpoint)
+  with app.app_context():
+    engine = db.engine
+  # A worker past its first request: the once-per-process setup is not
+  # part of any request's budget
+  with app.test_request_context():
+    app.try_trigger_before_first_request_functions()
+    db.session.remove()
+
+  client = app.test_client()
+  with assert_max_queries(loading.PROFILES[endpoint].max_queries, engine=engine):
+    response = client.open(url, method=method, data=data)
+    response.get_data()
+  assert response.status_code in (200, 302)
+
+@pytest.mark.parametrize('endpoint', [
+  'venues.search_venues', 'artists.search_artists',
+  'venues.edit_venue_submission', 'artists.edit_artist_submission',
+])
+def test_query_budget_in_a_fresh_worker(app, endpoint):
+  # The first request of a process, with a search backend that has not
+  # looked for its tables yet; SQL_STRICT raises if it runs over budget
+  app.extensions.pop('search', None)
+  method, url, data = bench_request(app, endpoint)
+  response = app.test_client().open(url, method=method, data=data)
+  assert response.status_code in (200, 302)
+  assert app.extensions['search']._ready
@@ -0,0 +1,22 @@
+from models import db, Venue, Artist, Show, refresh_show_counts
+
+def counts(model, id):
+  row = db.session.query(model.upcoming_shows_count, model.past_shows_count).filter(model.id == id).one()
+  return tuple(row)
+
+def test_deleting_a_venue_refreshes_the_counts_of_its_artists(app, client):
+  with app.app_context():
+    show = Show.query.order_by(Show.id).first()
+    venue_id, artist_id = show.venue_id, show.artist_id
+    before = counts(Artist, artist_id)
+    removed = Show.query.filter_by(venue_id=venue_id, artist_id=artist_id).count()
+    db.session.remove()
+
+  assert client.delete('/venues/{}'.format(venue_id)).status_code == 200
+
+  with app.app_context():
+    assert Venue.query.get(venue_id) is None
+    after = counts(Artist, artist_id)
+    assert sum(before) - sum(after) == removed
+    refresh_show_counts(artist_ids=[artist_id])
+    assert counts(Artist, artist_id) == after
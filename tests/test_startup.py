@@ -0,0 +1,55 @@
+import importlib
+import logging
+
+import pytest
+
+import config
+from app import DEVELOPMENT_SECRET_KEY, create_app
+
+@pytest.fixture
+def reload_config(monkeypatch, tmp_path):
+  # config reads the environment on import. These apps are neither testing
+  # nor debugging, so they log to a file: keep it out of the tree.
+  monkeypatch.setenv('ERROR_LOG', str(tmp_path / 'error.log'))
+  handlers = list(logging.getLogger('app').handlers)
+  def reload(**environ):
+    for name, value in environ.items():
+      if value is None:
+        monkeypatch.delenv(name, raising=False)
+      else:
+        monkeypatch.setenv(name, value)
+    return importlib.reload(config)
+  yield reload
+  monkeypatch.undo()
+  importlib.reload(config)
+  logger = logging.getLogger('app')
+  for handler in logger.handlers[len(handlers):]:
+    logger.removeHandler(handler)
+    handler.close()
+
+def test_debug_is_off_unless_asked_for(reload_config):
+  assert reload_config(FLASK_DEBUG=None).DEBUG is False
+  assert reload_config(FLASK_DEBUG='0').DEBUG is False
+  assert reload_config(FLASK_DEBUG='1').DEBUG is True
+
+def test_secret_key_required_outside_debug(reload_config):
+  reload_config(FLASK_DEBUG=None, SECRET_KEY=None)
+  with pytest.raises(RuntimeError):
+    create_app()
+
+def test_secret_key_from_environment(reload_config):
+  reload_config(FLASK_DEBUG=None, SECRET_KEY='from-the-environment')
+  assert create_app({'SQLALCHEMY_BINDS': {}}).config['SECRET_KEY'] == 'from-the-environment'
+
+def test_development_key_in_debug_only(reload_config):
+  reload_config(FLASK_DEBUG='1', SECRET_KEY=None)
+  assert create_app({'SQLALCHEMY_BINDS': {}}).config['SECRET_KEY'] == DEVELOPMENT_SECRET_KEY
+
+def test_error_log_from_config(reload_config, tmp_path):
+  reload_config(FLASK_DEBUG=None, SECRET_KEY='key', ERROR_LOG=str(tmp_path / 'app.log'))
+  create_app({'SQLALCHEMY_BINDS': {}})
+  assert (tmp_path / 'app.log').exists()
+  handlers = len(logging.getLogger('app').handlers)
+  reload_config(ERROR_LOG='')
+  create_app({'SQLALCHEMY_BINDS': {}})
+  assert len(logging.getLogger('app').handlers) == handlers
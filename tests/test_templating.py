@@ -0,0 +1,34 @@
+from jinja2 import DictLoader, Environment
+
+from cache import LRUCache
+from templating import FragmentCacheExtension
+
+def environment(templates):
+  env = Environment(loader=DictLoader(templates), extensions=[FragmentCacheExtension])
+  env.fragment_cache = LRUCache()
+  env.fragment_cache_ttl = 60
+  return env
+
+class Counter(object):
+  def __init__(self):
+    self.calls = 0
+
+  def __call__(self):
+    self.calls += 1
+    return self.calls
+
+def test_compiling_a_template_keeps_other_fragments():
+  env = environment({'a': '{% cache 1 %}{{ render() }}{% endcache %}', 'b': 'b'})
+  render = Counter()
+  assert env.get_template('a').render(render=render) == '1'
+  env.get_template('b')
+  assert env.get_template('a').render(render=render) == '1'
+  assert render.calls == 1
+
+def test_edited_template_gets_new_fragments():
+  templates = {'a': '{% cache 1 %}{{ render() }}{% endcache %}'}
+  env = environment(templates)
+  render = Counter()
+  assert env.get_template('a').render(render=render) == '1'
+  templates['a'] = '{% cache 1 %}<b>{{ render() }}</b>{% endcache %}'
+  assert env.get_template('a').render(render=render) == '<b>2</b>'
@@ -0,0 +1,249 @@
+#----------------------------------------------------------------------------#
+# Venue pages: the listing, search, detail pages and calendars, and the
+# create, edit and delete handlers.
+#----------------------------------------------------------------------------#
+
+import sys
+from itertools import groupby
+from operator import itemgetter
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, url_for
+
+import autocomplete
+import calendars
+import fanout
+import feed
+import freshness
+import loading
+import replicas
+import search
+from cache import response_cache
+from forms import VenueForm
+from models import db, Venue, Artist, Show, ShowFeed, Genre, refresh_show_counts, show_now
+from pagination import keyset_paginate
+
+bp = Blueprint('venues', __name__)
+
+@bp.route('/venues')
+@response_cache.cached('venues')
+def venues():
+  # One query for a page of venues with their area and upcoming show count,
+  # read from the row. Rows come back ordered by state, city and id, so the
+  # areas can be built in a single pass.
+  query = db.session.query(*loading.profile().columns)
+  page = keyset_paginate(query, [Venue.state, Venue.city, Venue.id],
+                         key=lambda row: (row.state, row.city, row.id),
+                         per_page=current_app.config['PAGE_SIZE'],
+                         after=request.args.get('after'), before=request.args.get('before'))
+
+  response_cache.tag(*['venue:{}'.format(row.id) for row in page.items])
+
+  data = []
+  for (city, state), area_venues in groupby(page.items, key=itemgetter(0, 1)):
+    data.append({
+        "city": city,
+        "state": state,
+        "venues": [{
+            "id": venue.id,
+            "name": venue.name,
+            "updated_at": venue.updated_at,
+            "num_upcoming_shows": venue.num_upcoming_shows
+        } for venue in area_venues]
+    })
+
+  return render_template('pages/venues.html', areas=data, page=page)
+
+@bp.route('/venues/search', methods=['POST'])
+@replicas.use_replica
+def search_venues():
+  search_term = request.form.get('search_term', '').strip()
+  page = request.form.get('page', 1, type=int)
+  results = search.get_backend().search(Venue, search_term, page, current_app.config['SEARCH_PAGE_SIZE'])
+
+  venue_list = []
+  for venue in results.items:
+     venue_list.append({
+        "id": venue.id,
+        "name": venue.name,
+        "num_upcoming_shows": venue.upcoming_shows_count
+        })
+
+  response = {
+    "count": results.total,
+    "data": venue_list
+  }
+  return render_template('pages/search_venues.html', results=response, pagination=results, search_term=request.form.get('search_term', ''))
+
+# lists the venues tagged with a genre, through the genre index
+@bp.route('/venues/genres/<genre>')
+def venues_by_genre(genre):
+  venue_list = [{"id": venue.id, "name": venue.name} for venue in loading.profile().apply(Venue.by_genre(genre))]
+  response = {
+    "count": len(venue_list),
+    "data": venue_list
+  }
+  return render_template('pages/search_venues.html', results=response, search_term=genre)
+
+# shows the venue page with the given venue_id
+@bp.route('/venues/<int:venue_id>')
+@freshness.conditional(freshness.venue_freshness)
+@response_cache.cached('venue:{venue_id}')
+def show_venue(venue_id):
+  profile = loading.profile()
+  now = show_now()
+
+  # Both lists are (venue_id, start_time) range scans on the Show table,
+  # joined to the few Artist columns the page shows. They and the venue are
+  # loaded concurrently, see fanout.py.
+  def shows(*criteria):
+    return lambda: loading.shows_to_list(db.session.query(*profile.columns)
+                                 .join(Artist, Show.artist_id == Artist.id)
+                                 .filter(Show.venue_id == venue_id, *criteria)
+                                 .order_by(Show.start_time))
+
+  venue, past_shows, upcoming_shows = fanout.gather(
+    lambda: profile.query(Venue).get_or_404(venue_id),
+    shows(Show.start_time < now),
+    shows(Show.start_time >= now))
+  data = venue.to_dict()
+  response_cache.tag(*['artist:{}'.format(show['artist_id']) for show in past_shows + upcoming_shows])
+
+  data["past_shows"] = past_shows
+  data["upcoming_shows"] = upcoming_shows
+  data["past_shows_count"] = len(past_shows)
+  data["upcoming_shows_count"] = len(upcoming_shows)
+
+  data['genres'] = venue.genre_names
+  return render_template('pages/show_venue.html', venue=data)
+
+# the venue's shows in a range of days
+@bp.route('/venues/<int:venue_id>/calendar')
+def venue_calendar(venue_id):
+  venue = db.session.query(Venue.id, Venue.name).filter(Venue.id == venue_id).first_or_404()
+  return calendars.render(loading.profile().columns, request.args, venue.name, venue_id=venue.id)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  form = VenueForm(request.form, meta={'csrf': False})
+  if not form.validate():
+    message = []
+    for field, err in form.errors.items():
+      message.append(field + ' - ' + '|'.join(err))
+    flash('Errors ' + str(message))
+    return redirect(url_for('venues.create_venue_submission'))
+  else:
+    try:
+      venue = Venue()
+      venue.name = form.name.data
+      venue.city = form.city.data
+      venue.state = form.state.data
+      venue.address = form.address.data
+      venue.phone = form.phone.data
+      venue.genres = Genre.get_or_create(request.form.getlist('genres'))
+      venue.facebook_link = form.facebook_link.data
+      venue.website = form.website_link.data
+      venue.image_link = form.image_link.data
+      venue.seeking_talent = form.seeking_talent.data
+      venue.seeking_description = form.seeking_description.data
+
+      db.session.add(venue)
+      db.session.flush()
+      search.get_backend().index(venue)
+      db.session.commit()
+      autocomplete.index(venue)
+      response_cache.invalidate('venues')
+      flash('Venue: {0} created successfully!'.format(venue.name))
+    except Exception as err:
+      db.session.rollback()
+      flash('An error occurred creating the Venue: {0}. Error: {1}'.format(venue.name, err))
+      print(sys.exc_info())
+    finally:
+      db.session.close()
+    return render_template('pages/home.html')
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  try:
+    venue = loading.profile().query(Venue).get(venue_id)
+    venue_name = venue.name
+    artist_ids = {show.artist_id for show in venue.shows}
+    feed.remove_shows(ShowFeed.venue_id == venue.id)
+    search.get_backend().remove(Venue, venue.id)
+    # Show.venue_id is NOT NULL: the venue's shows go with it, and so do
+    # their artists' counts
+    for show in venue.shows:
+      db.session.delete(show)
+    db.session.delete(venue)
+    db.session.flush()
+    refresh_show_counts([], artist_ids)
+    db.session.commit()
+    autocomplete.remove(Venue, venue.id)
+    response_cache.invalidate('venues', 'shows', 'venue:{}'.format(venue.id),
+                              *('artist:{}'.format(id) for id in artist_ids))
+    flash('Successfully removed venue {0}.'.format(venue_name))
+  except Exception as err:
+    db.session.rollback()
+    flash('An error occurred removing the Venue: {0}. Error: {1}'.format(venue_name, err))
+  finally:
+    db.session.close()
+  return jsonify({'success': True})
+
+#  Update
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@replicas.use_primary
+def edit_venue(venue_id):
+  form = VenueForm(request.form)
+  venue = loading.profile().query(Venue).get(venue_id)
+  genres = venue.genre_names
+  venue = venue.to_dict()
+  venue['website_link'] = venue['website']
+  venue['genres'] = genres
+  form = VenueForm(formdata=None, data=venue)
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  venue = loading.profile().query(Venue).get(venue_id)
+  form = VenueForm(request.form, meta={'csrf': False})
+  if not form.validate():
+    message = []
+    for field, err in form.errors.items():
+      message.append(field + ' - ' + '|'.join(err))
+    flash('Errors ' + str(message))
+    return redirect(url_for('venues.edit_venue_submission', venue_id=venue_id))
+  else:
+    try:
+      venue.name = form.name.data
+      venue.genres = Genre.get_or_create(form.genres.data)
+      venue.address = form.address.data
+      venue.city = form.city.data
+      venue.state = form.state.data
+      venue.phone = form.phone.data
+      venue.website = form.website_link.data
+      venue.facebook_link = form.facebook_link.data
+      venue.image_link = form.image_link.data
+      venue.seeking_talent = form.seeking_talent.data
+      venue.seeking_description = form.seeking_description.data
+      feed.update_venue(venue)
+      search.get_backend().index(venue)
+      db.session.commit()
+      autocomplete.index(venue)
+      response_cache.invalidate('venues', 'venue:{}'.format(venue_id))
+      flash('Venue: {0} updated successfully'.format(venue.name))
+    except Exception as err:
+      db.session.rollback()
+      print(sys.exc_info())
+      flash('An error occurred updating the Venue: {0}. Error: {1}'.format(venue.name, err))
+    finally:
+      db.session.close()
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))